@@ -0,0 +1,105 @@
+"""
+Benchmark of the DataSet dictionaries and sparse matrices, in seconds per build.
+
+It builds the train and test dictionaries, the private (indexed) train dictionary, and the train CSR matrices of
+synthetic interaction logs of increasing size, with the previous per-user build, which scans the whole dataframe for
+each user, and with the vectorized dataframe_to_dict, build_dict, and CSR build of DataSet. The per-user build grows
+with users x interactions, so it only runs up to --legacy-rows interactions.
+
+    python benchmarks/dataset_loader.py [--rows 100000 1000000 10000000] [--interactions-per-user 50]
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from elliot.dataset.dataset import DataSet
+
+
+def synthetic_interactions(n_rows, interactions_per_user, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"userId": rng.integers(0, max(n_rows // interactions_per_user, 1), n_rows),
+                         "itemId": rng.integers(0, 100_000, n_rows),
+                         "rating": rng.integers(1, 6, n_rows).astype(np.float64)})
+
+
+def legacy_build(train, test):
+    def dataframe_to_dict(data, users):
+        ratings = {}
+        for u in users:
+            sel_ = data[data['userId'] == u]
+            ratings[u] = dict(zip(sel_['itemId'], sel_['rating']))
+        return ratings
+
+    train_dict = dataframe_to_dict(train, list(train['userId'].unique()))
+    users = list(train_dict.keys())
+    items = list({k for a in train_dict.values() for k in a.keys()})
+    public_users = {v: k for k, v in enumerate(users)}
+    public_items = {v: k for k, v in enumerate(items)}
+    i_train_dict = {public_users[user]: {public_items[i]: v for i, v in items.items()}
+                    for user, items in train_dict.items()}
+    test_dict = dataframe_to_dict(test, users)
+
+    rows_cols_ratings = [(u, i, r) for u, items in i_train_dict.items() for i, r in items.items()]
+    rows = [u for u, _, _ in rows_cols_ratings]
+    cols = [i for _, i, _ in rows_cols_ratings]
+    ratings = [r for _, _, r in rows_cols_ratings]
+    sp_i_train = sp.csr_matrix((np.ones_like(rows), (rows, cols)), dtype='float32', shape=(len(users), len(items)))
+    sp_i_train_ratings = sp.csr_matrix((ratings, (rows, cols)), dtype='float32', shape=(len(users), len(items)))
+    return train_dict, test_dict, i_train_dict, sp_i_train, sp_i_train_ratings
+
+
+def vectorized_build(train, test):
+    # only the building methods are timed, not the rest of the DataSet initialization
+    dataset = DataSet.__new__(DataSet)
+    users, bounds, items, ratings = dataset.group_by_user(train)
+    dataset.train_dict = dataset.grouped_to_dict(users, bounds, items, ratings)
+    dataset.users = list(dataset.train_dict.keys())
+    dataset.items = list(set(items))
+    item_codes = pd.Index(dataset.items).get_indexer(items).tolist()
+    dataset.i_train_dict = dataset.grouped_to_dict(range(len(dataset.users)), bounds, item_codes, ratings)
+    test_dict = dataset.build_dict(test, dataset.users)
+    return dataset.train_dict, test_dict, dataset.i_train_dict, dataset.build_sparse(), \
+           dataset.build_sparse_ratings()
+
+
+def timed(build, train, test):
+    start = time.perf_counter()
+    built = build(train, test)
+    return time.perf_counter() - start, built
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--interactions-per-user", type=int, default=50)
+    parser.add_argument("--legacy-rows", type=int, default=100_000)
+    parser.add_argument("--test-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        data = synthetic_interactions(n_rows, args.interactions_per_user)
+        is_test = np.random.default_rng(0).random(n_rows) < args.test_ratio
+        train, test = data[~is_test], data[is_test]
+        print(f"{n_rows:,} interactions, {data['userId'].nunique():,} users")
+
+        elapsed, vectorized = timed(vectorized_build, train, test)
+        print(f"  vectorized: {elapsed:.2f} s")
+        if n_rows <= args.legacy_rows:
+            elapsed, legacy = timed(legacy_build, train, test)
+            same = all(a == b for a, b in zip(legacy[:3], vectorized[:3])) \
+                   and all((a != b).nnz == 0 for a, b in zip(legacy[3:], vectorized[3:]))
+            print(f"  per user: {elapsed:.2f} s ({'same' if same else 'different'} output)")
+        else:
+            print(f"  per user: skipped (more than {args.legacy_rows:,} interactions)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the pairwise (user, positive, negative) samplers, in triples per second.
+
+It compares the per-triple custom_sampler with the vectorized sampler, with and without the prefetching thread.
+The prefetching runs simulate a training step of --step-ms milliseconds per batch, which releases the GIL as the
+numerical libraries do, so they measure how much of the sampling is hidden behind the training.
+
+    python benchmarks/pairwise_sampler.py [--users 6000] [--items 4000] [--interactions 1000000] [--batch-size 1024]
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import argparse
+import time
+
+import numpy as np
+from scipy import sparse
+
+from elliot.dataset.samplers import custom_sampler as cs
+from elliot.dataset.samplers import vectorized_sampler as vs
+
+
+def synthetic_interactions(n_users, n_items, n_interactions, seed=42):
+    rng = np.random.default_rng(seed)
+    # long-tailed item popularity
+    items = np.minimum((rng.pareto(1.0, n_interactions) * n_items / 50).astype(np.int64), n_items - 1)
+    users = rng.integers(0, n_users, n_interactions)
+    matrix = sparse.csr_matrix((np.ones(n_interactions), (users, items)), shape=(n_users, n_items))
+    # binary interactions
+    matrix.data[:] = 1
+    return matrix
+
+
+def throughput(sampler, events, batch_size, step_seconds=0.):
+    start = time.perf_counter()
+    for _ in sampler.step(events, batch_size):
+        if step_seconds:
+            time.sleep(step_seconds)
+    elapsed = time.perf_counter() - start
+    return events / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=6_000)
+    parser.add_argument("--items", type=int, default=4_000)
+    parser.add_argument("--interactions", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--step-ms", type=float, default=2.)
+    args = parser.parse_args()
+
+    train = synthetic_interactions(args.users, args.items, args.interactions)
+    print(f"{args.users} users, {args.items} items, {train.nnz} interactions, batches of {args.batch_size}")
+
+    indexed_ratings = {u: dict.fromkeys(train.indices[train.indptr[u]:train.indptr[u + 1]].tolist(), 1)
+                       for u in range(train.shape[0])}
+    legacy_events = min(args.events, 100_000)
+    rate, _ = throughput(cs.Sampler(indexed_ratings), legacy_events, args.batch_size)
+    print(f"custom_sampler: {rate:,.0f} triples/s")
+
+    rate, _ = throughput(vs.Sampler(train), args.events, args.batch_size)
+    print(f"vectorized_sampler: {rate:,.0f} triples/s")
+
+    step_seconds = args.step_ms / 1000
+    start = time.perf_counter()
+    for _ in range(0, args.events, args.batch_size):
+        time.sleep(step_seconds)
+    training = time.perf_counter() - start
+    for prefetch in (0, 4):
+        _, elapsed = throughput(vs.Sampler(train, prefetch=prefetch), args.events, args.batch_size, step_seconds)
+        print(f"vectorized_sampler, prefetch={prefetch}, {args.step_ms} ms steps: "
+              f"{elapsed:.2f} s ({elapsed - training:.2f} s not hidden behind the training)")
+
+
+if __name__ == "__main__":
+    main()
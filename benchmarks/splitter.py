@@ -0,0 +1,59 @@
+"""
+Benchmark of the splitting strategies, in seconds per split.
+
+It splits synthetic interaction logs of increasing size with the temporal, fixed (and best) timestamp, random
+subsampling, and cross-validation strategies. Logs of 10^8 rows need about 10 GB of memory.
+
+    python benchmarks/splitter.py [--rows 1000000 10000000 100000000] [--interactions-per-user 50]
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from elliot.splitter.base_splitter import Splitter
+
+STRATEGIES = {
+    "temporal_hold_out, test_ratio=0.2": dict(strategy="temporal_hold_out", test_ratio=0.2),
+    "temporal_hold_out, leave_n_out=1": dict(strategy="temporal_hold_out", leave_n_out=1),
+    "fixed_timestamp": dict(strategy="fixed_timestamp", timestamp="1500000000"),
+    "fixed_timestamp, best": dict(strategy="fixed_timestamp", timestamp="best"),
+    "random_subsampling, test_ratio=0.2": dict(strategy="random_subsampling", folds=1, test_ratio=0.2),
+    "random_subsampling, leave_n_out=1": dict(strategy="random_subsampling", folds=1, leave_n_out=1),
+    "random_cross_validation, folds=5": dict(strategy="random_cross_validation", folds=5),
+}
+
+
+def synthetic_interactions(n_rows, interactions_per_user, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"userId": rng.integers(0, max(n_rows // interactions_per_user, 1), n_rows),
+                         "itemId": rng.integers(0, 100_000, n_rows),
+                         "rating": np.ones(n_rows, dtype=np.float32),
+                         "timestamp": rng.integers(1_000_000_000, 2_000_000_000, n_rows)})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--interactions-per-user", type=int, default=50)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        data = synthetic_interactions(n_rows, args.interactions_per_user)
+        print(f"{n_rows:,} interactions, {data['userId'].nunique():,} users")
+        for name, options in STRATEGIES.items():
+            splitter = Splitter(data, SimpleNamespace(test_splitting=SimpleNamespace(**options)))
+            start = time.perf_counter()
+            splitter.handle_hierarchy(data, splitter.splitting_ns.test_splitting)
+            print(f"  {name}: {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
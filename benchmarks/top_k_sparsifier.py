@@ -0,0 +1,65 @@
+"""
+Benchmark of the block-wise top-k sparsifier on a synthetic catalog of 50k items.
+
+The dense items x items similarity of this catalog would take 20 GB (float64), while the sparsifier only holds one
+block of rows and the resulting top-k matrix.
+
+    python benchmarks/top_k_sparsifier.py [--items 50000] [--users 20000] [--density 0.001] [--neighbors 50]
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from scipy import sparse
+
+from elliot.recommender.knn.top_k_sparsifier import similarity_blocks, sparsify_top_k, top_k_per_row
+
+
+def synthetic_interactions(n_users, n_items, density, seed=42):
+    rng = np.random.default_rng(seed)
+    nnz = int(n_users * n_items * density)
+    # long-tailed item popularity
+    items = np.minimum((rng.pareto(1.2, nnz) * n_items / 20).astype(np.int64), n_items - 1)
+    users = rng.integers(0, n_users, nnz)
+    matrix = sparse.csr_matrix((np.ones(nnz), (users, items)), shape=(n_users, n_items))
+    # binary interactions
+    matrix.data[:] = 1
+    return matrix
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=50_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--density", type=float, default=0.001)
+    parser.add_argument("--neighbors", type=int, default=50)
+    parser.add_argument("--block-size", type=int, default=1 << 24)
+    args = parser.parse_args()
+
+    urm = synthetic_interactions(args.users, args.items, args.density)
+    item_matrix = urm.T.tocsr()
+    print(f"{args.users} users, {args.items} items, {urm.nnz} interactions")
+
+    for similarity in ["cosine", "dot"]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        top_k = sparsify_top_k(similarity_blocks(item_matrix, similarity), (args.items, args.items),
+                               args.neighbors, block_size=args.block_size)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{similarity}: {elapsed:.1f} s, peak {peak / 2 ** 20:.0f} MB, {top_k.nnz} neighbors")
+
+    start = time.perf_counter()
+    top_k_per_row(top_k.T, args.neighbors)
+    print(f"column-wise top-k of the sparse matrix: {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Module description:
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class CandidateMask:
+    """
+    Boolean users x items candidate mask backed by a CSR matrix.
+
+    With exclude=True the candidates are the items NOT stored in the matrix (e.g., the unrated items of the training
+    set), otherwise the candidates are exactly the stored items (e.g., sampled negatives plus test items).
+    Dense rows are materialised only for the users that are requested, so that mask[offset:offset_stop],
+    mask[user] and mask[user, item] behave like the former dense boolean arrays.
+    """
+
+    def __init__(self, sp_matrix, exclude=False):
+        self._sp = sp.csr_matrix(sp_matrix, dtype=bool)
+        self._sp.eliminate_zeros()
+        self._sp.sort_indices()
+        self._exclude = exclude
+        self.shape = self._sp.shape
+        self.ndim = 2
+        self.dtype = np.dtype(bool)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            rows, cols = key
+            if isinstance(rows, (int, np.integer)) and isinstance(cols, (int, np.integer)):
+                return self.contains(rows, cols)
+            return self[rows][..., cols]
+        if isinstance(key, (int, np.integer)):
+            return self.get_row(key)
+        if isinstance(key, slice) and key.step in (None, 1):
+            start, stop, _ = key.indices(self.shape[0])
+            return self.get_block(start, stop)
+        return self._apply(self._sp[key].toarray())
+
+    def get_row(self, user):
+        """
+        Dense mask of a single user
+        :param user: private user id
+        :return: 1-d boolean array of length num_items
+        """
+        user = range(self.shape[0])[user]
+        row = np.zeros(self.shape[1], dtype=bool)
+        row[self._sp.indices[self._sp.indptr[user]:self._sp.indptr[user + 1]]] = True
+        return self._apply(row)
+
+    def get_block(self, start, stop):
+        """
+        Dense mask of a contiguous block of users
+        :param start: first private user id
+        :param stop: last private user id (excluded)
+        :return: 2-d boolean array of shape (stop - start, num_items)
+        """
+        return self._apply(self._sp[start:stop].toarray())
+
+    def contains(self, user, item):
+        user = range(self.shape[0])[user]
+        indices = self._sp.indices[self._sp.indptr[user]:self._sp.indptr[user + 1]]
+        pos = np.searchsorted(indices, item)
+        stored = pos < len(indices) and indices[pos] == item
+        return bool(stored) != self._exclude
+
+    def _apply(self, dense):
+        return ~dense if self._exclude else dense
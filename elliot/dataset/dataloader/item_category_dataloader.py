@@ -20,6 +20,7 @@ import scipy.sparse as sp
 
 from elliot.prefiltering.standard_prefilters import PreFilter
 from elliot.splitter.base_splitter import Splitter
+from elliot.dataset.candidate_mask import CandidateMask
 from elliot.utils import logging
 
 """
@@ -267,7 +268,7 @@ class ItemCategoryDataObject:
             self.val_dict = self.build_dict(data_tuple[1], self.users)
             self.test_dict = self.build_dict(data_tuple[2], self.users)
 
-        self.allunrated_mask = np.where((self.sp_i_train.toarray() == 0), True, False)
+        self.allunrated_mask = CandidateMask(self.sp_i_train, exclude=True)
 
     def dataframe_to_dict(self, data):
         users = list(data['userId'].unique())
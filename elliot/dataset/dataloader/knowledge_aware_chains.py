@@ -17,6 +17,7 @@ from types import SimpleNamespace
 import logging as pylog
 
 from elliot.utils import logging
+from elliot.dataset.candidate_mask import CandidateMask
 from elliot.splitter.base_splitter import Splitter
 from elliot.prefiltering.standard_prefilters import PreFilter
 
@@ -350,7 +351,7 @@ class KnowledgeChainsDataObject:
             self.val_dict = self.build_dict(data_tuple[1], self.users)
             self.test_dict = self.build_dict(data_tuple[2], self.users)
 
-        self.allunrated_mask = np.where((self.sp_i_train.toarray() == 0), True, False)
+        self.allunrated_mask = CandidateMask(self.sp_i_train, exclude=True)
 
     def dataframe_to_dict(self, data):
         users = list(data['userId'].unique())
@@ -22,6 +22,8 @@ from PIL import Image
 
 from elliot.prefiltering.standard_prefilters import PreFilter
 from elliot.splitter.base_splitter import Splitter
+from elliot.dataset.candidate_mask import CandidateMask
+from elliot.dataset.modular_loaders.visual.feature_store import ImageStore
 from elliot.utils import logging
 
 """
@@ -378,9 +380,16 @@ class VisualDataObject:
             self.val_dict = self.build_dict(data_tuple[1], self.users)
             self.test_dict = self.build_dict(data_tuple[2], self.users)
 
-        self.allunrated_mask = np.where((self.sp_i_train.toarray() == 0), True, False)
+        self.allunrated_mask = CandidateMask(self.sp_i_train, exclude=True)
 
     def read_images(self, images_folder, image_set, size_tuple):
+        if size_tuple:
+            # decoded and resized once, then read from the memory-mapped image store
+            image_ids = sorted(int(path.split(".")[0]) for path in os.listdir(images_folder)
+                               if int(path.split(".")[0]) in image_set)
+            images = ImageStore(images_folder, {image_id: row for row, image_id in enumerate(image_ids)}, size_tuple)
+            return dict(zip(image_ids, images[:] / np.float32(255)))
+
         image_dict = {}
         for path in os.listdir(images_folder):
             image_id = int(path.split(".")[0])
@@ -392,9 +401,6 @@ class VisualDataObject:
                     if im_pos.mode != 'RGB':
                         im_pos = im_pos.convert(mode='RGB')
 
-                    if size_tuple:
-                        im_pos = np.array(im_pos.resize(size_tuple)) / np.float32(255)
-
                     image_dict[image_id] = im_pos
                 except ValueError:
                     self.logger.error(f'Image at path {os.path.join(images_folder, path)} was not loaded correctly!')
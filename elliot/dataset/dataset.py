@@ -9,6 +9,7 @@ __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 import copy
 import os
+from itertools import chain
 from types import SimpleNamespace
 
 import numpy as np
@@ -18,6 +19,9 @@ import typing as t
 import logging as pylog
 
 from elliot.dataset.abstract_dataset import AbstractDataset
+from elliot.dataset.candidate_mask import CandidateMask
+from elliot.dataset.dataset_cache import DataSetCache
+from elliot.dataset.interactions import read_interactions
 from elliot.splitter.base_splitter import Splitter
 from elliot.prefiltering.standard_prefilters import PreFilter
 from elliot.negative_sampling.negative_sampling import NegativeSampler
@@ -45,13 +49,19 @@ class DataSetLoader(LoaderCoordinator):
         self.column_names = ['userId', 'itemId', 'rating', 'timestamp']
         if config.config_test:
             return
-        if config.data_config.strategy == "fixed":
+        cache = DataSetCache.from_config(config)
+        if cache is not None and cache.exists():
+            self.tuple_list = cache.load()
+            self.side_information = SimpleNamespace()
+            self.logger.info(f"Split data loaded from the cache {cache.path}")
+
+        elif config.data_config.strategy == "fixed":
             path_train_data = config.data_config.train_path
             path_val_data = getattr(config.data_config, "validation_path", None)
             path_test_data = config.data_config.test_path
 
-            self.train_dataframe = pd.read_csv(path_train_data, sep="\t", header=None, names=self.column_names)
-            self.test_dataframe = pd.read_csv(path_test_data, sep="\t", header=None, names=self.column_names)
+            self.train_dataframe = read_interactions(path_train_data, self.column_names)
+            self.test_dataframe = read_interactions(path_test_data, self.column_names)
 
             # self.train_dataframe, self.side_information = self.coordinate_information(self.train_dataframe, sides=config.data_config.side_information)
             # self.train_dataframe = pd.read_csv(path_train_data, sep="\t", header=None, names=self.column_names)
@@ -61,15 +71,15 @@ class DataSetLoader(LoaderCoordinator):
 
             self.logger.info(f"{path_train_data} - Loaded")
 
-            if config.binarize == True or all(self.train_dataframe["rating"].isna()):
+            if config.binarize == True or self.missing_ratings(self.train_dataframe):
                 self.test_dataframe["rating"] = 1
                 self.train_dataframe["rating"] = 1
 
             if path_val_data:
-                self.validation_dataframe = pd.read_csv(path_val_data, sep="\t", header=None, names=self.column_names)
+                self.validation_dataframe = read_interactions(path_val_data, self.column_names)
                 self.validation_dataframe = self.check_timestamp(self.validation_dataframe)
 
-                if config.binarize == True or all(self.train_dataframe["rating"].isna()):
+                if config.binarize == True or self.missing_ratings(self.train_dataframe):
                     self.validation_dataframe["rating"] = 1
 
                 self.tuple_list = [([(self.train_dataframe, self.validation_dataframe)], self.test_dataframe)]
@@ -92,7 +102,7 @@ class DataSetLoader(LoaderCoordinator):
             self.logger.info("There will be the splitting")
             path_dataset = config.data_config.dataset_path
 
-            self.dataframe = pd.read_csv(path_dataset, sep="\t", header=None, names=self.column_names)
+            self.dataframe = read_interactions(path_dataset, self.column_names)
             self.dataframe, self.side_information = self.coordinate_information(self.dataframe,
                                                                                 sides=config.data_config.side_information,
                                                                                 logger=self.logger)
@@ -104,7 +114,7 @@ class DataSetLoader(LoaderCoordinator):
 
             self.dataframe = PreFilter.filter(self.dataframe, self.config)
 
-            if config.binarize == True or all(self.dataframe["rating"].isna()):
+            if config.binarize == True or self.missing_ratings(self.dataframe):
                 self.dataframe["rating"] = 1
 
             splitter = Splitter(self.dataframe, self.config.splitting, self.config.random_seed)
@@ -113,6 +123,10 @@ class DataSetLoader(LoaderCoordinator):
         else:
             raise Exception("Strategy option not recognized")
 
+        if cache is not None and not cache.exists():
+            cache.store(self.tuple_list)
+            self.logger.info(f"Split data stored in the cache {cache.path}")
+
         if isinstance(self.tuple_list[0][1], list):
             self.logger.warning("You are using a splitting strategy with folds. "
                                 "Paired TTest and Wilcoxon Test are not available!")
@@ -120,23 +134,27 @@ class DataSetLoader(LoaderCoordinator):
             self.config.evaluation.wilcoxon_test = False
 
     def check_timestamp(self, d: pd.DataFrame) -> pd.DataFrame:
-        if all(d["timestamp"].isna()):
+        if "timestamp" in d.columns and d["timestamp"].isna().all():
             d = d.drop(columns=["timestamp"]).reset_index(drop=True)
         return d
 
+    @staticmethod
+    def missing_ratings(d: pd.DataFrame) -> bool:
+        return "rating" not in d.columns or d["rating"].isna().all()
+
     def read_splitting(self, folder_path, column_names):
         tuple_list = []
         for dirs in os.listdir(folder_path):
             for test_dir in dirs:
-                test_ = pd.read_csv(os.sep.join([folder_path, test_dir, "test.tsv"]), sep="\t", names=self.column_names)
+                test_ = read_interactions(os.sep.join([folder_path, test_dir, "test.tsv"]), self.column_names)
                 val_dirs = [os.sep.join([folder_path, test_dir, val_dir]) for val_dir in os.listdir(os.sep.join([folder_path, test_dir])) if os.path.isdir(os.sep.join([folder_path, test_dir, val_dir]))]
                 val_list = []
                 for val_dir in val_dirs:
-                    train_ = pd.read_csv(os.sep.join([val_dir, "train.tsv"]), sep="\t", names=self.column_names)
-                    val_ = pd.read_csv(os.sep.join([val_dir, "val.tsv"]), sep="\t", names=self.column_names)
+                    train_ = read_interactions(os.sep.join([val_dir, "train.tsv"]), self.column_names)
+                    val_ = read_interactions(os.sep.join([val_dir, "val.tsv"]), self.column_names)
                     val_list.append((train_, val_))
                 if not val_list:
-                    val_list = pd.read_csv(os.sep.join([folder_path, test_dir, "train.tsv"]), sep="\t", names=self.column_names)
+                    val_list = read_interactions(os.sep.join([folder_path, test_dir, "train.tsv"]), self.column_names)
                 tuple_list.append((val_list, test_))
 
         return tuple_list
@@ -196,10 +214,11 @@ class DataSet(AbstractDataset):
         else:
             self.side_information = side_information_data
 
-        self.train_dict = self.dataframe_to_dict(data_tuple[0])
+        users, bounds, items, ratings = self.group_by_user(data_tuple[0])
+        self.train_dict = self.grouped_to_dict(users, bounds, items, ratings)
 
         self.users = list(self.train_dict.keys())
-        self.items = list({k for a in self.train_dict.values() for k in a.keys()})
+        self.items = list(set(items))
         self.num_users = len(self.users)
         self.num_items = len(self.items)
         self.transactions = sum(len(v) for v in self.train_dict.values())
@@ -213,8 +232,9 @@ class DataSet(AbstractDataset):
         self.private_items = {p: i for p, i in enumerate(self.items)}
         self.public_items = {v: k for k, v in self.private_items.items()}
 
-        self.i_train_dict = {self.public_users[user]: {self.public_items[i]: v for i, v in items.items()}
-                                for user, items in self.train_dict.items()}
+        # users are already in private order, items are factorized once against the private item order
+        item_codes = pd.Index(self.items).get_indexer(items).tolist()
+        self.i_train_dict = self.grouped_to_dict(range(self.num_users), bounds, item_codes, ratings)
 
         self.sp_i_train = self.build_sparse()
         self.sp_i_train_ratings = self.build_sparse_ratings()
@@ -227,7 +247,7 @@ class DataSet(AbstractDataset):
                                                                            self.sp_i_train, None, self.test_dict)
                 sp_i_test = self.to_bool_sparse(self.test_dict)
                 test_candidate_items = test_neg_samples + sp_i_test
-                self.test_mask = np.where((test_candidate_items.toarray() == True), True, False)
+                self.test_mask = CandidateMask(test_candidate_items)
         else:
             self.val_dict = self.build_dict(data_tuple[1], self.users)
             self.test_dict = self.build_dict(data_tuple[2], self.users)
@@ -238,49 +258,64 @@ class DataSet(AbstractDataset):
                 sp_i_val = self.to_bool_sparse(self.val_dict)
                 sp_i_test = self.to_bool_sparse(self.test_dict)
                 val_candidate_items = val_neg_samples + sp_i_val
-                self.val_mask = np.where((val_candidate_items.toarray() == True), True, False)
+                self.val_mask = CandidateMask(val_candidate_items)
                 test_candidate_items = test_neg_samples + sp_i_test
-                self.test_mask = np.where((test_candidate_items.toarray() == True), True, False)
+                self.test_mask = CandidateMask(test_candidate_items)
 
-        self.allunrated_mask = np.where((self.sp_i_train.toarray() == 0), True, False)
+        self.allunrated_mask = CandidateMask(self.sp_i_train, exclude=True)
 
-    def dataframe_to_dict(self, data):
-        users = list(data['userId'].unique())
+    @staticmethod
+    def group_by_user(data):
+        """
+        Stable sort of the interactions by user, following the order of first appearance of the users.
+        :param data: dataframe with userId, itemId, rating columns
+        :return: users, end offset of each user block, sorted items, sorted ratings
+        """
+        codes, users = pd.factorize(data['userId'].to_numpy())
+        order = np.argsort(codes, kind='stable')
+        bounds = np.cumsum(np.bincount(codes, minlength=len(users)))
+        return list(users), bounds.tolist(), data['itemId'].to_numpy()[order].tolist(), \
+               data['rating'].to_numpy()[order].tolist()
+
+    @staticmethod
+    def grouped_to_dict(users, bounds, items, ratings):
+        ratings_dict = {}
+        start = 0
+        for u, stop in zip(users, bounds):
+            ratings_dict[u] = dict(zip(items[start:stop], ratings[start:stop]))
+            start = stop
+        return ratings_dict
 
+    def dataframe_to_dict(self, data):
         "Conversion to Dictionary"
-        ratings = {}
-        for u in users:
-            sel_ = data[data['userId'] == u]
-            ratings[u] = dict(zip(sel_['itemId'], sel_['rating']))
-        return ratings
+        return self.grouped_to_dict(*self.group_by_user(data))
 
     def build_dict(self, dataframe, users):
-        ratings = {}
-        for u in users:
-            sel_ = dataframe[dataframe['userId'] == u]
-            ratings[u] = dict(zip(sel_['itemId'], sel_['rating']))
-        return ratings
+        grouped = self.dataframe_to_dict(dataframe)
+        return {u: grouped.get(u, {}) for u in users}
 
     def build_sparse(self):
-
-        rows_cols = [(u, i) for u, items in self.i_train_dict.items() for i in items.keys()]
-        rows = [u for u, _ in rows_cols]
-        cols = [i for _, i in rows_cols]
+        rows, cols, _ = self._i_train_coo()
         data = sp.csr_matrix((np.ones_like(rows), (rows, cols)), dtype='float32',
                              shape=(len(self.users), len(self.items)))
         return data
 
     def build_sparse_ratings(self):
-        rows_cols_ratings = [(u, i, r) for u, items in self.i_train_dict.items() for i, r in items.items()]
-        rows = [u for u, _, _ in rows_cols_ratings]
-        cols = [i for _, i, _ in rows_cols_ratings]
-        ratings = [r for _, _, r in rows_cols_ratings]
-
+        rows, cols, ratings = self._i_train_coo()
         data = sp.csr_matrix((ratings, (rows, cols)), dtype='float32',
                              shape=(len(self.users), len(self.items)))
 
         return data
 
+    def _i_train_coo(self):
+        lengths = [len(items) for items in self.i_train_dict.values()]
+        nnz = sum(lengths)
+        rows = np.repeat(np.fromiter(self.i_train_dict.keys(), dtype=np.int64, count=len(lengths)), lengths)
+        cols = np.fromiter(chain.from_iterable(self.i_train_dict.values()), dtype=np.int64, count=nnz)
+        ratings = np.fromiter(chain.from_iterable(items.values() for items in self.i_train_dict.values()),
+                              dtype=np.float64, count=nnz)
+        return rows, cols, ratings
+
     def get_test(self):
         return self.test_dict
 
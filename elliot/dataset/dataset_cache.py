@@ -0,0 +1,232 @@
+"""
+Module description:
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import hashlib
+import importlib
+import json
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import elliot
+
+_CACHE_FORMAT = 1
+# the packages whose code computes the cached dataframes
+_CODE_PACKAGES = ("elliot.prefiltering", "elliot.splitter")
+
+
+def save_frame(dataframe, folder):
+    """
+    Stores a dataframe as a folder of .npy column arrays
+    :param dataframe: the dataframe to store
+    :param folder: destination folder
+    :return: the list of the (column, dtype) pairs of the dataframe
+    """
+    os.makedirs(folder, exist_ok=True)
+    columns = []
+    for column in dataframe.columns:
+        values = dataframe[column].to_numpy()
+        if values.dtype == object and pd.api.types.infer_dtype(values, skipna=False) == "string":
+            stored = values.astype(str)
+        else:
+            stored = values
+        np.save(os.path.join(folder, f"{column}.npy"), stored, allow_pickle=stored.dtype == object)
+        columns.append((column, str(values.dtype)))
+    return columns
+
+
+def load_frame(folder, columns=None):
+    """
+    Loads a dataframe stored as a folder of .npy column arrays, memory-mapping the numerical columns
+    :param folder: source folder
+    :param columns: the list of the (column, dtype) pairs to load (by default, all the .npy files of the folder)
+    :return: the dataframe
+    """
+    if columns is None:
+        columns = [(name[:-len(".npy")], None) for name in sorted(os.listdir(folder)) if name.endswith(".npy")]
+    data = {}
+    for column, dtype in columns:
+        path = os.path.join(folder, f"{column}.npy")
+        try:
+            values = np.load(path, mmap_mode="r")
+        except ValueError:
+            values = np.load(path, allow_pickle=True)
+        if dtype == "object" and values.dtype != object:
+            values = values.astype(object)
+        data[column] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def fingerprint(matrix):
+    """
+    Content hash of a sparse matrix
+    """
+    matrix = sp.csr_matrix(matrix)
+    key = hashlib.sha256()
+    key.update(np.asarray(matrix.shape, dtype=np.int64).tobytes())
+    for array in (matrix.indptr, matrix.indices, matrix.data):
+        key.update(np.ascontiguousarray(array).tobytes())
+    return key.hexdigest()
+
+
+def code_fingerprint():
+    """
+    Hash of the source files of the prefiltering and splitting packages
+    """
+    key = hashlib.sha256()
+    for package in _CODE_PACKAGES:
+        folder = os.path.dirname(importlib.import_module(package).__file__)
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(".py"):
+                key.update(f"{package}.{name}".encode())
+                with open(os.path.join(folder, name), "rb") as source:
+                    key.update(source.read())
+    return key.hexdigest()
+
+
+class DataSetCache:
+    """
+    Content-addressed on-disk cache of the loaded, prefiltered, and split dataframes.
+
+    The key combines the hash of the input files with the loading, prefiltering, binarization, splitting, and seed
+    options, the Elliot version, and the hash of the prefiltering and splitting code, so that any change of the data,
+    of the configuration, or of the code that computes the dataframes leads to a different entry.
+    Every split dataframe is stored as a folder of .npy columns, which are memory-mapped back on load.
+    """
+
+    def __init__(self, folder, input_paths, options):
+        """
+        :param folder: root folder of the cache
+        :param input_paths: the input files (or folders) the dataframes are read from
+        :param options: a json-serializable description of the options that affect the dataframes
+        """
+        self._folder = folder
+        key = hashlib.sha256()
+        key.update(json.dumps({"format": _CACHE_FORMAT, "version": elliot.__version__, "code": code_fingerprint(),
+                               "options": options}, sort_keys=True, default=self._to_serializable).encode())
+        for path in input_paths:
+            self._hash_path(key, path)
+        self.key = key.hexdigest()
+        self.path = os.path.join(self._folder, self.key)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Builds the cache of a data configuration, or returns None if the cache is not enabled or not applicable
+        """
+        data_config = config.data_config
+        input_paths = cls._input_paths(data_config)
+        if not getattr(data_config, "cache", False) or data_config.side_information or not input_paths:
+            return None
+        options = {"strategy": data_config.strategy,
+                   "prefiltering": getattr(config, "prefiltering", None),
+                   "splitting": getattr(config, "splitting", None),
+                   "binarize": getattr(config, "binarize", False),
+                   "random_seed": getattr(config, "random_seed", 42)}
+        return cls(cls.folder(config), input_paths, options)
+
+    @classmethod
+    def folder(cls, config):
+        """
+        Root folder of the cache of a data configuration, or None if the cache is not enabled
+        """
+        data_config = config.data_config
+        if not getattr(data_config, "cache", False):
+            return None
+        input_paths = cls._input_paths(data_config)
+        if getattr(data_config, "cache_folder", None) or not input_paths:
+            return getattr(data_config, "cache_folder", None)
+        return os.path.join(os.path.dirname(os.path.abspath(input_paths[0].rstrip(os.sep))), "cache")
+
+    @staticmethod
+    def _input_paths(data_config):
+        if data_config.strategy == "fixed":
+            input_paths = [data_config.train_path, getattr(data_config, "validation_path", None),
+                           data_config.test_path]
+        elif data_config.strategy == "hierarchy":
+            input_paths = [data_config.root_folder]
+        elif data_config.strategy == "dataset":
+            input_paths = [data_config.dataset_path]
+        else:
+            input_paths = []
+        return [p for p in input_paths if p]
+
+    def exists(self):
+        return os.path.isfile(os.path.join(self.path, "manifest.json"))
+
+    def store(self, tuple_list):
+        """
+        Stores the split dataframes in the form [(train_val, test)], where train_val is either the training dataframe
+        or a list of (train, validation) dataframe pairs
+        """
+        os.makedirs(self._folder, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix=f".{self.key}-", dir=self._folder)
+        frames = []
+
+        def save(dataframe):
+            columns = save_frame(dataframe, os.path.join(tmp_path, str(len(frames))))
+            frames.append(columns)
+            return len(frames) - 1
+
+        structure = []
+        for train_val, test in tuple_list:
+            if isinstance(train_val, list):
+                train_val = [[save(train), save(val)] for train, val in train_val]
+            else:
+                train_val = save(train_val)
+            structure.append([train_val, save(test)])
+
+        with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+            json.dump({"format": _CACHE_FORMAT, "structure": structure, "frames": frames}, f)
+        try:
+            os.rename(tmp_path, self.path)
+        except OSError:
+            # another process stored the same entry in the meantime
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def load(self):
+        with open(os.path.join(self.path, "manifest.json")) as f:
+            manifest = json.load(f)
+
+        def load(index):
+            return load_frame(os.path.join(self.path, str(index)), manifest["frames"][index])
+
+        tuple_list = []
+        for train_val, test in manifest["structure"]:
+            if isinstance(train_val, list):
+                train_val = [(load(train), load(val)) for train, val in train_val]
+            else:
+                train_val = load(train_val)
+            tuple_list.append((train_val, load(test)))
+        return tuple_list
+
+    @staticmethod
+    def _hash_path(key, path):
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    key.update(os.path.relpath(file_path, path).encode())
+                    DataSetCache._hash_path(key, file_path)
+        else:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    key.update(chunk)
+
+    @staticmethod
+    def _to_serializable(obj):
+        if isinstance(obj, SimpleNamespace):
+            return vars(obj)
+        return str(obj)
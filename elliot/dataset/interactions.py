@@ -0,0 +1,93 @@
+"""
+Module description:
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from elliot.dataset.dataset_cache import load_frame
+
+_column_names = ['userId', 'itemId', 'rating', 'timestamp']
+
+
+def read_interactions(path, column_names=None):
+    """
+    Reads a user-item interaction file in one of the supported formats:
+        - a folder of .npy arrays, one for each column (e.g., userId.npy, itemId.npy, rating.npy, timestamp.npy),
+          which are memory-mapped instead of being read into memory
+        - a Parquet file (.parquet), which requires an installed Parquet engine (pyarrow or fastparquet)
+        - a headerless tab-separated file (any other path)
+    The rating and timestamp columns are optional in the binary formats.
+    :param path: path of the interaction file (or folder)
+    :param column_names: names of the columns
+    :return: the interaction dataframe
+    """
+    column_names = column_names or _column_names
+    if os.path.isdir(path):
+        columns = [(column, None) for column in column_names if os.path.isfile(os.path.join(path, f"{column}.npy"))]
+        dataframe = load_frame(path, columns)
+    elif path.endswith(".parquet"):
+        dataframe = pd.read_parquet(path)
+        dataframe = dataframe[[column for column in column_names if column in dataframe.columns]]
+    else:
+        return pd.read_csv(path, sep="\t", header=None, names=column_names)
+    missing = [column for column in column_names[:2] if column not in dataframe.columns]
+    if missing:
+        raise ValueError(f"{path} does not contain the {', '.join(missing)} column(s)")
+    return dataframe
+
+
+def convert_tsv(path, folder, column_names=None, chunksize=10_000_000):
+    """
+    Converts a headerless tab-separated interaction file into a folder of .npy arrays readable by read_interactions.
+    The file is streamed in chunks, so the conversion never holds more than one chunk in memory.
+    The column types are those of the first chunk, and the columns that are empty in the first chunk are dropped.
+    :param path: path of the tab-separated file
+    :param folder: destination folder
+    :param column_names: names of the columns
+    :param chunksize: number of rows read at once
+    :return: the number of converted rows
+    """
+    column_names = column_names or _column_names
+    os.makedirs(folder, exist_ok=True)
+    tmp_folder = tempfile.mkdtemp(dir=folder)
+    dtypes = None
+    raw_files = {}
+    n_rows = 0
+    try:
+        for chunk in pd.read_csv(path, sep="\t", header=None, names=column_names, chunksize=chunksize):
+            if dtypes is None:
+                dtypes = {column: chunk[column].dtype for column in column_names if not chunk[column].isna().all()}
+                invalid = [column for column, dtype in dtypes.items() if dtype == object]
+                if invalid:
+                    raise ValueError(f"Column(s) {', '.join(invalid)} of {path} are not numerical")
+                raw_files = {column: open(os.path.join(tmp_folder, column), "wb") for column in dtypes}
+            for column, dtype in dtypes.items():
+                raw_files[column].write(chunk[column].to_numpy(dtype=dtype).tobytes())
+            n_rows += len(chunk)
+        for raw_file in raw_files.values():
+            raw_file.close()
+
+        for column, dtype in (dtypes or {}).items():
+            array = np.lib.format.open_memmap(os.path.join(folder, f"{column}.npy"), mode="w+", dtype=dtype,
+                                              shape=(n_rows,))
+            raw = np.memmap(os.path.join(tmp_folder, column), dtype=dtype, mode="r", shape=(n_rows,)) \
+                if n_rows else np.empty(0, dtype=dtype)
+            for start in range(0, n_rows, chunksize):
+                array[start:start + chunksize] = raw[start:start + chunksize]
+            array.flush()
+            del array, raw
+    finally:
+        for raw_file in raw_files.values():
+            raw_file.close()
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+    return n_rows
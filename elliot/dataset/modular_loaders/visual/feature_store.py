@@ -0,0 +1,166 @@
+"""
+Module description:
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo, Daniele Malitesta'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it, daniele.malitesta@poliba.it'
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from elliot.utils import logging
+
+_STORE_FORMAT = 1
+
+
+class FeatureStore:
+    """
+    Item features of a folder of <item>.npy files, packed into a single memory-mapped matrix.
+
+    The rows follow the item mapping of VisualAttribute, so that a batch of features is gathered with a single array
+    indexing instead of a file read per item. The matrix is packed once, with float32 or float16 values, and stored in
+    a folder next to the features. It is keyed by the name, size, and modification time of the feature files, the
+    item mapping, and the type, so that a change of the features leads to a new matrix, which replaces the old one.
+    """
+
+    def __init__(self, folder, item_mapping, dtype="float32", store_folder=None):
+        """
+        :param folder: folder of the <item>.npy feature files
+        :param item_mapping: dictionary from the item ids to the rows of the matrix
+        :param dtype: float32 or float16
+        :param store_folder: folder of the packed matrices (by default, the feature folder followed by _store)
+        """
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float32, np.float16):
+            raise Exception(f"Feature type {dtype} not supported. Allowed values are: float32, float16")
+        self._open(folder, item_mapping, store_folder)
+
+    def __getitem__(self, rows):
+        """
+        :param rows: the rows (item mapping values) to gather
+        :return: the float32 features of the rows
+        """
+        return np.asarray(self.features[rows], dtype=np.float32)
+
+    def __len__(self):
+        return len(self.features)
+
+    def _open(self, folder, item_mapping, store_folder):
+        folder = folder.rstrip(os.sep)
+        files = self._files(folder)
+        self._paths = [os.path.join(folder, files[item]) for item in sorted(item_mapping, key=item_mapping.get)]
+        store_folder = store_folder or f"{folder}_store"
+        path = os.path.join(store_folder, f"{self._prefix()}{self._key()}.npy")
+        if not os.path.isfile(path):
+            self._pack(path)
+            self._remove_stale(path)
+        self.features = np.load(path, mmap_mode="r")
+        self.shape = self.features.shape[1:]
+
+    def _files(self, folder):
+        return {int(name.split(".")[0]): name for name in os.listdir(folder) if name.endswith(".npy")}
+
+    def _prefix(self):
+        return f"{self.dtype.name}_"
+
+    def _read(self, path):
+        return np.load(path)
+
+    def _row_shape(self):
+        return np.load(self._paths[0], mmap_mode="r").shape if self._paths else ()
+
+    def _key(self):
+        key = hashlib.sha256()
+        key.update(f"{_STORE_FORMAT}|{self._prefix()}|{self.dtype.str}".encode())
+        for path in self._paths:
+            stat = os.stat(path)
+            key.update(f"|{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return key.hexdigest()
+
+    def _remove_stale(self, path):
+        # the matrices with the same prefix packed from previous versions of the files
+        folder, name = os.path.split(path)
+        prefix = self._prefix()
+        for stale in os.listdir(folder):
+            if stale != name and stale.startswith(prefix) and stale.endswith(".npy"):
+                os.remove(os.path.join(folder, stale))
+
+    def _pack(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".npy", dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            features = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.dtype,
+                                                 shape=(len(self._paths), *self._row_shape()))
+            for row, file_path in enumerate(self._paths):
+                values = self._read(file_path)
+                if values is not None:
+                    features[row] = values
+            features.flush()
+            del features
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+class ImageStore(FeatureStore):
+    """
+    Item images of a folder of <item>.<extension> files, decoded, converted to RGB, and resized once, and packed into
+    a single memory-mapped uint8 array of shape (items, height, width, 3).
+
+    The rows follow the item mapping of VisualAttribute, so that the training and evaluation pipelines gather a batch
+    of images with a single array indexing and no decoding. The array is keyed by the name, size, and modification
+    time of the image files, the item mapping, and the output size, so that a change of the images leads to a new
+    array, which replaces the old one of the same size. An image that cannot be decoded is logged and stored as a black
+    image.
+    """
+
+    def __init__(self, folder, item_mapping, output_image_size, store_folder=None):
+        """
+        :param folder: folder of the item images
+        :param item_mapping: dictionary from the item ids to the rows of the array
+        :param output_image_size: (width, height) of the resized images
+        :param store_folder: folder of the packed arrays (by default, the image folder followed by _store)
+        """
+        self.dtype = np.dtype(np.uint8)
+        self.output_image_size = tuple(output_image_size)
+        self.logger = logging.get_logger(self.__class__.__name__)
+        self._open(folder, item_mapping, store_folder)
+
+    def __getitem__(self, rows):
+        """
+        :param rows: the rows (item mapping values) to gather
+        :return: the uint8 images of the rows
+        """
+        return np.asarray(self.features[rows])
+
+    def _files(self, folder):
+        return {int(name.split(".")[0]): name for name in os.listdir(folder)
+                if os.path.isfile(os.path.join(folder, name))}
+
+    def _prefix(self):
+        width, height = self.output_image_size
+        return f"{self.dtype.name}_{width}x{height}_"
+
+    def _read(self, path):
+        try:
+            image = Image.open(path)
+            image.load()
+        except (ValueError, OSError) as error:
+            # the row is left black, and the array is packed again when the file changes
+            self.logger.error(f'Image at path {path} was not loaded correctly, it is stored as a black image: {error}')
+            return None
+        if image.mode != 'RGB':
+            image = image.convert(mode='RGB')
+        return np.array(image.resize(self.output_image_size))
+
+    def _row_shape(self):
+        width, height = self.output_image_size
+        return height, width, 3
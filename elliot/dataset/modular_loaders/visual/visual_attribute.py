@@ -5,6 +5,7 @@ import numpy as np
 from types import SimpleNamespace
 
 from elliot.dataset.modular_loaders.abstract_loader import AbstractLoader
+from elliot.dataset.modular_loaders.visual.feature_store import FeatureStore, ImageStore
 
 
 class VisualAttribute(AbstractLoader):
@@ -14,6 +15,9 @@ class VisualAttribute(AbstractLoader):
         self.visual_pca_feature_folder_path = getattr(ns, "visual_pca_features", None)
         self.visual_feat_map_feature_folder_path = getattr(ns, "visual_feat_map_features", None)
         self.images_folder_path = getattr(ns, "images_src_folder", None)
+        self.features_dtype = getattr(ns, "features_dtype", "float32")
+        self.features_store_folder = getattr(ns, "features_store_folder", None)
+        self._feature_stores = {}
 
         self.item_mapping = {}
         self.visual_features_shape = None
@@ -50,9 +54,35 @@ class VisualAttribute(AbstractLoader):
         ns.visual_pca_features_shape = self.visual_pca_features_shape
         ns.visual_feat_map_features_shape = self.visual_feat_map_features_shape
         ns.image_size_tuple = self.image_size_tuple
+        ns.feature_store = self.feature_store
+        ns.image_store = self.image_store
 
         return ns
 
+    def feature_store(self, folder):
+        """
+        The features of a folder packed into a memory-mapped matrix, whose rows follow the item mapping
+        """
+        if folder not in self._feature_stores:
+            store_folder = os.path.join(self.features_store_folder, os.path.basename(folder.rstrip(os.sep))) \
+                if self.features_store_folder else None
+            self._feature_stores[folder] = FeatureStore(folder, self.item_mapping, self.features_dtype, store_folder)
+        return self._feature_stores[folder]
+
+    def image_store(self):
+        """
+        The images of the image folder, decoded and resized to the output image size once, and packed into a
+        memory-mapped uint8 array whose rows follow the item mapping
+        """
+        key = (self.images_folder_path, self.image_size_tuple)
+        if key not in self._feature_stores:
+            store_folder = os.path.join(self.features_store_folder,
+                                        os.path.basename(self.images_folder_path.rstrip(os.sep))) \
+                if self.features_store_folder else None
+            self._feature_stores[key] = ImageStore(self.images_folder_path, self.item_mapping,
+                                                   self.image_size_tuple, store_folder)
+        return self._feature_stores[key]
+
     def check_items_in_folder(self) -> t.Set[int]:
         items = set()
         if self.visual_feature_folder_path:
@@ -71,7 +101,7 @@ class VisualAttribute(AbstractLoader):
             self.visual_feat_map_features_shape = np.load(os.path.join(self.visual_feat_map_feature_folder_path,
                                                           items_folder[0])).shape
         if self.images_folder_path:
-            items_folder = os.listdir(self.visual_feature_folder_path)
+            items_folder = os.listdir(self.images_folder_path)
             items = items.union(set([int(f.split('.')[0]) for f in items_folder]))
 
         if items:
@@ -33,7 +33,7 @@ class Sampler:
             ui = ui_dict[u]
             lui = lui_dict[u]
             if lui == n_items:
-                sample()
+                return sample()
             i = ui[r_int(lui)]
 
             j = r_int(n_items)
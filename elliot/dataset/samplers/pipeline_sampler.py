@@ -8,18 +8,23 @@ __author__ = 'Vito Walter Anelli, Claudio Pomo, Daniele Malitesta'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it, daniele.malitesta@poliba.it'
 
 import tensorflow as tf
-from PIL import Image
 
 import numpy as np
 import random
 
 
 class Sampler:
-    def __init__(self, indexed_ratings, item_indices, images_path, output_image_size, epochs):
+    def __init__(self, indexed_ratings, item_indices, images, epochs):
+        """
+        :param indexed_ratings: dictionary of the (private) training interactions of each user
+        :param item_indices: rows of the image store of the (private) items
+        :param images: the ImageStore of the item images
+        :param epochs: number of epochs
+        """
         np.random.seed(42)
         random.seed(42)
         self._indexed_ratings = indexed_ratings
-        self._item_indices = item_indices
+        self._item_indices = np.asarray(item_indices)
         self._users = list(self._indexed_ratings.keys())
         self._nusers = len(self._users)
         self._items = list({k for a in self._indexed_ratings.values() for k in a.keys()})
@@ -27,34 +32,19 @@ class Sampler:
         self._ui_dict = {u: list(set(indexed_ratings[u])) for u in indexed_ratings}
         self._lui_dict = {u: len(v) for u, v in self._ui_dict.items()}
 
-        self._images_path = images_path
-        self._output_image_size = output_image_size
+        self._images = images
         self._epochs = epochs
 
     def read_images_triple(self, user, pos, neg):
-        # load positive and negative item images
-        im_pos = Image.open(self._images_path + str(pos.numpy()) + '.jpg')
-        im_neg = Image.open(self._images_path + str(neg.numpy()) + '.jpg')
-
-        try:
-            im_pos.load()
-        except ValueError:
-            print(f'Image at path {pos}.jpg was not loaded correctly!')
-
-        try:
-            im_neg.load()
-        except ValueError:
-            print(f'Image at path {neg}.jpg was not loaded correctly!')
-
-        if im_pos.mode != 'RGB':
-            im_pos = im_pos.convert(mode='RGB')
-        if im_neg.mode != 'RGB':
-            im_neg = im_neg.convert(mode='RGB')
-
-        im_pos = (np.array(im_pos.resize(self._output_image_size)) - np.float32(127.5)) / np.float32(127.5)
-        im_neg = (np.array(im_neg.resize(self._output_image_size)) - np.float32(127.5)) / np.float32(127.5)
+        # gather positive and negative item images of the batch
+        im_pos = self._normalize(self._images[self._item_indices[pos.numpy()]])
+        im_neg = self._normalize(self._images[self._item_indices[neg.numpy()]])
         return user.numpy(), pos.numpy(), im_pos, neg.numpy(), im_neg
 
+    @staticmethod
+    def _normalize(images):
+        return (images - np.float32(127.5)) / np.float32(127.5)
+
     def step(self, events: int, batch_size: int):
         r_int = np.random.randint
         n_users = self._nusers
@@ -101,8 +91,8 @@ class Sampler:
             return b
         all_triples = self.step(events=num_users, batch_size=batch_size)
         data = tf.data.Dataset.from_tensor_slices(all_triples)
-        data = data.map(load_func, num_parallel_calls=tf.data.experimental.AUTOTUNE)
         data = data.batch(batch_size=batch_size)
+        data = data.map(load_func, num_parallel_calls=tf.data.experimental.AUTOTUNE)
         data = data.prefetch(buffer_size=tf.data.experimental.AUTOTUNE)
 
         return data
@@ -118,24 +108,13 @@ class Sampler:
             return b
 
         data = tf.data.Dataset.from_tensor_slices(self._items)
-        data = data.map(load_func, num_parallel_calls=tf.data.experimental.AUTOTUNE)
         data = data.batch(batch_size=batch_size)
+        data = data.map(load_func, num_parallel_calls=tf.data.experimental.AUTOTUNE)
         data = data.prefetch(buffer_size=tf.data.experimental.AUTOTUNE)
 
         return data
 
     # this is only for evaluation
     def read_image(self, item):
-        # load positive image
-        im = Image.open(self._images_path + str(item.numpy()) + '.jpg')
-
-        try:
-            im.load()
-        except ValueError:
-            print(f'Image at path {item}.jpg was not loaded correctly!')
-
-        if im.mode != 'RGB':
-            im = im.convert(mode='RGB')
-
-        im = (np.array(im.resize(self._output_image_size)) - np.float32(127.5)) / np.float32(127.5)
-        return item, im
+        # gather the item images of the batch
+        return item, self._normalize(self._images[self._item_indices[item.numpy()]])
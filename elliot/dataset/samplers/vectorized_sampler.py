@@ -0,0 +1,111 @@
+"""
+Module description:
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import queue
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class Sampler:
+    """
+    Pairwise (user, positive item, negative item) sampler that draws whole batches with NumPy.
+
+    Users are drawn uniformly among the ones with at least one positive and one negative item, positives uniformly
+    in the user profile, and negatives uniformly among the unrated items. Negatives are checked against the sorted
+    (user, item) keys of the training matrix, and only the rejected ones are drawn again.
+    Batches are int32 arrays of shape (batch, 1). They can be prepared by a background thread, which draws them in
+    the same order (hence, with the same random stream) as the foreground sampling.
+    """
+
+    def __init__(self, sp_i_train, seed=42, prefetch=0):
+        """
+        :param sp_i_train: the sparse user-item training matrix
+        :param seed: random seed
+        :param prefetch: number of batches prepared in advance by a background thread (0 disables the thread)
+        """
+        train = sp.csr_matrix(sp_i_train)
+        train.sum_duplicates()
+        train.sort_indices()
+        self._rng = np.random.default_rng(seed)
+        self._prefetch = prefetch
+        self._n_items = train.shape[1]
+        self._indptr = train.indptr.astype(np.int64)
+        self._indices = train.indices.astype(np.int32)
+        self._profile_size = np.diff(self._indptr)
+        self._users = np.flatnonzero((self._profile_size > 0) & (self._profile_size < self._n_items)).astype(np.int32)
+        rows = np.repeat(np.arange(train.shape[0], dtype=np.int64), self._profile_size)
+        self._keys = rows * self._n_items + self._indices
+
+    def sample(self, n):
+        """
+        :param n: number of triples
+        :return: the int32 arrays of users, positive items, and negative items
+        """
+        rng = self._rng
+        users = self._users[rng.integers(len(self._users), size=n)]
+        positives = self._indices[self._indptr[users] +
+                                  (rng.random(n) * self._profile_size[users]).astype(np.int64)]
+        negatives = rng.integers(self._n_items, size=n, dtype=np.int32)
+        rejected = np.arange(n)
+        while len(rejected):
+            keys = users[rejected].astype(np.int64) * self._n_items + negatives[rejected]
+            position = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+            rejected = rejected[self._keys[position] == keys]
+            negatives[rejected] = rng.integers(self._n_items, size=len(rejected), dtype=np.int32)
+        return users, positives, negatives
+
+    def _batch(self, n):
+        bui, bii, bij = self.sample(n)
+        return bui[:, None], bii[:, None], bij[:, None]
+
+    def step(self, events: int, batch_size: int):
+        sizes = (min(batch_size, events - batch_start) for batch_start in range(0, events, batch_size))
+        if self._prefetch < 1:
+            for n in sizes:
+                yield self._batch(n)
+            return
+
+        batches = queue.Queue(maxsize=self._prefetch)
+        stopped = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce():
+            try:
+                for n in sizes:
+                    if not put(self._batch(n)):
+                        return
+                put(done)
+            except BaseException as e:
+                put(e)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is done:
+                    break
+                if isinstance(batch, BaseException):
+                    raise batch
+                yield batch
+        finally:
+            # the consumer may stop early: release the producer before waiting for it
+            stopped.set()
+            producer.join()
@@ -32,6 +32,8 @@ from elliot.utils import logging
 from . import metrics
 from . import popularity_utils
 from . import relevance
+from .metrics.accuracy.batched_accuracy import BatchedAccuracy
+from .metrics.base_metric import BaseMetric
 
 
 class Evaluator(object):
@@ -51,7 +53,12 @@ class Evaluator(object):
             raise Exception("Cutoff values must be smaller than recommendation list length (top_k)")
         self._rel_threshold = data.config.evaluation.relevance_threshold
         self._paired_ttest = self._data.config.evaluation.paired_ttest
+        self._wilcoxon_test = getattr(self._data.config.evaluation, "wilcoxon_test", False)
+        self._statistical_tests = bool(self._paired_ttest or self._wilcoxon_test)
         self._metrics = metrics.parse_metrics(data.config.evaluation.simple_metrics)
+        self._batched_metrics = BatchedAccuracy.supported_metrics(self._metrics)
+        self._batched_length = None if any(m.needs_full_recommendations() for m in self._batched_metrics) \
+            else max(self._k)
         self._complex_metrics = getattr(data.config.evaluation, "complex_metrics", dict())
         #TODO integrate complex metrics in validation metric (the problem is that usually complex metrics generate a complex name that does not match with the base name when looking for the loss value)
         # if _validation_metric.lower() not in [m.lower()
@@ -82,8 +89,9 @@ class Evaluator(object):
         :return:
         """
         result_dict = {}
+        batched_accuracy = self._get_batched_accuracy(recommendations)
         for k in self._k:
-            val_results, val_statistical_results, test_results, test_statistical_results = self.eval_at_k(recommendations, k)
+            val_results, val_statistical_results, test_results, test_statistical_results = self.eval_at_k(recommendations, k, batched_accuracy)
             local_result_dict ={"val_results": val_results,
                                 "val_statistical_results": val_statistical_results,
                                 "test_results": test_results,
@@ -91,13 +99,16 @@ class Evaluator(object):
             result_dict[k] = local_result_dict
         return result_dict
 
-    def eval_at_k(self, recommendations, k):
+    def eval_at_k(self, recommendations, k, batched_accuracy=None):
         val_test = ["Validation", "Test"]
         result_list = []
+        if batched_accuracy is None:
+            batched_accuracy = self._get_batched_accuracy(recommendations)
         for p, (test_data, eval_objs) in enumerate(self._get_test_data()):
             if eval_objs is not None:
                 eval_objs.cutoff = k
-            results, statistical_results = self._process_test_data(recommendations[p], test_data, eval_objs, val_test[p])
+            results, statistical_results = self._process_test_data(recommendations[p], test_data, eval_objs, val_test[p],
+                                                                   batched_accuracy[p])
             result_list.append((results, statistical_results))
 
         if (not result_list[0][0]):
@@ -114,7 +125,22 @@ class Evaluator(object):
                  self._evaluation_objects if hasattr(self, '_evaluation_objects') else None)
                 ]
 
-    def _process_test_data(self, recommendations, test_data, eval_objs, val_test):
+    def _get_batched_accuracy(self, recommendations):
+        """
+        Batched accuracy engines of the validation and test splits, built once per recommendation dict
+        """
+        if not self._batched_metrics:
+            return [None, None]
+        return [BatchedAccuracy(recommendations[p], eval_objs, self._batched_length)
+                if test_data and eval_objs is not None else None
+                for p, (test_data, eval_objs) in enumerate(self._get_test_data())]
+
+    def _build_metric(self, metric, recommendations, eval_objs, batched_accuracy):
+        if batched_accuracy is not None and BatchedAccuracy.supports(metric):
+            return batched_accuracy.get(metric, eval_objs.cutoff)
+        return metric(recommendations, self._data.config, self._params, eval_objs)
+
+    def _process_test_data(self, recommendations, test_data, eval_objs, val_test, batched_accuracy=None):
         if (not test_data) or (not eval_objs):
             return None, None
         else:
@@ -122,11 +148,19 @@ class Evaluator(object):
             rounding_factor = 5
             eval_start_time = time()
 
-            metric_objects = [m(recommendations, self._data.config, self._params, eval_objs) for m in self._metrics]
+            metric_objects = [self._build_metric(m, recommendations, eval_objs, batched_accuracy) for m in self._metrics]
+
+            # per-user values are computed once and feed both the aggregate value and the statistical tests
+            statistical_results = {}
+            if self._statistical_tests:
+                statistical_results = {metric_object.name(): metric_object.eval_user_metric()
+                                       for metric_object in metric_objects
+                                       if isinstance(metric_object, metrics.StatisticalMetric)}
+
             for metric in self._complex_metrics:
                 metric_objects.extend(metrics.parse_metric(metric["metric"])(recommendations, self._data.config,
                                                                              self._params, eval_objs, metric).get())
-            results = {m.name(): m.eval() for m in metric_objects}
+            results = {m.name(): self._eval_metric(m, statistical_results) for m in metric_objects}
 
             str_results = {k: str(round(v, rounding_factor)) for k, v in results.items()}
             # res_print = "\t".join([":".join(e) for e in str_results.items()])
@@ -137,15 +171,15 @@ class Evaluator(object):
             self.logger.info(f"Results")
             [self.logger.info("\t".join(e)) for e in str_results.items()]
 
-            statistical_results = {}
-            if self._paired_ttest:
-                statistical_results = {metric_object.name(): metric_object.eval_user_metric()
-                                       for metric_object in
-                                       [m(recommendations, self._data.config, self._params, eval_objs) for m
-                                        in self._metrics]
-                                       if isinstance(metric_object, metrics.StatisticalMetric)}
             return results, statistical_results
 
+    @staticmethod
+    def _eval_metric(metric_object, statistical_results):
+        user_values = statistical_results.get(metric_object.name())
+        if user_values is not None and type(metric_object).eval is BaseMetric.eval:
+            return np.average(list(user_values.values()))
+        return metric_object.eval()
+
     def _compute_needed_recommendations(self):
         full_recommendations_metrics = any([m.needs_full_recommendations() for m in self._metrics])
         full_recommendations_additional_metrics = any([metrics.parse_metric(metric["metric"]).needs_full_recommendations() for metric in self._complex_metrics])
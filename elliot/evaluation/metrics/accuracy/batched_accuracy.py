@@ -0,0 +1,166 @@
+"""
+This is the batched implementation of the accuracy metrics.
+It turns the recommendation lists into hit arrays once, and computes every metric for every cutoff with vectorized
+operations over them.
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
+
+from elliot.evaluation.metrics.accuracy.AUC import AUC
+from elliot.evaluation.metrics.accuracy.f1 import F1
+from elliot.evaluation.metrics.accuracy.hit_rate import HR
+from elliot.evaluation.metrics.accuracy.map import MAP
+from elliot.evaluation.metrics.accuracy.mar import MAR
+from elliot.evaluation.metrics.accuracy.mrr import MRR
+from elliot.evaluation.metrics.accuracy.ndcg import nDCG
+from elliot.evaluation.metrics.accuracy.precision import Precision
+from elliot.evaluation.metrics.accuracy.recall import Recall
+from elliot.evaluation.metrics.metrics_utils import ProxyMetric, ProxyStatisticalMetric
+
+
+class BatchedAccuracy(object):
+    """
+    Vectorized engine for nDCG, Precision, Recall, HR, MAP, MAR, MRR, F1 and AUC.
+
+    The recommendations of the users with at least one relevant item are matched against the relevance matrix of
+    the split, and only the hits are kept as (user, position, gain) arrays. Each metric at each cutoff is then a
+    weighted bincount over the hits ranked before the cutoff.
+    """
+
+    _user_metrics = {
+        nDCG: "user_ndcg",
+        Precision: "user_precision",
+        Recall: "user_recall",
+        HR: "user_hr",
+        MAP: "user_map",
+        MAR: "user_mar",
+        MRR: "user_mrr",
+        F1: "user_f1",
+    }
+
+    def __init__(self, recommendations, evaluation_objects, length=None):
+        """
+        Constructor
+        :param recommendations: recommendations in the form {user: [(item1,value1),...]}
+        :param evaluation_objects: evaluation objects of the split (relevance, data, num_items)
+        :param length: numerical threshold to truncate the recommendation lists (None keeps full lists)
+        """
+        self._evaluation_objects = evaluation_objects
+        self._relevance_matrix = evaluation_objects.relevance.relevance_matrix
+
+        users = list(recommendations.keys())
+        user_rows = self._relevance_matrix.users.get_indexer(users)
+        keep = user_rows >= 0
+        self._users = [u for u, k in zip(users, keep) if k]
+        self._user_rows = user_rows[keep]
+        self._num_relevant = self._relevance_matrix.num_relevant[self._user_rows]
+
+        user_recommendations = [recommendations[u][:length] for u in self._users]
+        lengths = np.fromiter(map(len, user_recommendations), dtype=np.int64, count=len(user_recommendations))
+        flat_items = list(map(itemgetter(0), chain.from_iterable(user_recommendations)))
+        cols = self._relevance_matrix.items.get_indexer(flat_items) if flat_items else np.empty(0, dtype=np.int64)
+        users_index = np.repeat(np.arange(len(self._users)), lengths)
+        positions = np.arange(len(cols)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+        valid = cols >= 0
+        gains = np.zeros(len(cols))
+        if valid.any():
+            gains[valid] = np.asarray(self._relevance_matrix.gains[self._user_rows[users_index[valid]],
+                                                                   cols[valid]]).ravel()
+        hits = gains != 0
+        self._hit_users = users_index[hits]
+        self._hit_positions = positions[hits]
+        self._hit_gains = gains[hits]
+
+        self._first_hit = np.full(len(self._users), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(self._first_hit, self._hit_users, self._hit_positions)
+
+    @classmethod
+    def supports(cls, metric):
+        return metric in cls._user_metrics or metric is AUC
+
+    @classmethod
+    def supported_metrics(cls, metrics):
+        return [m for m in metrics if cls.supports(m)]
+
+    def get(self, metric, cutoff):
+        """
+        Metric object for a supported metric class, compatible with the per-user metrics
+        :param metric: metric class
+        :param cutoff: numerical threshold to limit the recommendation list
+        :return: a metric object exposing name(), eval() and (if per-user) eval_user_metric()
+        """
+        if metric is AUC:
+            return ProxyMetric(name=AUC.name(), val=self.auc(), needs_full_recommendations=True)
+        user_values = getattr(self, self._user_metrics[metric])(cutoff)
+        return ProxyStatisticalMetric(name=metric.name(),
+                                      val=np.average(user_values),
+                                      user_val=dict(zip(self._users, user_values.tolist())),
+                                      needs_full_recommendations=False)
+
+    def _hit_count(self, cutoff):
+        return np.bincount(self._hit_users[self._hit_positions < cutoff], minlength=len(self._users))
+
+    def user_precision(self, cutoff):
+        return self._hit_count(cutoff) / cutoff
+
+    def user_recall(self, cutoff):
+        return self._hit_count(cutoff) / self._num_relevant
+
+    def user_hr(self, cutoff):
+        return (self._hit_count(cutoff) > 0).astype(np.int64)
+
+    def user_f1(self, cutoff):
+        p = self.user_precision(cutoff)
+        r = self.user_recall(cutoff)
+        num = 2 * p * r
+        den = p + r
+        return np.divide(num, den, out=np.zeros_like(num), where=den != 0)
+
+    def user_mrr(self, cutoff):
+        found = self._first_hit < cutoff
+        mrr = np.zeros(len(self._users))
+        mrr[found] = 1 / (self._first_hit[found] + 1)
+        return mrr
+
+    def _cumulative_hits(self, cutoff):
+        keep = self._hit_positions < cutoff
+        hits = np.zeros((len(self._users), cutoff), dtype=np.int64)
+        np.add.at(hits, (self._hit_users[keep], self._hit_positions[keep]), 1)
+        return np.cumsum(hits, axis=1)
+
+    def user_map(self, cutoff):
+        return np.average(self._cumulative_hits(cutoff) / np.arange(1, cutoff + 1), axis=1)
+
+    def user_mar(self, cutoff):
+        return np.average(self._cumulative_hits(cutoff) / self._num_relevant[:, None], axis=1)
+
+    def user_ndcg(self, cutoff):
+        keep = self._hit_positions < cutoff
+        dcg = np.bincount(self._hit_users[keep],
+                          weights=self._hit_gains[keep] *
+                                  self._relevance_matrix.logarithmic_ranking_discount(self._hit_positions[keep]),
+                          minlength=len(self._users)).astype(float)
+        idcg = self._relevance_matrix.ideal_dcg(cutoff)[self._user_rows]
+        return np.divide(dcg, idcg, out=np.zeros_like(dcg), where=dcg > 0)
+
+    def auc(self):
+        """
+        Global AUC over the whole recommendation lists
+        :return: the average of the AUC values of every test item retrieved
+        """
+        train_dict = self._evaluation_objects.data.train_dict
+        train_size = np.fromiter((len(train_dict[u]) for u in self._users), dtype=np.int64, count=len(self._users))
+        neg_num = self._evaluation_objects.num_items - train_size - self._num_relevant + 1
+        hits_per_user = np.bincount(self._hit_users, minlength=len(self._users))
+        hit_ranks = np.arange(len(self._hit_users)) - np.repeat(np.cumsum(hits_per_user) - hits_per_user,
+                                                                hits_per_user)
+        user_neg_num = neg_num[self._hit_users]
+        return np.average((user_neg_num - self._hit_positions + hit_ranks) / user_neg_num)
@@ -10,6 +10,11 @@ __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it, alejandro.bell
 import typing as t
 import math
 from abc import ABC, abstractmethod
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
 
 
 class Relevance(object):
@@ -18,6 +23,7 @@ class Relevance(object):
         self._rel_threshold = rel_threshold
         self._binary_relevance = None
         self._discounted_relevance = None
+        self._relevance_matrix = None
 
     def get_test(self):
         return self._test
@@ -38,6 +44,14 @@ class Relevance(object):
             self._binary_relevance = BinaryRelevance(self._test, self._rel_threshold)
         return self._binary_relevance
 
+    ############## Sparse relevance matrix ##############
+
+    @property
+    def relevance_matrix(self):
+        if self._relevance_matrix is None:
+            self._relevance_matrix = RelevanceMatrix(self._test, self._rel_threshold)
+        return self._relevance_matrix
+
 
 class AbstractRelevanceSingleton(ABC):
 
@@ -95,3 +109,53 @@ class BinaryRelevance(AbstractRelevanceSingleton):
     def get_rel(self, user, item):
         return 1 if item in self._binary_relevance.get(user, []) else 0
 
+
+class RelevanceMatrix(object):
+    """
+    Sparse users x items view of the relevant test items.
+    The stored values are the discounted gains (rel = 2**(score - threshold + 1) - 1), hence every stored entry is
+    also a binary hit. Only users with at least one relevant item have a row.
+    """
+    def __init__(self, test, rel_threshold):
+        gains = {u: {i: 2 ** (score - rel_threshold + 1) - 1 for i, score in test_items.items() if score >= rel_threshold}
+                 for u, test_items in test.items()}
+        gains = {u: user_gains for u, user_gains in gains.items() if user_gains}
+
+        self.users = pd.Index(list(gains.keys()))
+        self.num_relevant = np.fromiter(map(len, gains.values()), dtype=np.int64, count=len(gains))
+        cols, items = pd.factorize(pd.Series(list(chain.from_iterable(gains.values()))))
+        self.items = pd.Index(items)
+        rows = np.repeat(np.arange(len(self.users)), self.num_relevant)
+        values = np.fromiter(chain.from_iterable(user_gains.values() for user_gains in gains.values()),
+                             dtype=np.float64, count=len(cols))
+        self.gains = sp.csr_matrix((values, (rows, cols)), shape=(len(self.users), len(self.items)))
+        self._ideal_dcg = {}
+        self._discount = np.empty(0)
+
+    def logarithmic_ranking_discount(self, positions):
+        """
+        Vectorized logarithmic discount, tabulated with the same scalar formula of the per-user metrics
+        :param positions: array of 0-based ranking positions
+        :return: array of discounts
+        """
+        if len(positions) and positions.max() >= len(self._discount):
+            self._discount = np.array([AbstractRelevanceSingleton.logarithmic_ranking_discount(r)
+                                       for r in range(max(positions.max() + 1, 2 * len(self._discount)))])
+        return self._discount[positions]
+
+    def ideal_dcg(self, cutoff):
+        """
+        Ideal Discounted Cumulative Gain of every user row
+        :param cutoff: numerical threshold to limit the ideal ranking
+        :return: array of IDCG@cutoff values aligned with self.users
+        """
+        if cutoff not in self._ideal_dcg:
+            rows = np.repeat(np.arange(len(self.users)), self.num_relevant)
+            order = np.lexsort((-self.gains.data, rows))
+            ranks = np.arange(len(order)) - self.gains.indptr[rows]
+            keep = ranks < cutoff
+            self._ideal_dcg[cutoff] = np.bincount(rows[keep],
+                                                  weights=self.gains.data[order][keep] *
+                                                          self.logarithmic_ranking_discount(ranks[keep]),
+                                                  minlength=len(self.users))
+        return self._ideal_dcg[cutoff]
@@ -7,15 +7,35 @@ __version__ = '0.3.1'
 __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
+import inspect
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
 from types import SimpleNamespace
 import typing as t
 import numpy as np
 import logging as pylog
 
+from elliot.hyperoptimization.parallel_trials import current_trial_id
 from elliot.utils import logging
 
 from hyperopt import STATUS_OK
 
+_coordinator = None
+
+
+def _init_worker(coordinator):
+    global _coordinator
+    _coordinator = coordinator
+    logging.restart_listeners()
+
+
+def _train_fold(model_params, trainval_index):
+    rec_name = _coordinator.rec_name
+    logging.redirect_logger(rec_name, _coordinator.base.path_log_folder,
+                            f"test={_coordinator.test_fold_index + 1}_fold={trainval_index + 1}")
+    return _coordinator.train_fold(model_params, trainval_index)
+
 
 class ModelCoordinator(object):
     """
@@ -47,38 +67,23 @@ class ModelCoordinator(object):
         """
         sampled_namespace = SimpleNamespace(**args)
         model_params = SimpleNamespace(**self.params[0].__dict__)
+        # the explored values, so that models can share the work among the explorations
+        model_params.search_space = {k: getattr(self.params[0], k) for k in args}
 
         self.logger.info("Hyperparameter tuning exploration:")
         for (k, v) in sampled_namespace.__dict__.items():
             model_params.__setattr__(k, v)
             self.logger.info(f"{k} set to {model_params.__getattribute__(k)}")
 
-        losses = []
-        results = []
-        for trainval_index, data_obj in enumerate(self.data_objs):
-            self.logger.info(f"Exploration: Hyperparameter exploration number {self.model_config_index+1}")
-            self.logger.info(f"Exploration: Test Fold exploration number {self.test_fold_index+1}")
-            self.logger.info(f"Exploration: Train-Validation Fold exploration number {trainval_index+1}")
-            model = self.model_class(data=data_obj, config=self.base, params=model_params)
-            model.train()
-            losses.append(model.get_loss())
-            results.append(model.get_results())
+        # the forked workers of ParallelTrials do not share the counter, the trial id gives the same number
+        trial_id = current_trial_id()
+        config_index = self.model_config_index if trial_id is None else trial_id
+        self.logger.info(f"Exploration: Hyperparameter exploration number {config_index+1}")
+        folds = self.train_folds(model_params)
 
         self.model_config_index += 1
 
-        loss = np.average(losses)
-        results = self._average_results(results)
-
-        return {
-            'loss': loss,
-            'status': STATUS_OK,
-            'params': model.get_params(),
-            'val_results': {k: result_dict["val_results"] for k, result_dict in results.items()},
-            'val_statistical_results': {k: result_dict["val_statistical_results"] for k, result_dict in model.get_results().items()},
-            'test_results': {k: result_dict["test_results"] for k, result_dict in results.items()},
-            'test_statistical_results': {k: result_dict["test_statistical_results"] for k, result_dict in model.get_results().items()},
-            'name': model.name
-        }
+        return self._fold_summary(folds)
 
     def single(self):
         """
@@ -92,28 +97,91 @@ class ModelCoordinator(object):
         for k, v in self.params.__dict__.items():
             self.logger.info(f"{k} set to {v}")
 
-        losses = []
-        results = []
-        for trainval_index, data_obj in enumerate(self.data_objs):
-            self.logger.info(f"Exploration: Test Fold exploration number {self.test_fold_index+1}")
-            self.logger.info(f"Exploration: Train-Validation Fold exploration number {trainval_index+1}")
-            model = self.model_class(data=data_obj, config=self.base, params=self.params)
-            model.train()
-            losses.append(model.get_loss())
-            results.append(model.get_results())
+        return self._fold_summary(self.train_folds(self.params))
 
+    def train_folds(self, model_params):
+        """
+        Trains and evaluates a configuration on every Train-Validation fold.
+        With the fold_workers meta option the folds are trained by a pool of forked processes, each one logging to
+        its own file, as many as the available memory allows
+        :param model_params: a SimpleNamespace that contains the hyper-parameters of the model
+        :return: the list of the (loss, results, params, name) tuples of the folds
+        """
+        workers = self._get_fold_workers(model_params.meta)
+        if workers < 2:
+            return [self.train_fold(model_params, trainval_index) for trainval_index in range(len(self.data_objs))]
+
+        self.logger.info(f"Training {len(self.data_objs)} Train-Validation Folds with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork"),
+                                 initializer=_init_worker, initargs=(self,)) as executor:
+            futures = [executor.submit(_train_fold, self._worker_params(model_params, trainval_index), trainval_index)
+                       for trainval_index in range(len(self.data_objs))]
+            return [future.result() for future in futures]
+
+    def _worker_params(self, model_params, trainval_index):
+        # as in the serial loop, only the last fold leaves its recommendations and weights on disk
+        if trainval_index == len(self.data_objs) - 1:
+            return model_params
+        meta = SimpleNamespace(**model_params.meta.__dict__)
+        meta.save_recs = False
+        meta.save_weights = False
+        return SimpleNamespace(**{**model_params.__dict__, "meta": meta})
+
+    def train_fold(self, model_params, trainval_index):
+        self.logger.info(f"Exploration: Test Fold exploration number {self.test_fold_index+1}")
+        self.logger.info(f"Exploration: Train-Validation Fold exploration number {trainval_index+1}")
+        model = self.model_class(data=self.data_objs[trainval_index], config=self.base, params=model_params)
+        model.train()
+        return model.get_loss(), model.get_results(), model.get_params(), model.name
+
+    @property
+    def rec_name(self):
+        package_name = inspect.getmodule(self.model_class).__package__
+        return f"external.{self.model_class.__name__}" if "external" in package_name else self.model_class.__name__
+
+    def _get_fold_workers(self, meta):
+        workers = getattr(meta, "fold_workers", 1)
+        workers = min(workers if workers > 0 else os.cpu_count(), len(self.data_objs))
+        if workers < 2 or "fork" not in mp.get_all_start_methods():
+            return 1
+
+        fold_memory = getattr(meta, "fold_memory", None)
+        if fold_memory is not None:
+            fold_memory = fold_memory * 2 ** 30
+        else:
+            # dense models hold a few users x items and items x items float matrices
+            data = self.data_objs[0]
+            fold_memory = 8 * data.num_items * (data.num_users + data.num_items)
+        available_memory = self._get_available_memory()
+        if available_memory is not None:
+            memory_workers = max(1, int(available_memory // max(1, fold_memory)))
+            if memory_workers < workers:
+                self.logger.info(f"Fold workers limited to {memory_workers} by the available memory")
+                workers = memory_workers
+        return workers
+
+    @staticmethod
+    def _get_available_memory():
+        try:
+            return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (AttributeError, ValueError, OSError):
+            return None
+
+    def _fold_summary(self, folds):
+        losses, results, params, name = zip(*folds)
+        last_results = results[-1]
         loss = np.average(losses)
-        results = self._average_results(results)
+        results = self._average_results(list(results))
 
         return {
             'loss': loss,
             'status': STATUS_OK,
-            'params': model.get_params(),
+            'params': params[-1],
             'val_results': {k: result_dict["val_results"] for k, result_dict in results.items()},
-            'val_statistical_results': {k: result_dict["val_statistical_results"] for k, result_dict in model.get_results().items()},
+            'val_statistical_results': {k: result_dict["val_statistical_results"] for k, result_dict in last_results.items()},
             'test_results': {k: result_dict["test_results"] for k, result_dict in results.items()},
-            'test_statistical_results': {k: result_dict["test_statistical_results"] for k, result_dict in model.get_results().items()},
-            'name': model.name
+            'test_statistical_results': {k: result_dict["test_statistical_results"] for k, result_dict in last_results.items()},
+            'name': name[-1]
         }
 
     @staticmethod
@@ -0,0 +1,135 @@
+"""
+Module description:
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from hyperopt import Trials
+from hyperopt.base import Domain, JOB_STATE_DONE, JOB_STATE_ERROR, JOB_STATE_RUNNING, spec_from_misc
+from hyperopt.utils import coarse_utcnow
+
+from elliot.utils import logging
+
+_domain = None
+_trial_id = None
+
+
+def _init_worker(domain):
+    global _domain
+    _domain = domain
+    logging.restart_listeners()
+
+
+def _evaluate(spec, tid):
+    global _trial_id
+    _trial_id = tid
+    try:
+        return _domain.evaluate(spec, ctrl=None, attach_attachments=False)
+    finally:
+        _trial_id = None
+
+
+def current_trial_id():
+    """
+    Id of the trial evaluated by the calling worker process, or None outside of the workers of a ParallelTrials
+    """
+    return _trial_id
+
+
+class ParallelTrials(Trials):
+    """
+    Trials evaluated by a local pool of worker processes.
+
+    The workers are forked once per search, so the objective (and the data objects it holds) is shared with them
+    without being pickled, and only the sampled configurations and the results travel between processes.
+    Trials are proposed in rounds of `workers` configurations, and a round starts when the previous one is completed:
+    the sequence of sampled configurations only depends on the random state and on the number of workers.
+    With a single worker (or without fork support) the search is the usual serial hyperopt loop.
+    """
+
+    def __init__(self, workers=1, exp_key=None, refresh=True):
+        """
+        :param workers: number of worker processes (a non-positive value uses all the available cores)
+        """
+        super(ParallelTrials, self).__init__(exp_key=exp_key, refresh=refresh)
+        self._workers = workers if workers > 0 else os.cpu_count()
+
+    def fmin(self, fn, space, algo, max_evals, timeout=None, loss_threshold=None, rstate=None,
+             pass_expr_memo_ctrl=None, catch_eval_exceptions=False, return_argmin=True, early_stop_fn=None,
+             trials_save_file="", **kwargs):
+        if self._workers < 2 or "fork" not in mp.get_all_start_methods():
+            return super(ParallelTrials, self).fmin(fn, space, algo, max_evals, timeout=timeout,
+                                                    loss_threshold=loss_threshold, rstate=rstate,
+                                                    pass_expr_memo_ctrl=pass_expr_memo_ctrl,
+                                                    catch_eval_exceptions=catch_eval_exceptions,
+                                                    return_argmin=return_argmin, early_stop_fn=early_stop_fn,
+                                                    trials_save_file=trials_save_file, **kwargs)
+
+        # the progress bar, the verbosity, and the queue length (the number of workers here) do not change the search
+        unsupported = set(kwargs) - {"max_queue_len", "verbose", "show_progressbar"}
+        unsupported.update(name for name, value in (("timeout", timeout), ("loss_threshold", loss_threshold),
+                                                    ("early_stop_fn", early_stop_fn)) if value is not None)
+        if trials_save_file:
+            unsupported.add("trials_save_file")
+        if unsupported:
+            raise Exception(f"fmin options {sorted(unsupported)} are not supported with {self._workers} workers, "
+                            f"use a single worker")
+
+        rstate = rstate if rstate is not None else np.random.RandomState()
+        domain = Domain(fn, space, pass_expr_memo_ctrl=pass_expr_memo_ctrl)
+        with ProcessPoolExecutor(max_workers=self._workers, mp_context=mp.get_context("fork"),
+                                 initializer=_init_worker, initargs=(domain,)) as executor:
+            n_queued = 0
+            while n_queued < max_evals:
+                batch = self._suggest(algo, domain, rstate, min(self._workers, max_evals - n_queued))
+                if not batch:
+                    break
+                n_queued += len(batch)
+                futures = [executor.submit(_evaluate, spec_from_misc(trial["misc"]), trial["tid"]) for trial in batch]
+                for trial, future in zip(batch, futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        trial["state"] = JOB_STATE_ERROR
+                        trial["misc"]["error"] = (str(type(e)), str(e))
+                        trial["refresh_time"] = coarse_utcnow()
+                        if not catch_eval_exceptions:
+                            self.refresh()
+                            raise
+                    else:
+                        trial["state"] = JOB_STATE_DONE
+                        trial["result"] = result
+                        trial["refresh_time"] = coarse_utcnow()
+                self.refresh()
+
+        if return_argmin and len(self.trials):
+            return self.argmin
+
+    def _suggest(self, algo, domain, rstate, n):
+        """
+        Samples up to n new trials, one at a time as the serial loop does, and books them
+        """
+        batch = []
+        for _ in range(n):
+            new_ids = self.new_trial_ids(1)
+            self.refresh()
+            new_trials = algo(new_ids, domain, self, rstate.randint(2 ** 31 - 1))
+            if not new_trials:
+                break
+            self.insert_trial_docs(new_trials)
+            batch.extend(self._dynamic_trials[-len(new_trials):])
+            self.refresh()
+        now = coarse_utcnow()
+        for trial in batch:
+            trial["state"] = JOB_STATE_RUNNING
+            trial["book_time"] = now
+            trial["refresh_time"] = now
+        return batch
@@ -191,7 +191,7 @@ class NameSpaceModel:
                 self.config[_experiment][p].update({k: self._safe_set_path(self._base_folder_path_config, v, self.config[_experiment][_dataset])
                                                     for k, v in self.config[_experiment][p].items()})
                 self.config[_experiment][p] = SimpleNamespace(**self.config[_experiment][p])
-                if getattr(self.config[_experiment][p], 'strategy', '') == 'random':
+                if getattr(self.config[_experiment][p], 'strategy', '') in ('random', 'popularity'):
                     path = os.path.abspath(os.sep.join([self._base_folder_path_config, "..", "data",
                                                          self.config[_experiment][_dataset], "negative.tsv"]))
                     setattr(self.config[_experiment][p], 'file_path', path)
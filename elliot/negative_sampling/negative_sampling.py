@@ -33,7 +33,7 @@ class NegativeSampler:
                                                               private_items, i_train,
                                                                test) if test != None else None
 
-        return (val_negative_items, test_negative_items) if val_negative_items else (test_negative_items, test_negative_items)
+        return (val_negative_items, test_negative_items) if val_negative_items is not None else (test_negative_items, test_negative_items)
 
     @staticmethod
     def process_sampling(ns: SimpleNamespace, public_users: t.Dict, public_items: t.Dict, private_users: t.Dict,
@@ -47,31 +47,25 @@ class NegativeSampler:
         i_test = sp.csr_matrix((np.ones_like(rows), (rows, cols)), dtype='float32',
                                shape=(len(public_users.keys()), len(public_items.keys())))
 
-        candidate_negatives = ((i_test + i_train).astype('bool') != True)
+        positives = (i_test + i_train).astype('bool').tocsr()
+        # validation and test negatives come from two different streams of the same seed
+        rng = np.random.default_rng([getattr(ns, "random_seed", 42), int(validation)])
         ns = ns.negative_sampling
 
         strategy = getattr(ns, "strategy", None)
 
-        if strategy == "random":
+        if strategy in ("random", "popularity"):
             num_items = getattr(ns, "num_items", None)
             file_path = getattr(ns, "file_path", None)
             if num_items is not None:
                 if str(num_items).isdigit():
-                    negative_items = NegativeSampler.sample_by_random_uniform(candidate_negatives, num_items)
-
-                    nnz = negative_items.nonzero()
-                    old_ind = 0
-                    basic_negative = []
-                    for u, v in enumerate(negative_items.indptr[1:]):
-                        basic_negative.append([(private_users[u],), list(map(private_items.get, nnz[1][old_ind:v]))])
-                        old_ind = v
-
-                    with open(file_path, "w") as file:
-                        for ele in basic_negative:
-                            line = str(ele[0]) + '\t' + '\t'.join(map(str, ele[1]))+'\n'
-                            file.write(line)
-
-                    pass
+                    if strategy == "random":
+                        negative_items = NegativeSampler.sample_by_random_uniform(positives, int(num_items), rng)
+                    else:
+                        popularity = np.asarray(i_train.astype('bool').sum(axis=0)).ravel()
+                        negative_items = NegativeSampler.sample_by_popularity(positives, int(num_items), popularity,
+                                                                              rng)
+                    NegativeSampler.write_to_file(negative_items, private_users, private_items, file_path)
                 else:
                     raise Exception("Number of negative items value not recognized")
             else:
@@ -90,17 +84,113 @@ class NegativeSampler:
         return negative_items
 
     @staticmethod
-    def sample_by_random_uniform(data: sp.csr_matrix, num_items=99) -> sp.csr_matrix:
-        rows = []
-        cols = []
-        for row in range(data.shape[0]):
-            candidate_negatives = list(zip(*data.getrow(row).nonzero()))
-            sampled_negatives = np.array(candidate_negatives)[random.sample(range(len(candidate_negatives)), num_items)]
-            rows.extend(list(np.ones(len(sampled_negatives), dtype=int) * row))
-            cols.extend(sampled_negatives[:, 1])
-        negative_samples = sp.csr_matrix((np.ones_like(rows), (rows, cols)), dtype='bool',
-                                         shape=(data.shape[0], data.shape[1]))
-        return negative_samples
+    def sample_by_random_uniform(positives: sp.csr_matrix, num_items=99,
+                                 rng: np.random.Generator = None) -> sp.csr_matrix:
+        """
+        Samples, for each user, num_items distinct items uniformly at random among the non-positive ones
+        :param positives: user-item boolean matrix of the items that can not be sampled
+        :param num_items: number of negative items per user (or all the non-positive items, if fewer)
+        :param rng: random generator
+        :return: user-item boolean matrix of the negative items
+        """
+        rng = rng if rng is not None else np.random.default_rng(42)
+        n_items = positives.shape[1]
+        return NegativeSampler.sample_without_replacement(positives, num_items,
+                                                          lambda size: rng.integers(0, n_items, size), rng)
+
+    @staticmethod
+    def sample_by_popularity(positives: sp.csr_matrix, num_items=99, popularity: np.ndarray = None,
+                             rng: np.random.Generator = None) -> sp.csr_matrix:
+        """
+        Samples, for each user, num_items distinct items among the non-positive ones, with a probability proportional
+        to their popularity (items are drawn one after the other, as in successive sampling)
+        :param positives: user-item boolean matrix of the items that can not be sampled
+        :param num_items: number of negative items per user (or all the non-positive items, if fewer)
+        :param popularity: the popularity of each item
+        :param rng: random generator
+        :return: user-item boolean matrix of the negative items
+        """
+        rng = rng if rng is not None else np.random.default_rng(42)
+        weights = np.asarray(popularity, dtype=np.float64)
+        cumulative = np.cumsum(weights)
+        n_items = positives.shape[1]
+
+        def draw(size):
+            return np.minimum(np.searchsorted(cumulative, rng.random(size) * cumulative[-1], side='right'),
+                              n_items - 1)
+
+        return NegativeSampler.sample_without_replacement(positives, num_items, draw, rng, weights)
+
+    @staticmethod
+    def sample_without_replacement(positives: sp.csr_matrix, num_items: int, draw: t.Callable,
+                                   rng: np.random.Generator, weights: np.ndarray = None,
+                                   block_size=1 << 22, max_rounds=16) -> sp.csr_matrix:
+        """
+        Bulk rejection sampling of distinct non-positive items, processed in blocks of users.
+        Every round draws the missing items of all the pending users of a block at once, and discards the positive and
+        the already drawn items with a binary search on the sorted (user, item) keys.
+        The few users that are still incomplete after max_rounds (i.e., users with almost all the items as positives)
+        are completed with an exact draw over their remaining items.
+        :param positives: user-item boolean matrix of the items that can not be sampled
+        :param num_items: number of negative items per user
+        :param draw: function returning an array of `size` item indices drawn from the sampling distribution
+        :param rng: random generator
+        :param weights: item weights of the sampling distribution (None for the uniform distribution)
+        :param block_size: maximum number of draws per block of users
+        :return: user-item boolean matrix of the negative items
+        """
+        positives = positives.tocsr()
+        positives.sort_indices()
+        n_users, n_items = positives.shape
+        n_negatives = np.minimum(num_items, n_items - np.diff(positives.indptr))
+        block_users = max(1, block_size // max(1, num_items))
+
+        sampled = []
+        for start in range(0, n_users, block_users):
+            stop = min(start + block_users, n_users)
+            indptr = positives.indptr[start:stop + 1]
+            positive_keys = np.repeat(np.arange(start, stop, dtype=np.int64), np.diff(indptr)) * n_items + \
+                            positives.indices[indptr[0]:indptr[-1]]
+            target = n_negatives[start:stop]
+            missing = target.copy()
+            keys = np.empty(0, dtype=np.int64)
+            for _ in range(max_rounds):
+                pending = np.flatnonzero(missing > 0)
+                if not len(pending):
+                    break
+                candidates = np.repeat(pending + start, missing[pending]).astype(np.int64) * n_items + \
+                             draw(int(missing[pending].sum()))
+                position = np.searchsorted(positive_keys, candidates)
+                is_positive = position < len(positive_keys)
+                is_positive[is_positive] = positive_keys[position[is_positive]] == candidates[is_positive]
+                # every round draws at most the missing items, so the distinct keys never exceed the target
+                keys = np.unique(np.concatenate([keys, candidates[~is_positive]]))
+                missing = target - np.bincount(keys // n_items - start, minlength=stop - start)
+            for user in np.flatnonzero(missing > 0):
+                user_keys = keys[keys // n_items == user + start]
+                excluded = np.concatenate([positives.indices[indptr[user]:indptr[user + 1]], user_keys % n_items])
+                allowed = np.setdiff1d(np.arange(n_items), excluded)
+                p = None
+                if weights is not None:
+                    p = weights[allowed]
+                    allowed, p = allowed[p > 0], p[p > 0]
+                    p = p / p.sum()
+                extra = rng.choice(allowed, size=min(missing[user], len(allowed)), replace=False, p=p)
+                keys = np.concatenate([keys, (user + start) * n_items + extra.astype(np.int64)])
+            sampled.append(keys)
+
+        keys = np.concatenate(sampled) if sampled else np.empty(0, dtype=np.int64)
+        return sp.csr_matrix((np.ones(len(keys), dtype=bool), (keys // n_items, keys % n_items)),
+                             shape=(n_users, n_items), dtype='bool')
+
+    @staticmethod
+    def write_to_file(negative_items: sp.csr_matrix, private_users: t.Dict, private_items: t.Dict, file_path: str):
+        items = np.array([private_items[i] for i in range(negative_items.shape[1])], dtype=object)
+        indptr, indices = negative_items.indptr, negative_items.indices
+        lines = [str((private_users[u],)) + '\t' + '\t'.join(map(str, items[indices[indptr[u]:indptr[u + 1]]])) + '\n'
+                 for u in range(negative_items.shape[0])]
+        with open(file_path, "w") as file:
+            file.write("".join(lines))
 
     @staticmethod
     def read_from_files(public_users: t.Dict, public_items: t.Dict, filepath: str) -> sp.csr_matrix:
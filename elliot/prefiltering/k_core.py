@@ -0,0 +1,122 @@
+"""
+Module description:
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+def k_core_mask(users, items=None, user_bounds=None, item_bounds=None, rounds=1, method="arrays"):
+    """
+    Rows of an interaction log kept by alternating user and item degree filters, as the rows of the groups
+    of groupby(['userId']).filter(...) followed by groupby(['itemId']).filter(...) would be.
+
+    Users and items are factorized once, and each filter drops the users (items) whose degree, i.e., the number
+    of interactions left, is out of bounds. Rows with a missing id are dropped by the filter on that id, as pandas
+    does not group them.
+    :param users: the user column
+    :param items: the item column (only required when filtering items)
+    :param user_bounds: the (minimum, maximum) degree of the kept users (None for no bound), or None to not filter
+                        the users
+    :param item_bounds: the (minimum, maximum) degree of the kept items, or None to not filter the items
+    :param rounds: number of user-then-item filtering rounds, or None to repeat them until no row is dropped
+                   (the iterative k-core)
+    :param method: arrays, to count the degrees with np.bincount over the interactions left, or sparse, to count
+                   them with products of a users x items matrix of interaction counts, which is smaller when the
+                   log has many repeated interactions
+    :return: the boolean mask of the kept rows, and the number of rounds run
+    """
+    user_codes, n_users = _factorize(users)
+    item_codes, n_items = _factorize(items) if items is not None else (np.zeros(len(user_codes), np.int64), 0)
+    steps = [step for step in ((0, n_users, user_bounds), (1, n_items, item_bounds)) if step[2] is not None]
+
+    if method == "arrays":
+        engine = _EdgeEngine(user_codes, item_codes)
+    elif method == "sparse":
+        engine = _SparseEngine(user_codes, n_users, item_codes, n_items)
+    else:
+        raise Exception(f"k-core method {method} not recognized")
+
+    alive = [np.ones(n_users + 1, dtype=bool), np.ones(n_items + 1, dtype=bool)]
+    n_edges = len(user_codes)
+    n_rounds = 0
+    while rounds is None or n_rounds < rounds:
+        n_rounds += 1
+        for axis, n, (low, high) in steps:
+            degree = engine.degree(axis, alive)
+            kept = alive[axis]
+            if low is not None:
+                kept &= degree >= low
+            if high is not None:
+                kept &= degree <= high
+            # the missing ids
+            kept[n] = False
+            engine.drop(axis, alive)
+        edges_left = engine.count(alive)
+        if edges_left == n_edges:
+            break
+        n_edges = edges_left
+    return engine.mask(alive), n_rounds
+
+
+def _factorize(values):
+    codes, uniques = pd.factorize(values)
+    codes = codes.astype(np.int64)
+    # the missing ids share the last slot
+    codes[codes < 0] = len(uniques)
+    return codes, len(uniques)
+
+
+class _EdgeEngine:
+    """
+    Degrees counted with np.bincount over the interactions left, which shrink at each filter
+    """
+
+    def __init__(self, user_codes, item_codes):
+        self._codes = (user_codes, item_codes)
+        self._rows = np.arange(len(user_codes))
+
+    def degree(self, axis, alive):
+        return np.bincount(self._codes[axis][self._rows], minlength=len(alive[axis]))
+
+    def drop(self, axis, alive):
+        self._rows = self._rows[alive[axis][self._codes[axis][self._rows]]]
+
+    def count(self, alive):
+        return len(self._rows)
+
+    def mask(self, alive):
+        mask = np.zeros(len(self._codes[0]), dtype=bool)
+        mask[self._rows] = True
+        return mask
+
+
+class _SparseEngine:
+    """
+    Degrees counted with products of the (users + 1) x (items + 1) matrix of interaction counts, whose last row and
+    column hold the interactions with a missing user or item
+    """
+
+    def __init__(self, user_codes, n_users, item_codes, n_items):
+        self._codes = (user_codes, item_codes)
+        counts = sp.csr_matrix((np.ones(len(user_codes), dtype=np.float64), (user_codes, item_codes)),
+                               shape=(n_users + 1, n_items + 1))
+        self._matrices = (counts, counts.T.tocsr())
+
+    def degree(self, axis, alive):
+        return np.rint(self._matrices[axis] @ alive[1 - axis].astype(np.float64)).astype(np.int64)
+
+    def drop(self, axis, alive):
+        pass
+
+    def count(self, alive):
+        return int(np.rint(alive[0].astype(np.float64) @ (self._matrices[0] @ alive[1].astype(np.float64))))
+
+    def mask(self, alive):
+        return alive[0][self._codes[0]] & alive[1][self._codes[1]]
@@ -2,12 +2,15 @@
 import pandas as pd
 from types import SimpleNamespace
 
+from elliot.prefiltering.k_core import k_core_mask
+
 """
 prefiltering:
     strategy: global_threshold|user_average|user_k_core|item_k_core|iterative_k_core|n_rounds_k_core|cold_users
     threshold: 3|average
     core: 5
     rounds: 2
+    k_core_method: arrays|sparse
 """
 
 
@@ -29,7 +32,8 @@ class PreFilter:
     def single_filter(d: pd.DataFrame, ns: SimpleNamespace) -> pd.DataFrame:
 
         strategy = getattr(ns, "strategy", None)
-        data = d.copy()
+        k_core_method = getattr(ns, "k_core_method", "arrays")
+        data = d
         if strategy == "global_threshold":
             threshold = getattr(ns, "threshold", None)
             if threshold is not None:
@@ -49,7 +53,7 @@ class PreFilter:
             core = getattr(ns, "core", None)
             if core is not None:
                 if str(core).isdigit():
-                    data = PreFilter.filter_users_by_profile_size(data, core)
+                    data = PreFilter.filter_users_by_profile_size(data, core, k_core_method)
                 else:
                     raise Exception("Core option is not a digit")
             else:
@@ -59,7 +63,7 @@ class PreFilter:
             core = getattr(ns, "core", None)
             if core is not None:
                 if str(core).isdigit():
-                    data = PreFilter.filter_items_by_popularity(data, core)
+                    data = PreFilter.filter_items_by_popularity(data, core, k_core_method)
                 else:
                     raise Exception("Core option is not a digit")
             else:
@@ -69,7 +73,7 @@ class PreFilter:
             core = getattr(ns, "core", None)
             if core is not None:
                 if str(core).isdigit():
-                    data = PreFilter.filter_iterative_k_core(data, core)
+                    data = PreFilter.filter_iterative_k_core(data, core, k_core_method)
                 else:
                     raise Exception("Core option is not a digit")
             else:
@@ -80,7 +84,7 @@ class PreFilter:
             n_rounds = getattr(ns, "rounds", None)
             if (core is not None) and (n_rounds is not None):
                 if str(core).isdigit() and str(n_rounds).isdigit():
-                    data = PreFilter.filter_rounds_k_core(data, core, n_rounds)
+                    data = PreFilter.filter_rounds_k_core(data, core, n_rounds, k_core_method)
                 else:
                     raise Exception("Core or rounds options are not digits")
             else:
@@ -90,7 +94,7 @@ class PreFilter:
             threshold = getattr(ns, "threshold", None)
             if threshold is not None:
                 if str(threshold).isdigit():
-                    data = PreFilter.filter_retain_cold_users(data, threshold)
+                    data = PreFilter.filter_retain_cold_users(data, threshold, k_core_method)
                 else:
                     raise Exception("Threshold option is not a digit")
             else:
@@ -134,73 +138,71 @@ class PreFilter:
         return data[data["accept_flag"] == True].drop(columns=["accept_flag"]).reset_index(drop=True)
 
     @staticmethod
-    def filter_users_by_profile_size(d: pd.DataFrame, threshold) -> pd.DataFrame:
-        data = d.copy()
+    def filter_users_by_profile_size(d: pd.DataFrame, threshold, method="arrays") -> pd.DataFrame:
         print(f"\nPrefiltering with user {threshold}-core")
-        print(f"The transactions before filtering are {len(data)}")
-        print(f"The users before filtering are {data['userId'].nunique()}")
-        user_groups = data.groupby(['userId'])
-        data = user_groups.filter(lambda x: len(x) >= threshold)
+        print(f"The transactions before filtering are {len(d)}")
+        print(f"The users before filtering are {d['userId'].nunique()}")
+        mask, _ = k_core_mask(d["userId"], user_bounds=(int(threshold), None), method=method)
+        data = d[mask]
         print(f"The transactions after filtering are {len(data)}")
         print(f"The users after filtering are {data['userId'].nunique()}")
         return data
 
     @staticmethod
-    def filter_items_by_popularity(d: pd.DataFrame, threshold) -> pd.DataFrame:
-        data = d.copy()
+    def filter_items_by_popularity(d: pd.DataFrame, threshold, method="arrays") -> pd.DataFrame:
         print(f"\nPrefiltering with item {threshold}-core")
-        print(f"The transactions before filtering are {len(data)}")
-        print(f"The items before filtering are {data['itemId'].nunique()}")
-        item_groups = data.groupby(['itemId'])
-        data = item_groups.filter(lambda x: len(x) >= threshold)
+        print(f"The transactions before filtering are {len(d)}")
+        print(f"The items before filtering are {d['itemId'].nunique()}")
+        mask, _ = k_core_mask(d["userId"], d["itemId"], item_bounds=(int(threshold), None), method=method)
+        data = d[mask]
         print(f"The transactions after filtering are {len(data)}")
         print(f"The items after filtering are {data['itemId'].nunique()}")
         return data
 
     @staticmethod
-    def filter_iterative_k_core(d: pd.DataFrame, threshold) -> pd.DataFrame:
-        data = d.copy()
-        check_var = True
-        original_length = len(data)
+    def filter_iterative_k_core(d: pd.DataFrame, threshold, method="arrays") -> pd.DataFrame:
         print("\n**************************************")
         print(f"Iterative {threshold}-core")
-        while check_var:
-            data = PreFilter.filter_users_by_profile_size(data, threshold)
-            data = PreFilter.filter_items_by_popularity(data, threshold)
-            new_length = len(data)
-            if original_length == new_length:
-                check_var = False
-            else:
-                original_length = new_length
+        PreFilter._print_sizes(d, "before")
+        mask, n_rounds = k_core_mask(d["userId"], d["itemId"], user_bounds=(int(threshold), None),
+                                     item_bounds=(int(threshold), None), rounds=None, method=method)
+        data = d[mask]
+        print(f"Converged after {n_rounds} rounds of user/item {threshold}-core")
+        PreFilter._print_sizes(data, "after")
         print("**************************************\n")
 
         return data
 
     @staticmethod
-    def filter_rounds_k_core(d: pd.DataFrame, threshold, n_rounds) -> pd.DataFrame:
-        data = d.copy()
+    def filter_rounds_k_core(d: pd.DataFrame, threshold, n_rounds, method="arrays") -> pd.DataFrame:
         print("\n**************************************")
         print(f"{n_rounds} rounds of user/item {threshold}-core")
-        for i in range(n_rounds):
-            print(f"Iteration:\t{i}")
-            data = PreFilter.filter_users_by_profile_size(data, threshold)
-            data = PreFilter.filter_items_by_popularity(data, threshold)
+        PreFilter._print_sizes(d, "before")
+        mask, _ = k_core_mask(d["userId"], d["itemId"], user_bounds=(int(threshold), None),
+                              item_bounds=(int(threshold), None), rounds=int(n_rounds), method=method)
+        data = d[mask]
+        PreFilter._print_sizes(data, "after")
         print("**************************************\n")
 
         return data
 
     @staticmethod
-    def filter_retain_cold_users(d: pd.DataFrame, threshold) -> pd.DataFrame:
-        data = d.copy()
+    def filter_retain_cold_users(d: pd.DataFrame, threshold, method="arrays") -> pd.DataFrame:
         print(f"\nPrefiltering retaining cold users with {threshold} or less ratings")
-        print(f"The transactions before filtering are {len(data)}")
-        print(f"The users before filtering are {data['userId'].nunique()}")
-        user_groups = data.groupby(['userId'])
-        data = user_groups.filter(lambda x: len(x) <= threshold)
+        print(f"The transactions before filtering are {len(d)}")
+        print(f"The users before filtering are {d['userId'].nunique()}")
+        mask, _ = k_core_mask(d["userId"], user_bounds=(None, int(threshold)), method=method)
+        data = d[mask]
         print(f"The transactions after filtering are {len(data)}")
         print(f"The users after filtering are {data['userId'].nunique()}")
         return data
 
+    @staticmethod
+    def _print_sizes(data: pd.DataFrame, moment):
+        print(f"The transactions {moment} filtering are {len(data)}")
+        print(f"The users {moment} filtering are {data['userId'].nunique()}")
+        print(f"The items {moment} filtering are {data['itemId'].nunique()}")
+
 
 # import unittest
 #
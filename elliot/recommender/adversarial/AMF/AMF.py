@@ -11,7 +11,7 @@ from tqdm import tqdm
 import pandas as pd
 import os
 
-from elliot.dataset.samplers import custom_sampler as cs
+from elliot.dataset.samplers import vectorized_sampler as vs
 from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.adversarial.AMF.AMF_model import AMF_model
 from elliot.recommender.base_recommender_model import init_charger
@@ -105,7 +105,7 @@ class AMF(RecMixin, BaseRecommenderModel):
 
         self._ratings = self._data.train_dict
 
-        self._sampler = cs.Sampler(self._data.i_train_dict)
+        self._sampler = vs.Sampler(self._data.sp_i_train, self._seed, getattr(self._params, "prefetch", 0))
 
         self._results_perturbation = {}
 
@@ -16,7 +16,6 @@ import numpy as np
 from elliot.recommender.algebric.slope_one.slope_one_model import SlopeOneModel
 from elliot.recommender.base_recommender_model import BaseRecommenderModel, init_charger
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 
 class SlopeOne(RecMixin, BaseRecommenderModel):
@@ -59,7 +58,7 @@ class SlopeOne(RecMixin, BaseRecommenderModel):
         return predictions_top_k_val, predictions_top_k_test
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self._model.get_user_recs(u, mask, k) for u in self._data.train_dict.keys()}
+        return self.get_batched_recommendations(mask, k, self._model.predict_block)
 
     @property
     def name(self):
@@ -85,7 +84,7 @@ class SlopeOne(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self._store_recs(recs)
             return True
 
         except Exception as ex:
@@ -15,53 +15,41 @@ class SlopeOneModel:
         self._num_items = self._data.num_items
         self._num_users = self._data.num_users
         self._i_train = self._data.i_train_dict
+        self._known = None
 
     def initialize(self):
-        freq = np.empty((self._num_items, self._num_items))
-        dev = np.empty((self._num_items, self._num_items))
-
-        # Computation of freq and dev arrays.
-        for u, u_ratings in self._i_train.items():
-            for i, r_ui in u_ratings.items():
-                for j, r_uj in u_ratings.items():
-                    freq[i, j] += 1
-                    dev[i, j] += r_ui - r_uj
-
-        for i in range(self._num_items):
-            dev[i, i] = 0
-            for j in range(i + 1, self._num_items):
-                dev[i, j] = dev[i, j]/freq[i, j] if freq[i, j] != 0 else 0
-                dev[j, i] = -dev[i, j]
+        ratings = self._data.sp_i_train_ratings.astype(np.float64)
+        rated = self._data.sp_i_train.astype(np.float64)
+
+        # freq[i, j]: number of users who rated both i and j
+        freq = (rated.T @ rated).tocsr()
+        # dev[i, j]: average of r_ui - r_uj over the users who rated both i and j
+        dev_sum = (ratings.T @ rated - rated.T @ ratings).tocsr()
+        inverse_freq = freq.copy()
+        inverse_freq.data = 1.0 / inverse_freq.data
+        dev = dev_sum.multiply(inverse_freq).tocsr()
+        dev.eliminate_zeros()
 
         self.freq = freq
         self.dev = dev
+        self._known = None
 
         # mean ratings of all users: mu_u
-        self.user_mean = [np.mean([r for (_, r) in self._i_train[u].items()]) for u in range(self._num_users)]
+        self.user_mean = np.asarray(ratings.sum(axis=1)).ravel() / np.asarray(rated.sum(axis=1)).ravel()
 
     def predict(self, user, item):
-        Ri = [j for (j, _) in self._i_train[user].items() if self.freq[item, j] > 0]
-        pred = self.user_mean[user]
-        if Ri:
-            pred += sum(self.dev[item, j] for j in Ri) / len(Ri)
-        return pred
-
-    def get_user_recs(self, u, mask, k=100):
-        uidx = self._data.public_users[u]
-        user_mask = mask[uidx]
-        # user_items = self._data.train_dict[u].keys()
-        # indexed_user_items = [self._data.public_items[i] for i in user_items]
-        predictions = {self._data.private_items[iidx]: self.predict(uidx, iidx) for iidx in range(self._num_items) if user_mask[iidx]}
-
-        indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+        return self.predict_block(user, user + 1)[0, item]
+
+    def predict_block(self, offset, offset_stop):
+        if self._known is None:
+            self._known = self.freq.astype(bool).astype(np.float64)
+        rated = self._data.sp_i_train[offset:offset_stop].astype(np.float64)
+        # per item, the number of rated items sharing at least one user with it, and the sum of their deviations
+        # (freq is symmetric and dev is antisymmetric)
+        counts = (rated @ self._known).toarray()
+        deviations = -(rated @ self.dev).toarray()
+        user_mean = self.user_mean[offset:offset_stop, None]
+        return user_mean + np.divide(deviations, counts, out=np.zeros_like(counts), where=counts > 0)
 
     def get_model_state(self):
         saving_dict = {}
@@ -73,6 +61,7 @@ class SlopeOneModel:
     def set_model_state(self, saving_dict):
         self.freq = saving_dict['freq']
         self.dev = saving_dict['dev']
+        self._known = None
         self.user_mean = saving_dict['user_mean']
 
     def load_weights(self, path):
@@ -7,10 +7,12 @@ __version__ = '0.3.1'
 __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
+import os
+import tempfile
 import time
 
 import numpy as np
-from sklearn.utils.extmath import safe_sparse_dot
+from scipy.linalg import get_lapack_funcs
 
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
@@ -18,6 +20,31 @@ from elliot.recommender.recommender_utils_mixin import RecMixin
 
 
 class EASER(RecMixin, BaseRecommenderModel):
+    r"""
+    Embarrassingly Shallow Autoencoders for Sparse Data
+
+    For further details, please refer to the `paper <https://arxiv.org/pdf/1905.03375.pdf>`_
+
+    Args:
+        l2_norm: Regularization coefficient
+        precision: Floating point type of the item-item matrix, float64 (default) or float32
+        memmap_folder: Folder of a temporary file backing the item-item matrix (by default, it is kept in memory)
+
+    The item-item matrix is inverted in place with a Cholesky factorization (or an LU one, when the matrix is not
+    positive definite), and the predictions are computed on demand for each block of users.
+
+    To include the recommendation model, add it to the config file adopting the following pattern:
+
+    .. code:: yaml
+
+      models:
+        EASER:
+          meta:
+            save_recs: True
+          l2_norm: 1000
+          precision: float32
+          memmap_folder: ./cache
+    """
 
     @init_charger
     def __init__(self, data, config, params, *args, **kwargs):
@@ -31,6 +58,14 @@ class EASER(RecMixin, BaseRecommenderModel):
         if self._neighborhood == -1:
             self._neighborhood = self._data.num_items
 
+        # like memmap_folder, precision is read apart from _params_list, so that it stays out of the model name and
+        # the existing result and weight names do not change
+        self._precision = np.dtype(getattr(self._params, "precision", "float64"))
+        if self._precision not in (np.float32, np.float64):
+            raise Exception(f"EASER precision {self._precision} not supported, use float32 or float64")
+        self._memmap_folder = getattr(self._params, "memmap_folder", None)
+        self._block_size = 1 << 24
+
     @property
     def name(self):
         return f"EASER_{self.get_params_shortcut()}"
@@ -47,49 +82,81 @@ class EASER(RecMixin, BaseRecommenderModel):
         return predictions_top_k_val, predictions_top_k_test
 
     def get_single_recommendation(self, mask, k):
-        return {u: self.get_user_predictions(u, mask, k) for u in self._data.train_dict.keys()}
-
-    def get_user_predictions(self, user_id, mask, top_k=10):
-        user_id = self._data.public_users.get(user_id)
-        b = self._preds[user_id]
-        a = mask[user_id]
-        b[~a] = -np.inf
-        indices, values = zip(*[(self._data.private_items.get(u_list[0]), u_list[1])
-                              for u_list in enumerate(b.data)])
-
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(top_k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+        return self.get_batched_recommendations(mask, k, self.predict_block)
+
+    def predict_block(self, offset, offset_stop):
+        return self._train[offset:offset_stop].dot(self._similarity_matrix)
 
     def train(self):
         if self._restore:
             return self.restore_weights()
 
-
         start = time.time()
 
-        self._train = self._data.sp_i_train_ratings
-
-        self._similarity_matrix = safe_sparse_dot(self._train.T, self._train, dense_output=True)
-
-        diagonal_indices = np.diag_indices(self._similarity_matrix.shape[0])
-        item_popularity = np.ediff1d(self._train.tocsc().indptr)
-        self._similarity_matrix[diagonal_indices] = item_popularity + self._l2_norm
-
-        P = np.linalg.inv(self._similarity_matrix)
-
-        self._similarity_matrix = P / (-np.diag(P))
-
-        self._similarity_matrix[diagonal_indices] = 0.0
+        self._train = self._data.sp_i_train_ratings.astype(self._precision, copy=False)
+        n_items = self._train.shape[1]
+        rows = max(1, self._block_size // n_items)
+
+        self._similarity_matrix = self._allocate((n_items, n_items))
+        self._fill_gram(rows)
+
+        # in-place inversion: LAPACK works on the (Fortran-ordered) transpose of the matrix
+        potrf, potri = get_lapack_funcs(("potrf", "potri"), (self._similarity_matrix,))
+        factor, info = potrf(self._similarity_matrix.T, lower=0, overwrite_a=1, clean=0)
+        if info == 0:
+            _, info = potri(factor, lower=0, overwrite_c=1)
+            # only the upper triangle seen by LAPACK, i.e., the lower triangle of the matrix, is filled
+            triangular = True
+        else:
+            # the diagonal holds the item popularity, so the Gram matrix of explicit ratings can be indefinite
+            self.logger.warning("EASER Gram matrix is not positive definite, falling back to the LU inversion")
+            self._fill_gram(rows)
+            getrf, getri, getri_lwork = get_lapack_funcs(("getrf", "getri", "getri_lwork"),
+                                                         (self._similarity_matrix,))
+            lu, pivots, info = getrf(self._similarity_matrix.T, overwrite_a=1)
+            if info == 0:
+                lwork, _ = getri_lwork(n_items)
+                _, info = getri(lu, pivots, lwork=int(lwork), overwrite_lu=1)
+            triangular = False
+        if info != 0:
+            raise np.linalg.LinAlgError(f"EASER Gram matrix is singular (LAPACK info {info})")
+
+        P = self._similarity_matrix
+        diagonal = -np.diag(P).copy()
+        for block_start in range(0, n_items, rows):
+            block_stop = min(block_start + rows, n_items)
+            block = P[block_start:block_stop]
+            if triangular:
+                block[:, block_stop:] = P[block_stop:, block_start:block_stop].T
+                upper = np.triu_indices(block_stop - block_start, 1)
+                square = block[:, block_start:block_stop]
+                square[upper] = square.T[upper]
+            block /= diagonal
+
+        self._similarity_matrix[np.diag_indices(n_items)] = 0.0
 
         end = time.time()
         self.logger.info(f"The similarity computation has taken: {end - start}")
 
-        self._preds = self._train.dot(self._similarity_matrix)
-
         self.evaluate()
+
+    def _fill_gram(self, rows):
+        """
+        Regularized item-item Gram matrix, computed one block of rows at a time
+        """
+        items = self._train.T.tocsr()
+        for block_start in range(0, items.shape[0], rows):
+            self._similarity_matrix[block_start:block_start + rows] = \
+                (items[block_start:block_start + rows] @ self._train).toarray()
+        item_popularity = np.ediff1d(self._train.tocsc().indptr)
+        self._similarity_matrix[np.diag_indices(items.shape[0])] = item_popularity + self._l2_norm
+
+    def _allocate(self, shape):
+        """
+        Item-item matrix, in memory or backed by an anonymous temporary file
+        """
+        if self._memmap_folder is None:
+            return np.empty(shape, dtype=self._precision)
+        os.makedirs(self._memmap_folder, exist_ok=True)
+        self._memmap_file = tempfile.TemporaryFile(dir=self._memmap_folder)
+        return np.memmap(self._memmap_file, dtype=self._precision, mode="w+", shape=shape)
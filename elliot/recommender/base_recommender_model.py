@@ -59,6 +59,8 @@ class BaseRecommenderModel(ABC):
         self._validation_metric = self._validation_metric[0]
         self._save_weights = getattr(self._params.meta, "save_weights", False)
         self._save_recs = getattr(self._params.meta, "save_recs", False)
+        self._save_recs_format = getattr(self._params.meta, "save_recs_format", "tsv")
+        self._save_recs_compression = getattr(self._params.meta, "save_recs_compression", None)
         self._verbose = getattr(self._params.meta, "verbose", None)
         self._validation_rate = getattr(self._params.meta, "validation_rate", 1)
         self._optimize_internal_loss = getattr(self._params.meta, "optimize_internal_loss", False)
@@ -60,21 +60,8 @@ class Similarity(object):
         else:
             raise Exception("Not implemented similarity")
 
-    def get_user_recs(self, u, mask, k):
-        user_id = self._data.public_users.get(u)
-        user_recs = self._similarity_matrix[user_id]
-        user_recs_mask = mask[user_id]
-        user_recs[~user_recs_mask] = -np.inf
-        indices, values = zip(*[(self._data.private_items.get(u_list[0]), u_list[1])
-                              for u_list in enumerate(user_recs)])
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+    def predict_block(self, offset, offset_stop):
+        return self._similarity_matrix[offset:offset_stop]
 
     def get_model_state(self):
         saving_dict = {}
@@ -1,10 +1,10 @@
 import ntpath
 import numpy as np
-import pandas as pd
 
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
 from elliot.recommender.base_recommender_model import init_charger
+from elliot.utils.read import read_recommendations
 
 
 class ProxyRecommender(RecMixin, BaseRecommenderModel):
@@ -24,7 +24,10 @@ class ProxyRecommender(RecMixin, BaseRecommenderModel):
         ]
         self.autoset_params()
         if not self._name:
-            self._name = ntpath.basename(self._path).rsplit(".",1)[0]
+            self._name = ntpath.basename(self._path)
+            for extension in [".gz", ".zst", ".tsv", ".npz", ".parquet"]:
+                if self._name.endswith(extension):
+                    self._name = self._name[:-len(extension)]
 
     @property
     def name(self):
@@ -50,29 +53,18 @@ class ProxyRecommender(RecMixin, BaseRecommenderModel):
 
     def get_single_recommendation(self, mask, k):
 
-        nonzero = mask.nonzero()
-        candidate_items = {}
-        [candidate_items.setdefault(self._data.private_users[user], set()).add(self._data.private_items[item]) for user, item in zip(*nonzero)]
         recs = {}
         for u, user_recs in self._recommendations.items():
             user_cleaned_recs = []
-            user_candidate_items = candidate_items[u]
+            user_mask = mask[self._data.public_users[u]]
             for p, (item, prediction) in enumerate(user_recs):
                 if p >= k:
                     break
-                if item in user_candidate_items:
+                i = self._data.public_items.get(item)
+                if i is not None and user_mask[i]:
                     user_cleaned_recs.append((item, prediction))
             recs[u] = user_cleaned_recs
         return recs
 
     def read_recommendations(self, path):
-        recs = {}
-        column_names = ["userId", "itemId", "prediction", "timestamp"]
-        data = pd.read_csv(path, sep="\t", header=None, names=column_names)
-        user_groups = data.groupby(['userId'])
-        for name, group in user_groups:
-            recs[name] = sorted(data.loc[group.index][['itemId', 'prediction']].apply(tuple, axis=1).to_list(), key=lambda x: x[1], reverse=True)
-        return recs
-
-
-
+        return read_recommendations(path)
@@ -10,11 +10,11 @@ __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 import time
 
 import numpy as np
-import scipy.sparse as sparse
 from sklearn.preprocessing import normalize
 
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
+from elliot.recommender.knn.top_k_sparsifier import sparsify_top_k, top_k_per_row
 from elliot.recommender.recommender_utils_mixin import RecMixin
 
 
@@ -51,24 +51,10 @@ class RP3beta(RecMixin, BaseRecommenderModel):
         return predictions_top_k_val, predictions_top_k_test
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self.get_user_predictions(u, mask, k) for u in self._data.train_dict.keys()}
-
-    def get_user_predictions(self, user_id, mask, top_k=10):
-        user_id = self._data.public_users.get(user_id)
-        user_recs = self._preds[user_id].toarray()[0]
-        user_recs_mask = mask[user_id]
-        user_recs[~user_recs_mask] = -np.inf
-        indices, values = zip(*[(self._data.private_items.get(u_list[0]), u_list[1])
-                              for u_list in enumerate(user_recs)])
-
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(top_k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+        return self.get_batched_recommendations(mask, k, self.predict_block)
+
+    def predict_block(self, offset, offset_stop):
+        return self._train[offset:offset_stop].dot(self._W_sparse).toarray()
 
     def train(self):
         if self._restore:
@@ -95,85 +81,22 @@ class RP3beta(RecMixin, BaseRecommenderModel):
             self.Pui = self.Pui.power(self._alpha)
             self.Piu = self.Piu.power(self._alpha)
 
-        block_dim = 200
-        d_t = self.Piu
-
-        dataBlock = 10000000
-
-        rows = np.zeros(dataBlock, dtype=np.int32)
-        cols = np.zeros(dataBlock, dtype=np.int32)
-        values = np.zeros(dataBlock, dtype=np.float32)
-
-        numCells = 0
-
         start = time.time()
 
-        for current_block_start_row in range(0, self.Pui.shape[1], block_dim):
-
-            if current_block_start_row + block_dim > self.Pui.shape[1]:
-                block_dim = self.Pui.shape[1] - current_block_start_row
-
-            similarity_block = d_t[current_block_start_row:current_block_start_row + block_dim, :] * self.Pui
-            similarity_block = similarity_block.toarray()
-
-            for row_in_block in range(block_dim):
-                row_data = np.multiply(similarity_block[row_in_block, :], self.degree)
-                row_data[current_block_start_row + row_in_block] = 0
-
-                best = row_data.argsort()[::-1][:self._neighborhood]
-
-                notZerosMask = row_data[best] != 0.0
-
-                values_to_add = row_data[best][notZerosMask]
-                cols_to_add = best[notZerosMask]
-
-                for index in range(len(values_to_add)):
-
-                    if numCells == len(rows):
-                        rows = np.concatenate((rows, np.zeros(dataBlock, dtype=np.int32)))
-                        cols = np.concatenate((cols, np.zeros(dataBlock, dtype=np.int32)))
-                        values = np.concatenate((values, np.zeros(dataBlock, dtype=np.float32)))
+        def similarity_block(block_start, block_stop):
+            similarity_block = (self.Piu[block_start:block_stop] @ self.Pui).toarray()
+            similarity_block *= self.degree
+            similarity_block[np.arange(block_stop - block_start), np.arange(block_start, block_stop)] = 0
+            return similarity_block
 
-                    rows[numCells] = current_block_start_row + row_in_block
-                    cols[numCells] = cols_to_add[index]
-                    values[numCells] = values_to_add[index]
-
-                    numCells += 1
-
-        self._similarity_matrix = sparse.csr_matrix((values[:numCells], (rows[:numCells], cols[:numCells])),
-                                                    shape=(self.Pui.shape[1], self.Pui.shape[1]))
+        n_items = self.Pui.shape[1]
+        self._similarity_matrix = sparsify_top_k(similarity_block, (n_items, n_items), self._neighborhood)
 
         if self._normalize_similarity:
             self._similarity_matrix = normalize(self._similarity_matrix, norm='l1', axis=1)
 
-        self._similarity_matrix = self._similarity_matrix.tocsc()
-
-        data, rows_indices, cols_indptr = [], [], []
-
-        for item_idx in range(len(self._data.items)):
-            cols_indptr.append(len(data))
-
-            start_position = self._similarity_matrix.indptr[item_idx]
-            end_position = self._similarity_matrix.indptr[item_idx + 1]
-
-            column_data = self._similarity_matrix.data[start_position:end_position]
-            column_row_index = self._similarity_matrix.indices[start_position:end_position]
-
-
-            non_zero_data = column_data != 0
-
-            idx_sorted = np.argsort(column_data[non_zero_data])  # sort by column
-            top_k_idx = idx_sorted[-self._neighborhood:]
-
-            data.extend(column_data[non_zero_data][top_k_idx])
-            rows_indices.extend(column_row_index[non_zero_data][top_k_idx])
-
-        cols_indptr.append(len(data))
-
-        W_sparse = sparse.csc_matrix((data, rows_indices, cols_indptr),
-                                     shape=(len(self._data.items), len(self._data.items)), dtype=np.float32).tocsr()
-
-        self._preds = self._train.dot(W_sparse)
+        # top-k of each column
+        self._W_sparse = top_k_per_row(self._similarity_matrix.T, self._neighborhood).T.tocsr()
 
         end = time.time()
         print(f"The similarity computation has taken: {end - start}")
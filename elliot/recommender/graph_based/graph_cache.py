@@ -0,0 +1,127 @@
+"""
+Module description:
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo, Daniele Malitesta'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it, daniele.malitesta@poliba.it'
+
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+import tensorflow as tf
+
+from elliot.dataset.dataset_cache import DataSetCache, fingerprint
+
+_MAX_GRAPHS = 4
+_graphs = OrderedDict()
+
+
+def bipartite_adjacency(ratings):
+    """
+    Symmetric (users + items) x (users + items) adjacency of the user-item graph
+    """
+    ratings = sp.csr_matrix(ratings, dtype=np.float32)
+    adjacency = sp.bmat([[None, ratings], [ratings.T, None]], format="csr", dtype=np.float32)
+    adjacency.sort_indices()
+    return adjacency
+
+
+def normalize_adjacency(adjacency, normalization="bi"):
+    """
+    Normalized adjacency (graph Laplacian)
+    :param adjacency: symmetric adjacency matrix
+    :param normalization: bi, i.e., D^-1/2 A D^-1/2, as in the LightGCN and NGCF papers
+    :return: the normalized adjacency in CSR format
+    """
+    if normalization != "bi":
+        raise Exception(f"Graph normalization {normalization} not recognized")
+    rowsum = np.asarray(adjacency.sum(axis=1), dtype=np.float32).ravel()
+    # to avoid division by zero warnings
+    rowsum += np.float32(1e-7)
+    d_inv_sqrt = np.power(rowsum, np.float32(-0.5))
+    d_inv_sqrt[np.isinf(d_inv_sqrt)] = 0.
+    laplacian = adjacency.tocoo(copy=True)
+    laplacian.data = laplacian.data * d_inv_sqrt[laplacian.row] * d_inv_sqrt[laplacian.col]
+    return laplacian.tocsr()
+
+
+class GraphStructure:
+    """
+    Adjacency and normalized adjacency of the user-item graph of a training matrix.
+
+    The structures are keyed by the content of the training matrix and by the normalization, and they are shared by
+    all the models of the process that train on the same data (e.g., the hyperparameter trials). When the dataset
+    cache is enabled, the normalized adjacency is also stored in its folder, so that other processes load it instead
+    of building it.
+    The sparse tensors of the row folds of the normalized adjacency are built once for each number of folds.
+    """
+
+    def __init__(self, adjacency, laplacian, key):
+        self.adjacency = adjacency
+        self.laplacian = laplacian
+        self.key = key
+        self._folds = {}
+
+    @classmethod
+    def of(cls, data, normalization="bi"):
+        """
+        The graph structure of the training set of a dataset
+        :param data: the dataset object
+        :param normalization: normalization of the adjacency
+        """
+        key = f"{fingerprint(data.sp_i_train)}_{normalization}"
+        graph = _graphs.get(key)
+        if graph is not None:
+            _graphs.move_to_end(key)
+            return graph
+
+        folder = DataSetCache.folder(data.config) if hasattr(data.config, "data_config") else None
+        path = os.path.join(folder, "graphs", f"{key}.npz") if folder else None
+        adjacency = bipartite_adjacency(data.sp_i_train)
+        if path and os.path.isfile(path):
+            laplacian = sp.load_npz(path).tocsr()
+        else:
+            laplacian = normalize_adjacency(adjacency, normalization)
+            if path:
+                cls._store(laplacian, path)
+
+        graph = cls(adjacency, laplacian, key)
+        _graphs[key] = graph
+        while len(_graphs) > _MAX_GRAPHS:
+            _graphs.popitem(last=False)
+        return graph
+
+    def folds(self, n_fold):
+        """
+        The normalized adjacency split into n_fold blocks of rows, as tf.SparseTensor
+        """
+        if n_fold not in self._folds:
+            n_nodes = self.laplacian.shape[0]
+            fold_len = n_nodes // n_fold
+            bounds = [i_fold * fold_len for i_fold in range(n_fold)] + [n_nodes]
+            self._folds[n_fold] = [self._to_sparse_tensor(self.laplacian[start:end])
+                                   for start, end in zip(bounds[:-1], bounds[1:])]
+        return self._folds[n_fold]
+
+    @staticmethod
+    def _to_sparse_tensor(matrix):
+        coo = matrix.tocoo()
+        indices = np.stack([coo.row, coo.col], axis=1).astype(np.int64)
+        return tf.SparseTensor(indices, coo.data.astype(np.float32), coo.shape)
+
+    @staticmethod
+    def _store(laplacian, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".npz", dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            sp.save_npz(tmp_path, laplacian, compressed=False)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
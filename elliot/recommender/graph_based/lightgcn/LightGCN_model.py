@@ -29,6 +29,7 @@ class LightGCNModel(keras.Model):
                  adjacency,
                  laplacian,
                  random_seed,
+                 laplacian_folds=None,
                  name="LightGCN",
                  **kwargs
                  ):
@@ -46,7 +47,7 @@ class LightGCNModel(keras.Model):
         self.laplacian = laplacian
 
         # Generate a set of adjacency sub-matrix.
-        self.A_fold_hat = self._split_A_hat()
+        self.A_fold_hat = laplacian_folds if laplacian_folds is not None else self._split_A_hat()
 
         self.initializer = tf.initializers.GlorotUniform()
         # Initialize Model Parameters
@@ -57,7 +58,7 @@ class LightGCNModel(keras.Model):
     @staticmethod
     def _convert_sp_mat_to_sp_tensor(X):
         coo = X.tocoo().astype(np.float32)
-        indices = np.mat([coo.row, coo.col]).transpose()
+        indices = np.stack([coo.row, coo.col], axis=1)
         return tf.SparseTensor(indices, coo.data, coo.shape)
 
     def _create_weights(self):
@@ -8,15 +8,15 @@ __author__ = 'Vito Walter Anelli, Claudio Pomo, Daniele Malitesta'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it, daniele.malitesta@poliba.it'
 
 import random
+import time
 from ast import literal_eval as make_tuple
 
-import numpy as np
-import scipy.sparse as sp
 from tqdm import tqdm
 
-from elliot.dataset.samplers import custom_sampler as cs
+from elliot.dataset.samplers import vectorized_sampler as vs
 from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
+from elliot.recommender.graph_based.graph_cache import GraphStructure
 from elliot.recommender.graph_based.ngcf.NGCF_model import NGCFModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
 from elliot.utils.write import store_recommendation
@@ -62,7 +62,7 @@ class NGCF(RecMixin, BaseRecommenderModel):
     def __init__(self, data, config, params, *args, **kwargs):
 
         self._ratings = self._data.train_dict
-        self._sampler = cs.Sampler(self._data.i_train_dict)
+        self._sampler = vs.Sampler(self._data.sp_i_train, self._seed, getattr(self._params, "prefetch", 0))
         if self._batch_size < 1:
             self._batch_size = self._num_users
 
@@ -84,7 +84,11 @@ class NGCF(RecMixin, BaseRecommenderModel):
 
         self._n_layers = len(self._weight_size)
 
-        self._adjacency, self._laplacian = self._create_adj_mat()
+        start = time.time()
+        self._graph = GraphStructure.of(self._data)
+        self._adjacency, self._laplacian = self._graph.adjacency, self._graph.laplacian
+        laplacian_folds = self._graph.folds(self._n_fold)
+        self.logger.info(f"The graph structure preparation has taken: {time.time() - start}")
 
         self._model = NGCFModel(
             num_users=self._num_users,
@@ -99,34 +103,10 @@ class NGCF(RecMixin, BaseRecommenderModel):
             n_fold=self._n_fold,
             adjacency=self._adjacency,
             laplacian=self._laplacian,
+            laplacian_folds=laplacian_folds,
             random_seed=self._seed
         )
 
-    def _create_adj_mat(self):
-        adjacency = sp.dok_matrix((self._num_users + self._num_items,
-                                   self._num_users + self._num_items), dtype=np.float32)
-        adjacency = adjacency.tolil()
-        ratings = self._data.sp_i_train.tolil()
-
-        adjacency[:self._num_users, self._num_users:] = ratings
-        adjacency[self._num_users:, :self._num_users] = ratings.T
-        adjacency = adjacency.todok()
-
-        def normalized_adj_bi(adj):
-            # This is exactly how it's done in the paper. Different normalization approaches might be followed.
-            rowsum = np.array(adj.sum(1))
-            rowsum += 1e-7  # to avoid division by zero warnings
-
-            d_inv_sqrt = np.power(rowsum, -0.5).flatten()
-            d_inv_sqrt[np.isinf(d_inv_sqrt)] = 0.
-            d_mat_inv_sqrt = sp.diags(d_inv_sqrt)
-            bi_adj = adj.dot(d_mat_inv_sqrt).transpose().dot(d_mat_inv_sqrt)
-            return bi_adj.tocoo()
-
-        laplacian = normalized_adj_bi(adjacency)
-
-        return adjacency.tocsr(), laplacian.tocsr()
-
     @property
     def name(self):
         return "NGCF" \
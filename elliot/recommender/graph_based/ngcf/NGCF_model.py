@@ -32,6 +32,7 @@ class NGCFModel(keras.Model):
                  adjacency,
                  laplacian,
                  random_seed,
+                 laplacian_folds=None,
                  name="NGFC",
                  **kwargs
                  ):
@@ -52,7 +53,14 @@ class NGCFModel(keras.Model):
         self.laplacian = laplacian
 
         # Generate a set of adjacency sub-matrix.
-        if len(self.node_dropout):
+        if laplacian_folds is not None:
+            if len(self.node_dropout):
+                # node dropout on the shared folds.
+                self.A_fold_hat = [self._dropout_sparse(fold, self.node_dropout[0], tf.shape(fold.values)[0])
+                                   for fold in laplacian_folds]
+            else:
+                self.A_fold_hat = laplacian_folds
+        elif len(self.node_dropout):
             # node dropout.
             self.A_fold_hat = self._split_A_hat(dropout=True)
         else:
@@ -67,7 +75,7 @@ class NGCFModel(keras.Model):
     @staticmethod
     def _convert_sp_mat_to_sp_tensor(X):
         coo = X.tocoo().astype(np.float32)
-        indices = np.mat([coo.row, coo.col]).transpose()
+        indices = np.stack([coo.row, coo.col], axis=1)
         return tf.SparseTensor(indices, coo.data, coo.shape)
 
     @staticmethod
@@ -1,9 +1,7 @@
 import pickle
 
-import numpy as np
-from scipy import sparse
-from sklearn.metrics.pairwise import cosine_similarity, euclidean_distances, haversine_distances, chi2_kernel, manhattan_distances
-from sklearn.metrics import pairwise_distances
+from elliot.recommender.knn.top_k_sparsifier import similarity_blocks, sparsify_top_k, \
+    supported_similarities, supported_dissimilarities
 
 
 
@@ -38,8 +36,6 @@ class Similarity(object):
         This function initialize the data model
         """
 
-        supported_similarities = ["cosine", "dot", ]
-        supported_dissimilarities = ["euclidean", "manhattan", "haversine",  "chi2", 'cityblock', 'l1', 'l2', 'braycurtis', 'canberra', 'chebyshev', 'correlation', 'dice', 'hamming', 'jaccard', 'kulsinski', 'mahalanobis', 'minkowski', 'rogerstanimoto', 'russellrao', 'seuclidean', 'sokalmichener', 'sokalsneath', 'sqeuclidean', 'yule']
         print(f"\nSupported Similarities: {supported_similarities}")
         print(f"Supported Distances/Dissimilarities: {supported_dissimilarities}\n")
 
@@ -50,35 +46,16 @@ class Similarity(object):
         #
         # self._transactions = self._data.transactions
 
-        self._similarity_matrix = np.empty((len(self._items), len(self._items)))
 
-        self.process_similarity(self._similarity)
+        blocks = self.process_similarity(self._similarity)
         ##############
-        data, rows_indices, cols_indptr = [], [], []
-
-        column_row_index = np.arange(len(self._data.items), dtype=np.int32)
-
-        for item_idx in range(len(self._data.items)):
-            cols_indptr.append(len(data))
-            column_data = self._similarity_matrix[:, item_idx]
-
-            non_zero_data = column_data != 0
-
-            idx_sorted = np.argsort(column_data[non_zero_data])  # sort by column
-            top_k_idx = idx_sorted[-self._num_neighbors:]
-
-            data.extend(column_data[non_zero_data][top_k_idx])
-            rows_indices.extend(column_row_index[non_zero_data][top_k_idx])
-
-        cols_indptr.append(len(data))
-
-        W_sparse = sparse.csc_matrix((data, rows_indices, cols_indptr),
-                                     shape=(len(self._data.items), len(self._data.items)), dtype=np.float32).tocsr()
+        # the similarity is symmetric, so the top-k of each column (the neighbours weighting the item) are
+        # those of the corresponding row
+        W_sparse = sparsify_top_k(blocks, (len(self._data.items), len(self._data.items)), self._num_neighbors).T.tocsr()
         self._preds = self._URM.dot(W_sparse).toarray()
         ##############
         # self.compute_neighbors()
 
-        del self._similarity_matrix
 
     # def compute_neighbors(self):
     #     self._neighbors = {}
@@ -92,24 +69,10 @@ class Similarity(object):
     #     return self._neighbors.get(item, {})
 
     def process_similarity(self, similarity):
-        if similarity == "cosine":
-            self._similarity_matrix = cosine_similarity(self._attribute_matrix)
-        elif similarity == "dot":
-            self._similarity_matrix = (self._attribute_matrix @ self._attribute_matrix.T).toarray()
-        elif similarity == "euclidean":
-            self._similarity_matrix = (1 / (1 + euclidean_distances(self._attribute_matrix)))
-        elif similarity == "manhattan":
-            self._similarity_matrix = (1 / (1 + manhattan_distances(self._attribute_matrix)))
-        elif similarity == "haversine":
-            self._similarity_matrix = (1 / (1 + haversine_distances(self._attribute_matrix)))
-        elif similarity == "chi2":
-            self._similarity_matrix = (1 / (1 + chi2_kernel(self._attribute_matrix)))
-        elif similarity in ['cityblock', 'l1', 'l2']:
-            self._similarity_matrix = (1 / (1 + pairwise_distances(self._attribute_matrix, metric=similarity)))
-        elif similarity in ['braycurtis', 'canberra', 'chebyshev', 'correlation', 'dice', 'hamming', 'jaccard', 'kulsinski', 'mahalanobis', 'minkowski', 'rogerstanimoto', 'russellrao', 'seuclidean', 'sokalmichener', 'sokalsneath', 'sqeuclidean', 'yule']:
-            self._similarity_matrix = (1 / (1 + pairwise_distances(self._attribute_matrix.toarray(), metric=similarity)))
-        else:
+        blocks = similarity_blocks(self._attribute_matrix, similarity)
+        if blocks is None:
             raise Exception("Not implemented similarity")
+        return blocks
 
     # def process_cosine(self):
     #     x, y = np.triu_indices(self._similarity_matrix.shape[0], k=1)
@@ -147,24 +110,8 @@ class Similarity(object):
     #     local_top_k = real_values.argsort()[::-1]
     #     return [(real_indices[item], real_values[item]) for item in local_top_k]
 
-    def get_user_recs(self, u, mask, k):
-        user_id = self._data.public_users.get(u)
-        user_recs = self._preds[user_id]
-        # user_items = self._ratings[u].keys()
-        user_recs_mask = mask[user_id]
-        user_recs[~user_recs_mask] = -np.inf
-        indices, values = zip(*[(self._data.private_items.get(u_list[0]), u_list[1])
-                              for u_list in enumerate(user_recs)])
-
-        # indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+    def predict_block(self, offset, offset_stop):
+        return self._preds[offset:offset_stop]
 
     # @staticmethod
     # def score_item(neighs, user_items):
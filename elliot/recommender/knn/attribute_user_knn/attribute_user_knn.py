@@ -76,7 +76,7 @@ class AttributeUserKNN(RecMixin, BaseRecommenderModel):
         self._model = Similarity(data=self._data, attribute_matrix=self._sp_i_features, num_neighbors=self._num_neighbors, similarity=self._similarity, implicit=self._implicit)
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self._model.get_user_recs(u, mask, k) for u in self._ratings.keys()}
+        return self.get_batched_recommendations(mask, k, self._model.predict_block)
 
     def get_recommendations(self, k: int = 10):
         predictions_top_k_val = {}
@@ -17,6 +17,7 @@ from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.knn.item_knn.item_knn_similarity import Similarity
 from elliot.recommender.knn.item_knn.aiolli_ferrari import AiolliSimilarity
 from elliot.recommender.base_recommender_model import init_charger
+from elliot.recommender.knn.similarity_cache import largest_value
 
 
 class ItemKNN(RecMixin, BaseRecommenderModel):
@@ -60,6 +61,8 @@ class ItemKNN(RecMixin, BaseRecommenderModel):
         self.autoset_params()
 
         self._ratings = self._data.train_dict
+        # the similarity is computed once for all the explored numbers of neighbors
+        max_neighbors = largest_value(self._params, "neighbors", self._num_neighbors)
         if self._implementation == "aiolli":
             self._model = AiolliSimilarity(data=self._data,
                                            maxk=self._num_neighbors,
@@ -70,14 +73,16 @@ class ItemKNN(RecMixin, BaseRecommenderModel):
                                            asymmetric_alpha=self._asymmetric_alpha,
                                            tversky_alpha=self._tversky_alpha,
                                            tversky_beta=self._tversky_beta,
-                                           row_weights=self._row_weights)
+                                           row_weights=self._row_weights,
+                                           max_k=max_neighbors)
         else:
             if (not self._normalize) or (self._asymmetric_alpha) or (self._tversky_alpha) or (self._tversky_beta) or (self._row_weights) or (self._shrink):
                 self.logger.info("Options normalize, asymmetric_alpha, tversky_alpha, tversky_beta, row_weights are ignored with standard implementation. Try with implementation: aiolli")
-            self._model = Similarity(data=self._data, num_neighbors=self._num_neighbors, similarity=self._similarity, implicit=self._implicit)
+            self._model = Similarity(data=self._data, num_neighbors=self._num_neighbors, similarity=self._similarity, implicit=self._implicit,
+                                     max_neighbors=max_neighbors)
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self._model.get_user_recs(u, mask, k) for u in self._ratings.keys()}
+        return self.get_batched_recommendations(mask, k, self._model.predict_block)
 
     def get_recommendations(self, k: int = 10):
         predictions_top_k_val = {}
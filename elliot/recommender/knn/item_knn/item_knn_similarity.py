@@ -1,10 +1,8 @@
 import pickle
 
-import numpy as np
-from scipy import sparse
-from sklearn.metrics.pairwise import cosine_similarity, euclidean_distances, haversine_distances, chi2_kernel, manhattan_distances
-from sklearn.metrics import pairwise_distances
-from sklearn.preprocessing import normalize
+from elliot.recommender.knn.similarity_cache import top_k_neighbors
+from elliot.recommender.knn.top_k_sparsifier import similarity_blocks, sparsify_top_k, \
+    supported_similarities, supported_dissimilarities
 
 
 class Similarity(object):
@@ -12,10 +10,11 @@ class Similarity(object):
     Simple kNN class
     """
 
-    def __init__(self, data, num_neighbors, similarity, implicit):
+    def __init__(self, data, num_neighbors, similarity, implicit, max_neighbors=None):
         self._data = data
         self._ratings = data.train_dict
         self._num_neighbors = num_neighbors
+        self._max_neighbors = max_neighbors or num_neighbors
         self._similarity = similarity
         self._implicit = implicit
 
@@ -36,8 +35,8 @@ class Similarity(object):
         This function initialize the data model
         """
 
-        self.supported_similarities = ["cosine", "dot", ]
-        self.supported_dissimilarities = ["euclidean", "manhattan", "haversine",  "chi2", 'cityblock', 'l1', 'l2', 'braycurtis', 'canberra', 'chebyshev', 'correlation', 'dice', 'hamming', 'jaccard', 'kulsinski', 'mahalanobis', 'minkowski', 'rogerstanimoto', 'russellrao', 'seuclidean', 'sokalmichener', 'sokalsneath', 'sqeuclidean', 'yule']
+        self.supported_similarities = supported_similarities
+        self.supported_dissimilarities = supported_dissimilarities
         print(f"\nSupported Similarities: {self.supported_similarities}")
         print(f"Supported Distances/Dissimilarities: {self.supported_dissimilarities}\n")
 
@@ -48,38 +47,18 @@ class Similarity(object):
 
         # self._transactions = self._data.transactions
 
-        self._similarity_matrix = np.empty((len(self._items), len(self._items)))
-
-        self.process_similarity(self._similarity)
 
         # self._similarity_matrix = normalize(self._similarity_matrix, norm='l1', axis=1)
 
         ##############
-        data, rows_indices, cols_indptr = [], [], []
-
-        column_row_index = np.arange(len(self._data.items), dtype=np.int32)
-
-        for item_idx in range(len(self._data.items)):
-            cols_indptr.append(len(data))
-            column_data = self._similarity_matrix[:, item_idx]
-
-            non_zero_data = column_data != 0
-
-            idx_sorted = np.argsort(column_data[non_zero_data])  # sort by column
-            top_k_idx = idx_sorted[-self._num_neighbors:]
-
-            data.extend(column_data[non_zero_data][top_k_idx])
-            rows_indices.extend(column_row_index[non_zero_data][top_k_idx])
-
-        cols_indptr.append(len(data))
-
-        W_sparse = sparse.csc_matrix((data, rows_indices, cols_indptr),
-                                     shape=(len(self._data.items), len(self._data.items)), dtype=np.float32).tocsr()
+        # the similarity is symmetric, so the top-k of each column (the neighbours weighting the item) are
+        # those of the corresponding row
+        W_sparse = top_k_neighbors(self._URM, ("item", self._similarity), self._num_neighbors,
+                                   self._max_neighbors, self.top_k_similarity).T.tocsr()
         self._preds = self._URM.dot(W_sparse).toarray()
         ##############
         # self.compute_neighbors()
 
-        del self._similarity_matrix
 
     # def compute_neighbors(self):
     #     self._neighbors = {}
@@ -92,30 +71,19 @@ class Similarity(object):
     # def get_item_neighbors(self, item):
     #     return self._neighbors.get(item, {})
 
+    def top_k_similarity(self, k):
+        """
+        The k most similar items of each item
+        """
+        return sparsify_top_k(self.process_similarity(self._similarity), (len(self._data.items), len(self._data.items)), k)
+
     def process_similarity(self, similarity):
-        if similarity == "cosine":
-            # x, y = np.triu_indices(self._similarity_matrix.shape[0], k=1)
-            # self._similarity_matrix[x, y] = cosine_similarity(self._data.sp_i_train_ratings.T)[x, y]
-            self._similarity_matrix = cosine_similarity(self._URM.T)
-        elif similarity == "dot":
-            self._similarity_matrix = (self._URM.T @ self._URM).toarray()
-        elif similarity == "euclidean":
-            self._similarity_matrix = (1 / (1 + euclidean_distances(self._URM.T)))
-        elif similarity == "manhattan":
-            self._similarity_matrix = (1 / (1 + manhattan_distances(self._URM.T)))
-        elif similarity == "haversine":
-            self._similarity_matrix = (1 / (1 + haversine_distances(self._URM.T)))
-        elif similarity == "chi2":
-            self._similarity_matrix = (1 / (1 + chi2_kernel(self._URM.T)))
-        elif similarity in ['cityblock', 'l1', 'l2']:
-            self._similarity_matrix = (1 / (1 + pairwise_distances(self._URM.T, metric=similarity)))
-        elif similarity in ['braycurtis', 'canberra', 'chebyshev', 'correlation', 'dice', 'hamming', 'jaccard', 'kulsinski', 'mahalanobis', 'minkowski', 'rogerstanimoto', 'russellrao', 'seuclidean', 'sokalmichener', 'sokalsneath', 'sqeuclidean', 'yule']:
-
-            self._similarity_matrix = (1 / (1 + pairwise_distances(self._URM.T.toarray(), metric=similarity)))
-        else:
+        blocks = similarity_blocks(self._URM.T.tocsr(), similarity)
+        if blocks is None:
             raise ValueError("Compute Similarity: value for parameter 'similarity' not recognized."
                              f"\nAllowed values are: {self.supported_similarities}, {self.supported_dissimilarities}."
                              f"\nPassed value was {similarity}\nTry with implementation: aiolli")
+        return blocks
 
     # def process_cosine(self):
     #     x, y = np.triu_indices(self._similarity_matrix.shape[0], k=1)
@@ -154,24 +122,8 @@ class Similarity(object):
     #     local_top_k = real_values.argsort()[::-1]
     #     return [(real_indices[item], real_values[item]) for item in local_top_k]
 
-    def get_user_recs(self, u, mask, k):
-        user_id = self._data.public_users.get(u)
-        user_recs = self._preds[user_id]
-        # user_items = self._ratings[u].keys()
-        user_recs_mask = mask[user_id]
-        user_recs[~user_recs_mask] = -np.inf
-        indices, values = zip(*[(self._data.private_items.get(u_list[0]), u_list[1])
-                              for u_list in enumerate(user_recs)])
-
-        # indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+    def predict_block(self, offset, offset_stop):
+        return self._preds[offset:offset_stop]
 
     # @staticmethod
     # def score_item(neighs, user_items):
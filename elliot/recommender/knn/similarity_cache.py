@@ -0,0 +1,67 @@
+"""
+Module description:
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+from collections import OrderedDict
+
+from elliot.dataset.dataset_cache import fingerprint
+from elliot.recommender.knn.top_k_sparsifier import top_k_per_row
+
+_MAX_BYTES = 1 << 30
+_similarities = OrderedDict()
+
+
+def largest_value(params, name, value):
+    """
+    Largest value a hyperparameter takes in the exploration of a model
+    :param params: the hyperparameters of the model
+    :param name: name of the hyperparameter
+    :param value: value of the hyperparameter in the current run
+    :return: the largest value of the explored list of values, or value if the hyperparameter is not explored as a
+             list of numbers
+    """
+    values = getattr(params, "search_space", {}).get(name)
+    if isinstance(values, list) and values and \
+            all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return max(max(values), value)
+    return value
+
+
+def top_k_neighbors(matrix, options, k, max_k, compute):
+    """
+    The k nearest neighbours of each row of a similarity, shared by the runs with the same data and options.
+    The neighbours are computed once at the largest neighbourhood max_k, and smaller neighbourhoods are obtained
+    by keeping the k largest values of each row.
+    :param matrix: the training matrix the similarity is computed on
+    :param options: a hashable description of every option of the similarity but the number of neighbours
+    :param k: number of neighbours
+    :param max_k: largest number of neighbours that the runs with the same options will request
+    :param compute: function that maps a number of neighbours n to the sparse matrix of the n largest values of each
+                    row of the similarity
+    :return: the sparse matrix of the k largest values of each row of the similarity
+    """
+    key = (fingerprint(matrix), options)
+    entry = _similarities.get(key)
+    if entry is None or entry[0] < k:
+        n = max(k, max_k)
+        entry = (n, compute(n))
+        _similarities[key] = entry
+    _similarities.move_to_end(key)
+    _evict()
+
+    n, neighbors = entry
+    return neighbors if n == k else top_k_per_row(neighbors, k)
+
+
+def _evict():
+    def size(neighbors):
+        return neighbors.data.nbytes + neighbors.indices.nbytes + neighbors.indptr.nbytes
+
+    # the most recent entry is always kept
+    while len(_similarities) > 1 and sum(size(neighbors) for _, neighbors in _similarities.values()) > _MAX_BYTES:
+        _similarities.popitem(last=False)
@@ -0,0 +1,115 @@
+"""
+Module description:
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+import numpy as np
+from scipy import sparse
+from sklearn.metrics import pairwise_distances
+from sklearn.metrics.pairwise import cosine_similarity, euclidean_distances, haversine_distances, chi2_kernel, \
+    manhattan_distances
+
+supported_similarities = ["cosine", "dot", ]
+supported_dissimilarities = ["euclidean", "manhattan", "haversine", "chi2", 'cityblock', 'l1', 'l2', 'braycurtis',
+                             'canberra', 'chebyshev', 'correlation', 'dice', 'hamming', 'jaccard', 'kulsinski',
+                             'mahalanobis', 'minkowski', 'rogerstanimoto', 'russellrao', 'seuclidean', 'sokalmichener',
+                             'sokalsneath', 'sqeuclidean', 'yule']
+
+
+def similarity_blocks(matrix, similarity):
+    """
+    Block-wise pairwise similarity between the rows of a matrix
+    :param matrix: the (sparse) matrix whose rows are compared
+    :param similarity: a supported similarity, or a supported dissimilarity d, which is turned into 1 / (1 + d)
+    :return: a function that maps a range of rows [start, stop) to the dense (stop - start) x rows similarity block,
+             or None if the similarity is not supported
+    """
+    if similarity == "cosine":
+        return lambda start, stop: cosine_similarity(matrix[start:stop], matrix)
+    elif similarity == "dot":
+        return lambda start, stop: (matrix[start:stop] @ matrix.T).toarray()
+    elif similarity == "euclidean":
+        return lambda start, stop: 1 / (1 + euclidean_distances(matrix[start:stop], matrix))
+    elif similarity == "manhattan":
+        return lambda start, stop: 1 / (1 + manhattan_distances(matrix[start:stop], matrix))
+    elif similarity == "haversine":
+        return lambda start, stop: 1 / (1 + haversine_distances(matrix[start:stop], matrix))
+    elif similarity == "chi2":
+        return lambda start, stop: 1 / (1 + chi2_kernel(matrix[start:stop], matrix))
+    elif similarity in ['cityblock', 'l1', 'l2']:
+        return lambda start, stop: 1 / (1 + pairwise_distances(matrix[start:stop], matrix, metric=similarity))
+    elif similarity in supported_dissimilarities:
+        dense = matrix.toarray() if sparse.issparse(matrix) else np.asarray(matrix)
+        # the metric parameters must come from the whole matrix, not from the block at hand
+        params = {}
+        if similarity == "seuclidean":
+            params["V"] = np.var(dense, axis=0, ddof=1)
+        elif similarity == "mahalanobis":
+            params["VI"] = np.linalg.inv(np.cov(dense.T)).T
+        return lambda start, stop: 1 / (1 + pairwise_distances(dense[start:stop], dense, metric=similarity, **params))
+    return None
+
+
+def sparsify_top_k(blocks, shape, k, block_size=1 << 24, dtype=np.float32):
+    """
+    Keeps the k largest non-zero values of each row of a matrix that is only available one block of rows at a time.
+    Each dense block is reduced at once with a row-wise argpartition and appended to the CSR arrays, so that the
+    memory never exceeds a block and the resulting sparse matrix.
+    :param blocks: a function that maps a range of rows [start, stop) to the dense block of those rows, which is
+                   overwritten
+    :param shape: shape of the whole matrix
+    :param k: number of values to keep in each row
+    :param block_size: maximum number of values of a block
+    :param dtype: type of the stored values
+    :return: the sparse top-k matrix in CSR format
+    """
+    n_rows, n_cols = shape
+    k = max(0, min(k, n_cols))
+    rows_per_block = max(1, block_size // max(1, n_cols))
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    indices, data = [], []
+
+    for start in range(0, n_rows, rows_per_block):
+        stop = min(start + rows_per_block, n_rows)
+        block = np.array(blocks(start, stop), dtype=np.float64, copy=False)
+        if k == 0:
+            continue
+        # zeros must never be selected in place of negative values
+        block[block == 0] = -np.inf
+        if k < n_cols:
+            top_k = np.argpartition(block, n_cols - k, axis=1)[:, n_cols - k:]
+            top_k.sort(axis=1)
+        else:
+            top_k = np.broadcast_to(np.arange(n_cols), block.shape)
+        values = np.take_along_axis(block, top_k, axis=1)
+        keep = values != -np.inf
+        indptr[start + 1:stop + 1] = keep.sum(axis=1)
+        indices.append(top_k[keep].astype(np.int32))
+        data.append(values[keep].astype(dtype))
+
+    np.cumsum(indptr, out=indptr)
+    indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32)
+    data = np.concatenate(data) if data else np.zeros(0, dtype=dtype)
+    return sparse.csr_matrix((data, indices, indptr), shape=shape)
+
+
+def top_k_per_row(matrix, k):
+    """
+    Keeps the k largest non-zero values of each row of a sparse matrix
+    :param matrix: the sparse matrix
+    :param k: number of values to keep in each row
+    :return: the sparse top-k matrix in CSR format
+    """
+    matrix = sparse.csr_matrix(matrix, copy=True)
+    matrix.eliminate_zeros()
+    counts = np.diff(matrix.indptr)
+    rows = np.repeat(np.arange(matrix.shape[0]), counts)
+    # within each row, entries by decreasing value
+    order = np.lexsort((-matrix.data, rows))
+    rank = np.arange(len(order)) - np.repeat(matrix.indptr[:-1], counts)
+    kept = order[rank < k]
+    return sparse.csr_matrix((matrix.data[kept], (rows[kept], matrix.indices[kept])), shape=matrix.shape)
@@ -11,6 +11,8 @@ import numpy as np
 import time, sys
 import scipy.sparse as sp
 
+from elliot.recommender.knn.similarity_cache import top_k_neighbors
+
 
 def check_matrix(X, format='csc', dtype=np.float32):
     """
@@ -56,7 +58,8 @@ class AiolliSimilarity(object):
                  asymmetric_alpha=0.5,
                  tversky_alpha = 1.0,
                  tversky_beta = 1.0,
-                 row_weights = None):
+                 row_weights = None,
+                 max_k=None):
         """
         ItemKNN recommender
         Parameters
@@ -64,6 +67,7 @@ class AiolliSimilarity(object):
         user_num : int, the number of users
         item_num : int, the number of items
         maxk : int, the max similar items number
+        max_k : int, the largest maxk explored with the same options, whose similarity is shared with smaller maxk
         shrink : float, shrink similarity value
         similarity : str, way to calculate similarity
         normalize : bool, whether calculate similarity with normalized value
@@ -85,6 +89,7 @@ class AiolliSimilarity(object):
         self.item_num = self._data.num_items
 
         self.k = maxk
+        self.max_k = max_k or maxk
         self.shrink = shrink
         self.normalize = normalize
         self.similarity = similarity
@@ -112,40 +117,30 @@ class AiolliSimilarity(object):
             print("{}: Detected {} ({:.2f} %) cold items.".format(
                 self.RECOMMENDER_NAME, cold_user_mask.sum(), cold_user_mask.sum() / len(cold_user_mask) * 100))
 
+        # the columns of the similarity hold the neighbours of each user
+        options = ("user", "aiolli", self.similarity, self.shrink, self.normalize, self.asymmetric_alpha,
+                   self.tversky_alpha, self.tversky_beta,
+                   None if self.row_weights is None else tuple(np.ravel(self.row_weights)))
+        w_sparse = top_k_neighbors(train, options, self.k, self.max_k,
+                                   lambda k: self._compute_similarity(train, k).T).T.tocsc()
+
+        # self.pred_mat = w_sparse.dot(train).tolil()
+        self.pred_mat = w_sparse.dot(train).toarray()
+
+    def _compute_similarity(self, train, k):
         similarity = Compute_Similarity(train.T,
                                         shrink=self.shrink,
-                                        topK=self.k,
+                                        topK=k,
                                         normalize=self.normalize,
                                         similarity=self.similarity,
                                         asymmetric_alpha=self.asymmetric_alpha,
                                         tversky_alpha=self.tversky_alpha,
                                         tversky_beta=self.tversky_beta,
                                         row_weights=self.row_weights)
+        return similarity.compute_similarity()
 
-        w_sparse = similarity.compute_similarity()
-        w_sparse = w_sparse.tocsc()
-
-        # self.pred_mat = w_sparse.dot(train).tolil()
-        self.pred_mat = w_sparse.dot(train).toarray()
-
-    def get_user_recs(self, u, mask, k):
-        user_id = self._data.public_users.get(u)
-        user_recs = self.pred_mat[user_id]
-        # user_items = self._ratings[u].keys()
-        user_recs_mask = mask[user_id]
-        user_recs[~user_recs_mask] = -np.inf
-        indices, values = zip(*[(self._data.private_items.get(u_list[0]), u_list[1])
-                              for u_list in enumerate(user_recs)])
-
-        # indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+    def predict_block(self, offset, offset_stop):
+        return self.pred_mat[offset:offset_stop]
 
     # def get_user_recs(self, user, k=100):
     #     user_items = self._data.train_dict[user].keys()
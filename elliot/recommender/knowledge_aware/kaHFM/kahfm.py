@@ -5,7 +5,7 @@ import typing as t
 from tqdm import tqdm
 
 
-from elliot.dataset.samplers import custom_sampler as cs
+from elliot.dataset.samplers import vectorized_sampler as vs
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.recommender_utils_mixin import RecMixin
 from elliot.utils.write import store_recommendation
@@ -104,7 +104,7 @@ class KaHFM(RecMixin, BaseRecommenderModel):
                                  self._positive_item_regularization,
                                  self._negative_item_regularization)
         self._embed_k = self._model.get_factors()
-        self._sampler = cs.Sampler(self._data.i_train_dict)
+        self._sampler = vs.Sampler(self._data.sp_i_train, self._seed, getattr(self._params, "prefetch", 0))
         self._batch_size = 10000
 
     def get_recommendations(self, k: int = 10):
@@ -121,7 +121,7 @@ class KaHFM(RecMixin, BaseRecommenderModel):
         return predictions_top_k_val, predictions_top_k_test
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self._model.get_user_predictions(u, mask, k) for u in self._ratings.keys()}
+        return self.get_batched_recommendations(mask, k, self._model.predict_block)
 
     # def get_recommendations(self, k: int = 100):
     #     return {u: self._model.get_user_recs(u, k) for u in self._ratings.keys()}
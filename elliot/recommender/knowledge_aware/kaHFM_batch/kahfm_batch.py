@@ -10,7 +10,7 @@ __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it, daniele.malite
 import numpy as np
 from tqdm import tqdm
 
-from elliot.dataset.samplers import custom_sampler as cs
+from elliot.dataset.samplers import vectorized_sampler as vs
 from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.knowledge_aware.kaHFM_batch.kahfm_batch_model import KaHFM_model
@@ -83,7 +83,7 @@ class KaHFMBatch(RecMixin, BaseRecommenderModel):
 
         self._side = getattr(self._data.side_information, self._loader, None)
 
-        self._sampler = cs.Sampler(self._data.i_train_dict)
+        self._sampler = vs.Sampler(self._data.sp_i_train, self._seed, getattr(self._params, "prefetch", 0))
 
         self._tfidf_obj = TFIDF(self._side.feature_map)
         self._tfidf = self._tfidf_obj.tfidf()
@@ -11,6 +11,7 @@ __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 from elliot.dataset.samplers import custom_sampler as cs
+from elliot.dataset.samplers import vectorized_sampler as vs
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.recommender_utils_mixin import RecMixin
@@ -33,6 +34,8 @@ class BPRMF(RecMixin, BaseRecommenderModel):
         update_users:
         update_items:
         update_bias:
+        batch_size: Number of triples of each mini-batch. With 1 (default), the factors are updated after each
+            triple, as in the original per-sample SGD; larger batches are sampled and updated in vectorized form
 
 
     To include the recommendation model, add it to the config file adopting the following pattern:
@@ -77,7 +80,7 @@ class BPRMF(RecMixin, BaseRecommenderModel):
         ]
         self.autoset_params()
 
-        self._batch_size = 1
+        self._batch_size = max(1, int(self._batch_size))
         self._ratings = self._data.train_dict
 
         self._model = MFModel(self._factors,
@@ -88,7 +91,12 @@ class BPRMF(RecMixin, BaseRecommenderModel):
                               self._positive_item_regularization,
                               self._negative_item_regularization,
                               self._seed)
-        self._sampler = cs.Sampler(self._data.i_train_dict)
+        if self._batch_size == 1:
+            self._sampler = cs.Sampler(self._data.i_train_dict)
+            self._train_step = self._model.train_step
+        else:
+            self._sampler = vs.Sampler(self._data.sp_i_train, self._seed, getattr(self._params, "prefetch", 0))
+            self._train_step = self._model.train_batch_step
 
     def get_recommendations(self, k: int = 10):
         predictions_top_k_val = {}
@@ -102,7 +110,7 @@ class BPRMF(RecMixin, BaseRecommenderModel):
         return predictions_top_k_val, predictions_top_k_test
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self._model.get_user_predictions(u, mask, k) for u in self._ratings.keys()}
+        return self.get_batched_recommendations(mask, k, self._model.predict_block)
 
     @property
     def name(self):
@@ -123,7 +131,7 @@ class BPRMF(RecMixin, BaseRecommenderModel):
             with tqdm(total=int(self._data.transactions // self._batch_size), disable=not self._verbose) as t:
                 for batch in self._sampler.step(self._data.transactions, self._batch_size):
                     steps += 1
-                    self._model.train_step(batch)
+                    self._train_step(batch)
                     t.update()
 
             self.evaluate(it)
@@ -67,27 +67,40 @@ class MFModel(object):
         return self._global_bias + self._item_bias[item] \
                + self._user_factors[user] @ self._item_factors[item]
 
-    def get_user_predictions(self, user_id, mask, top_k=10):
-        user_id = self._public_users.get(user_id)
-        b = self._item_bias + self._user_factors[user_id] @ self._item_factors.T
-        a = mask[user_id]
-        b[~a] = -np.inf
-        indices, values = zip(*[(self._private_items.get(u_list[0]), u_list[1])
-                              for u_list in enumerate(b.data)])
-
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(top_k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+    def predict_block(self, offset, offset_stop):
+        return self._item_bias + self._user_factors[offset:offset_stop] @ self._item_factors.T
 
     def train_step(self, batch, **kwargs):
         for u, i, j in zip(*batch):
             self.update_factors(u[0], i[0], j[0])
 
+    def train_batch_step(self, batch, **kwargs):
+        """
+        Mini-batch update: the gradients of all the triples are computed with the current parameters, and they are
+        scatter-added, so that the repeated users and items of a batch accumulate all their updates
+        """
+        users, items_i, items_j = (b.ravel() for b in batch)
+        user_factors = self._user_factors[users]
+        item_factors_i = self._item_factors[items_i]
+        item_factors_j = self._item_factors[items_j]
+        item_bias_i = self._item_bias[items_i]
+        item_bias_j = self._item_bias[items_j]
+
+        z = 1/(1 + np.exp(item_bias_i - item_bias_j +
+                          np.einsum('bf,bf->b', user_factors, item_factors_i - item_factors_j)))
+        lr = self._learning_rate
+
+        np.add.at(self._item_bias, items_i, lr * (z - self._bias_regularization*item_bias_i))
+        np.add.at(self._item_bias, items_j, lr * (-z - self._bias_regularization*item_bias_j))
+
+        z = z[:, None]
+        np.add.at(self._user_factors, users,
+                  lr * ((item_factors_i - item_factors_j)*z - self._user_regularization*user_factors))
+        np.add.at(self._item_factors, items_i,
+                  lr * (user_factors*z - self._positive_item_regularization*item_factors_i))
+        np.add.at(self._item_factors, items_j,
+                  lr * (-user_factors*z - self._negative_item_regularization*item_factors_j))
+
     def update_factors(self, ui: int, ii: int, ji: int):
         user_factors = self._user_factors[ui]
         item_factors_i = self._item_factors[ii]
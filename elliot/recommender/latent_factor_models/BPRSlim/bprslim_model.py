@@ -83,19 +83,8 @@ class BPRSlimModel(object):
 
         return x_ui
 
-    def get_user_recs(self, user, mask, k=100):
-        user_mask = mask[self._data.public_users[user]]
-        predictions = {i: self.predict(user, i) for i in self._data.items if user_mask[self._data.public_items[i]]}
-
-        indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+    def predict_block(self, offset, offset_stop):
+        return self._data.sp_i_train[offset:offset_stop] @ self._s_dense.T
 
     def get_model_state(self):
         saving_dict = {}
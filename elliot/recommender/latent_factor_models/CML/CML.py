@@ -12,7 +12,7 @@ import pickle
 import numpy as np
 from tqdm import tqdm
 
-from elliot.dataset.samplers import custom_sampler as cs
+from elliot.dataset.samplers import vectorized_sampler as vs
 from elliot.recommender import BaseRecommenderModel
 from elliot.recommender.latent_factor_models.CML.CML_model import CML_model
 from elliot.recommender.recommender_utils_mixin import RecMixin
@@ -80,7 +80,7 @@ class CML(RecMixin, BaseRecommenderModel):
 
         self._ratings = self._data.train_dict
 
-        self._sampler = cs.Sampler(self._data.i_train_dict)
+        self._sampler = vs.Sampler(self._data.sp_i_train, self._seed, getattr(self._params, "prefetch", 0))
 
         self._model = CML_model(self._user_factors,
                                 self._item_factors,
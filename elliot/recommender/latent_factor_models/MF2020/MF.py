@@ -14,7 +14,6 @@ from elliot.recommender.latent_factor_models.MF2020 import custom_sampler_rendle
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
 from elliot.recommender.base_recommender_model import init_charger
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 from elliot.recommender.latent_factor_models.MF2020.MF_model import MFModel
 
@@ -88,7 +87,7 @@ class MF2020(RecMixin, BaseRecommenderModel):
         return predictions_top_k_val, predictions_top_k_test
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self._model.get_user_predictions(u, mask, k) for u in self._data.train_dict.keys()}
+        return self.get_batched_recommendations(mask, k, self._model.predict_block)
 
     def predict(self, u: int, i: int):
         """
@@ -137,7 +136,7 @@ class MF2020(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self._store_recs(recs)
             return True
 
         except Exception as ex:
@@ -57,25 +57,8 @@ class MFModel(object):
         return self._global_bias + self._user_bias[user] + self._item_bias[item] \
                + self._user_factors[user] @ self._item_factors[item]
 
-    def get_user_predictions(self, user_id, mask, top_k=10):
-        user_id = self._public_users.get(user_id)
-        # b = self._train[user_id].dot(W_sparse)
-        # b = self._global_bias + self._user_bias[user_id] + self._item_bias \
-        #        + self._user_factors[user_id] @ self._item_factors.T
-        b = self._preds[user_id]
-        a = mask[user_id]
-        b[~a] = -np.inf
-        indices, values = zip(*[(self._private_items.get(u_list[0]), u_list[1])
-                              for u_list in enumerate(b.data)])
-
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(top_k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+    def predict_block(self, offset, offset_stop):
+        return self._preds[offset:offset_stop]
 
     def train_step(self, batch, **kwargs):
         sum_of_loss = 0
@@ -89,7 +89,7 @@ class NonNegMF(RecMixin, BaseRecommenderModel):
         return predictions_top_k_val, predictions_top_k_test
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self._model.get_user_recs(u, mask, k) for u in self._data.train_dict.keys()}
+        return self.get_batched_recommendations(mask, k, self._model.predict_block)
 
 
     def train(self):
@@ -11,7 +11,6 @@ import numpy as np
 import pickle
 
 from elliot.recommender.recommender_utils_mixin import RecMixin
-from elliot.utils.write import store_recommendation
 
 from elliot.recommender.latent_factor_models.PureSVD.pure_svd_model import PureSVDModel
 from elliot.recommender.base_recommender_model import BaseRecommenderModel
@@ -64,7 +63,7 @@ class PureSVD(RecMixin, BaseRecommenderModel):
         return predictions_top_k_val, predictions_top_k_test
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self._model.get_user_recs(u, mask, k) for u in self._ratings.keys()}
+        return self.get_batched_recommendations(mask, k, self._model.predict_block)
 
     def predict(self, u: int, i: int):
         """
@@ -100,7 +99,7 @@ class PureSVD(RecMixin, BaseRecommenderModel):
 
             print("******************************************")
             if self._save_recs:
-                store_recommendation(recs, self._config.path_output_rec_result + f"{self.name}.tsv")
+                self._store_recs(recs)
             return True
 
         except Exception as ex:
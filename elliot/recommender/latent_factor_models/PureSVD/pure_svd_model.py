@@ -9,7 +9,6 @@ __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
 import pickle
 
-import numpy as np
 from scipy import sparse as sp
 from sklearn.utils.extmath import randomized_svd
 
@@ -45,34 +44,8 @@ class PureSVDModel(object):
     def predict(self, user, item):
         return self.user_vec[self._data.public_users[user], :].dot(self.item_vec[self._data.public_items[item], :])
 
-    def get_user_recs(self, user_id, mask, top_k=100):
-        # user_items = self._data.train_dict[user].keys()
-        # k = min(k, self._data.num_items - len(user_items))
-        # predictions = {i: self.predict(user, i) for i in self._data.items if i not in user_items}
-        # indices, values = zip(*predictions.items())
-        # indices = np.array(indices)
-        # values = np.array(values)
-        # local_k = min(k, len(values))
-        # partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        # real_values = values[partially_ordered_preds_indices]
-        # real_indices = indices[partially_ordered_preds_indices]
-        # local_top_k = real_values.argsort()[::-1]
-        # return [(real_indices[item], real_values[item]) for item in local_top_k]
-        user_id = self._public_users.get(user_id)
-        b = self.user_vec[user_id] @ self.item_vec.T
-        a = mask[user_id]
-        b[~a] = -np.inf
-        indices, values = zip(*[(self._private_items.get(u_list[0]), u_list[1])
-                                for u_list in enumerate(b.data)])
-
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(top_k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+    def predict_block(self, offset, offset_stop):
+        return self.user_vec[offset:offset_stop] @ self.item_vec.T
 
     def get_model_state(self):
         saving_dict = {}
@@ -20,8 +20,8 @@ from elliot.utils.write import store_recommendation
 class Slim(RecMixin, BaseRecommenderModel):
     r"""
     Train a Sparse Linear Methods (SLIM) item similarity model.
-        NOTE: ElasticNet solver is parallel, a single intance of SLIM_ElasticNet will
-              make use of half the cores available
+        NOTE: the items are fitted in parallel by `workers` processes, each one running single-threaded
+              ElasticNet solvers
         See:
             Efficient Top-N Recommendation by Linear Regression,
             M. Levy and K. Jack, LSRS workshop at RecSys 2013.
@@ -35,6 +35,10 @@ class Slim(RecMixin, BaseRecommenderModel):
     Args:
         l1_ratio:
         alpha:
+        neighborhood: Number of coefficients kept for each item
+        workers: Number of processes fitting the items (a non-positive value uses all the available cores)
+        approximate: Fit each item only on the items co-occurring with it, read from a Gram matrix computed once
+        candidates: With approximate, maximum number of (most co-occurring) items each item is fitted on
 
     To include the recommendation model, add it to the config file adopting the following pattern:
 
@@ -46,6 +50,8 @@ class Slim(RecMixin, BaseRecommenderModel):
             save_recs: True
           l1_ratio: 0.001
           alpha: 0.001
+          neighborhood: 10
+          workers: 4
     """
 
     @init_charger
@@ -63,8 +69,13 @@ class Slim(RecMixin, BaseRecommenderModel):
         self._sp_i_train = self._data.sp_i_train
         self._i_items_set = list(range(self._num_items))
 
+        # like workers, approximate and candidates are read apart from _params_list, so that they stay out of the
+        # model name and the existing result and weight names do not change
         self._model = SlimModel(self._data, self._num_users, self._num_items, self._l1_ratio, self._alpha,
-                                self._epochs, self._neighborhood, self._seed)
+                                self._epochs, self._neighborhood, self._seed,
+                                int(getattr(self._params, "workers", 1)),
+                                getattr(self._params, "approximate", False),
+                                int(getattr(self._params, "candidates", 0)))
 
     @property
     def name(self):
@@ -84,21 +95,7 @@ class Slim(RecMixin, BaseRecommenderModel):
         return predictions_top_k_val, predictions_top_k_test
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self._model.get_user_recs(u, mask, k) for u in self._data.train_dict.keys()}
-
-    def get_recommendations(self, k: int = 10):
-        self._model.prepare_predictions()
-
-        predictions_top_k_val = {}
-        predictions_top_k_test = {}
-
-        recs_val, recs_test = self.process_protocol(k)
-
-        predictions_top_k_val.update(recs_val)
-        predictions_top_k_test.update(recs_test)
-
-        return predictions_top_k_val, predictions_top_k_test
-
+        return self.get_batched_recommendations(mask, k, self._model.predict_block)
 
     def predict(self, u: int, i: int):
         """
@@ -7,17 +7,34 @@ __version__ = '0.3.1'
 __author__ = 'Felice Antonio Merra, Vito Walter Anelli, Claudio Pomo'
 __email__ = 'felice.merra@poliba.it, vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
+import multiprocessing as mp
+import os
 import pickle
 import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import sys
 import scipy.sparse as sp
 from sklearn.linear_model import ElasticNet
 
 
+_model = None
+
+
+def _init_worker(model):
+    global _model
+    _model = model
+
+
+def _fit_items(items):
+    return _model.fit_items(items)
+
+
 class SlimModel(object):
     def __init__(self,
-                 data, num_users, num_items, l1_ratio, alpha, epochs, neighborhood, random_seed):
+                 data, num_users, num_items, l1_ratio, alpha, epochs, neighborhood, random_seed,
+                 workers=1, approximate=False, candidates=0):
 
         self._data = data
         self._num_users = num_users
@@ -26,6 +43,9 @@ class SlimModel(object):
         self._alpha = alpha
         self._epochs = epochs
         self._neighborhood = neighborhood
+        self._workers = workers if workers > 0 else os.cpu_count()
+        self._approximate = approximate
+        self._candidates = candidates
 
         self.md = ElasticNet(alpha=self._alpha,
                              l1_ratio=self._l1_ratio,
@@ -38,108 +58,125 @@ class SlimModel(object):
                              random_state=random_seed,
                              tol=1e-4)
 
+        self._train = None
+        self._gram = None
         self._w_sparse = None
-        self.pred_mat = None
 
     def train(self, verbose):
-        train = self._data.sp_i_train_ratings
-
-        dataBlock = 10000000
-
-        rows = np.empty(dataBlock, dtype=np.int32)
-        cols = np.empty(dataBlock, dtype=np.int32)
-        values = np.empty(dataBlock, dtype=np.float32)
-
-        numCells = 0
-
+        # the item columns are zeroed and restored in a private copy, never in the shared dataset matrix
+        self._train = self._data.sp_i_train_ratings.tocsc(copy=True)
+        if self._approximate:
+            # the item co-occurrence (Gram) matrix, computed once and shared by all the items
+            self._gram = (self._train.T @ self._train).tocsc()
+
+        shards = [shard for shard in np.array_split(np.arange(self._num_items), max(1, 4 * self._workers))
+                  if len(shard)]
+        results = []
         start_time = time.time()
-        start_time_printBatch = start_time
-
-        for currentItem in range(self._num_items):
-            y = train[:, currentItem].toarray()
-
-            # set the j-th column of X to zero
+        if self._workers > 1 and len(shards) > 1 and "fork" in mp.get_all_start_methods():
+            # forked workers read the training matrix copy-on-write: only the columns they zero are duplicated
+            with ProcessPoolExecutor(max_workers=self._workers, mp_context=mp.get_context("fork"),
+                                     initializer=_init_worker, initargs=(self,)) as executor:
+                for shard, result in zip(shards, executor.map(_fit_items, shards)):
+                    results.append(result)
+                    self._log_progress(verbose, shard[-1] + 1, start_time)
+        else:
+            for shard in shards:
+                results.append(self.fit_items(shard))
+                self._log_progress(verbose, shard[-1] + 1, start_time)
+
+        rows, cols, values = (np.concatenate(r) for r in zip(*results))
+        # generate the sparse weight matrix
+        self._w_sparse = sp.csr_matrix((values, (rows, cols)), shape=(self._num_items, self._num_items),
+                                       dtype=np.float32)
+        self._train, self._gram = None, None
+
+    def fit_items(self, items):
+        """
+        Fits the ElasticNet models of a set of items
+        :param items: the item indices
+        :return: row, column, and value arrays of the top-neighborhood coefficients of the items
+        """
+        train = self._train
+        rows, cols, values = [], [], []
+        for currentItem in items:
             start_pos = train.indptr[currentItem]
             end_pos = train.indptr[currentItem + 1]
-
-            current_item_data_backup = train.data[start_pos: end_pos].copy()
-            train.data[start_pos: end_pos] = 0.0
-
-            # fit one ElasticNet model per column
-            self.md.fit(train, y)
-
-            nonzero_model_coef_index = self.md.sparse_coef_.indices
+            y = np.zeros(self._num_users, dtype=train.dtype)
+            y[train.indices[start_pos:end_pos]] = train.data[start_pos:end_pos]
+
+            if self._approximate:
+                features = self._candidate_items(currentItem)
+                if not len(features):
+                    continue
+                self.md.fit(train[:, features], y)
+                nonzero_model_coef_index = features[self.md.sparse_coef_.indices]
+            else:
+                # set the j-th column of X to zero
+                current_item_data_backup = train.data[start_pos: end_pos].copy()
+                train.data[start_pos: end_pos] = 0.0
+
+                # fit one ElasticNet model per column
+                self.md.fit(train, y)
+                train.data[start_pos:end_pos] = current_item_data_backup
+                nonzero_model_coef_index = self.md.sparse_coef_.indices
             nonzero_model_coef_value = self.md.sparse_coef_.data
 
-            local_topK = min(len(nonzero_model_coef_value) - 1, self._neighborhood)
-
-            relevant_items_partition = (-nonzero_model_coef_value).argpartition(local_topK)[0:local_topK]
+            local_topK = min(len(nonzero_model_coef_value), self._neighborhood)
+            if local_topK < len(nonzero_model_coef_value):
+                relevant_items_partition = (-nonzero_model_coef_value).argpartition(local_topK)[0:local_topK]
+            else:
+                relevant_items_partition = np.arange(local_topK)
             relevant_items_partition_sorting = np.argsort(-nonzero_model_coef_value[relevant_items_partition])
             ranking = relevant_items_partition[relevant_items_partition_sorting]
 
-            for index in range(len(ranking)):
-                if numCells == len(rows):
-                    rows = np.concatenate((rows, np.zeros(dataBlock, dtype=np.int32)))
-                    cols = np.concatenate((cols, np.zeros(dataBlock, dtype=np.int32)))
-                    values = np.concatenate((values, np.zeros(dataBlock, dtype=np.float32)))
-
-                rows[numCells] = nonzero_model_coef_index[ranking[index]]
-                cols[numCells] = currentItem
-                values[numCells] = nonzero_model_coef_value[ranking[index]]
-
-                numCells += 1
-
-            train.data[start_pos:end_pos] = current_item_data_backup
-
-            if verbose and (time.time() - start_time_printBatch > 300 or (
-                    currentItem + 1) % 1000 == 0 or currentItem == self._num_items - 1):
-                print('{}: Processed {} ( {:.2f}% ) in {:.2f} minutes. Items per second: {:.0f}'.format(
-                    'SLIMElasticNetRecommender',
-                    currentItem + 1,
-                    100.0 * float(currentItem + 1) / self._num_items,
-                    (time.time() - start_time) / 60,
-                    float(currentItem) / (time.time() - start_time)))
-
-                sys.stdout.flush()
-                sys.stderr.flush()
-
-                start_time_printBatch = time.time()
-
-        # generate the sparse weight matrix
-        self._w_sparse = sp.csr_matrix((values[:numCells], (rows[:numCells], cols[:numCells])),
-                                      shape=(self._num_items, self._num_items), dtype=np.float32)
-
-    def prepare_predictions(self):
-        self.pred_mat = self._data.sp_i_train_ratings.dot(self._w_sparse).toarray()
+            rows.append(nonzero_model_coef_index[ranking].astype(np.int32))
+            cols.append(np.full(len(ranking), currentItem, dtype=np.int32))
+            values.append(nonzero_model_coef_value[ranking].astype(np.float32))
+
+        if not rows:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+
+    def _candidate_items(self, item):
+        """
+        The items co-occurring with the given one, i.e., the only ones that can get a positive coefficient, limited to
+        the most co-occurring candidates if a maximum number of candidates is set
+        """
+        start_pos, end_pos = self._gram.indptr[item], self._gram.indptr[item + 1]
+        features = self._gram.indices[start_pos:end_pos]
+        co_occurrences = self._gram.data[start_pos:end_pos]
+        keep = (features != item) & (co_occurrences > 0)
+        features, co_occurrences = features[keep], co_occurrences[keep]
+        if 0 < self._candidates < len(features):
+            features = features[np.argpartition(-co_occurrences, self._candidates)[:self._candidates]]
+        return np.sort(features)
+
+    def _log_progress(self, verbose, processed, start_time):
+        if verbose:
+            print('{}: Processed {} ( {:.2f}% ) in {:.2f} minutes. Items per second: {:.0f}'.format(
+                'SLIMElasticNetRecommender',
+                processed,
+                100.0 * float(processed) / self._num_items,
+                (time.time() - start_time) / 60,
+                float(processed) / (time.time() - start_time)))
+
+            sys.stdout.flush()
+            sys.stderr.flush()
 
     def predict(self, u, i):
-        return self.pred_mat[u, i]
-
-    def get_user_recs(self, user, mask, k=100):
-        # user_items = self._data.train_dict[user].keys()
-        # predictions = {i: self.predict(user, i) for i in self._data.items if i not in user_items}
-
-        ui = self._data.public_users[user]
-        user_mask = mask[ui]
-        predictions = {self._data.private_items[i]: self.predict(ui, i) for i in range(self._data.num_items) if user_mask[i]}
-
-        indices, values = zip(*predictions.items())
-        indices = np.array(indices)
-        values = np.array(values)
-        local_k = min(k, len(values))
-        partially_ordered_preds_indices = np.argpartition(values, -local_k)[-local_k:]
-        real_values = values[partially_ordered_preds_indices]
-        real_indices = indices[partially_ordered_preds_indices]
-        local_top_k = real_values.argsort()[::-1]
-        return [(real_indices[item], real_values[item]) for item in local_top_k]
+        return self._data.sp_i_train_ratings[u].dot(self._w_sparse[:, i]).toarray()[0, 0]
+
+    def predict_block(self, offset, offset_stop):
+        return self._data.sp_i_train_ratings[offset:offset_stop].dot(self._w_sparse).toarray()
 
     def get_model_state(self):
         saving_dict = {}
-        saving_dict['_A_tilde'] = self._A_tilde
+        saving_dict['_w_sparse'] = self._w_sparse
         return saving_dict
 
     def set_model_state(self, saving_dict):
-        self._A_tilde = saving_dict['_A_tilde']
+        self._w_sparse = saving_dict['_w_sparse']
 
     def load_weights(self, path):
         with open(path, "rb") as f:
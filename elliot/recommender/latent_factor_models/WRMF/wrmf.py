@@ -28,6 +28,9 @@ class WRMF(RecMixin, BaseRecommenderModel):
         lr: Learning rate
         alpha:
         reg: Regularization coefficient
+        solver: Least-squares solver, exact (default) or cg (conjugate gradient)
+        cg_steps: Number of conjugate gradient steps of the cg solver
+        workers: Number of threads solving the least-squares problems
 
     To include the recommendation model, add it to the config file adopting the following pattern:
 
@@ -56,7 +59,12 @@ class WRMF(RecMixin, BaseRecommenderModel):
         self._ratings = self._data.train_dict
         self._sp_i_train = self._data.sp_i_train
 
-        self._model = WRMFModel(self._factors, self._data, self._nprandom, self._alpha, self._reg)
+        # the solver options are read apart from _params_list, so that they stay out of the model name and the
+        # existing result and weight names do not change
+        self._model = WRMFModel(self._factors, self._data, self._nprandom, self._alpha, self._reg,
+                                getattr(self._params, "solver", "exact"),
+                                int(getattr(self._params, "cg_steps", 3)),
+                                int(getattr(self._params, "workers", 1)))
 
     def get_recommendations(self, k: int = 10):
         predictions_top_k_val = {}
@@ -70,7 +78,7 @@ class WRMF(RecMixin, BaseRecommenderModel):
         return predictions_top_k_val, predictions_top_k_test
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self._model.get_user_recs(u, mask, k) for u in self._data.train_dict.keys()}
+        return self.get_batched_recommendations(mask, k, self._model.predict_block)
 
     @property
     def name(self):
@@ -0,0 +1,129 @@
+"""
+Module description:
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import sparse as sp
+from scipy.linalg import get_lapack_funcs
+
+
+class ALSSolver(object):
+    """
+    Least-squares half step of the implicit-feedback Alternating Least Squares.
+
+    For every row u of the confidence matrix C, it solves
+        (S^T S + S^T (C_u - I) S + reg I) x_u = S^T C_u p_u
+    where S are the fixed factors and p_u is the binary preference of the observed entries of the row.
+    The rows are processed in chunks of bounded size, so the memory only depends on the chunk size and on the number
+    of factors. The exact solver builds the factors x factors system of each row in a scratch buffer of the chunk and
+    solves it with a Cholesky factorization (LAPACK posv). The cg solver runs a few warm-started conjugate gradient
+    steps on all the rows of the chunk at once, without ever building the per-row systems.
+    The chunks can be processed by a pool of threads, since NumPy and LAPACK release the GIL in the heavy kernels.
+    """
+
+    def __init__(self, reg, solver="exact", cg_steps=3, workers=1, block_size=1 << 22):
+        """
+        :param reg: regularization coefficient
+        :param solver: exact|cg
+        :param cg_steps: number of conjugate gradient steps of the cg solver
+        :param workers: number of threads solving the chunks of rows
+        :param block_size: maximum number of floating point values of the scratch arrays of a chunk
+        """
+        if solver not in ("exact", "cg"):
+            raise Exception(f"ALS solver {solver} not recognized")
+        self._reg = reg
+        self._solver = solver
+        self._cg_steps = cg_steps
+        self._workers = max(1, workers)
+        self._block_size = block_size
+
+    def solve(self, confidence: sp.csr_matrix, source: np.ndarray, target: np.ndarray, rows: np.ndarray = None):
+        """
+        Updates the target factors in place
+        :param confidence: confidence matrix, with the rows of the target factors and the columns of the source ones
+        :param source: fixed factors
+        :param target: factors to update
+        :param rows: the rows to update (by default, all the rows)
+        """
+        factors = source.shape[1]
+        gram = source.T.dot(source) + self._reg * np.eye(factors)
+        rows = np.arange(confidence.shape[0]) if rows is None else np.asarray(rows)
+
+        # each chunk holds at most block_size values in its nnz x factors scratch arrays
+        cost = np.cumsum(np.maximum(np.diff(confidence.indptr)[rows], 1))
+        budget = max(1, self._block_size // factors)
+        bounds = np.unique(np.searchsorted(cost, np.arange(budget, cost[-1] if len(cost) else 0, budget),
+                                           side='right'))
+        chunks = [chunk for chunk in np.split(rows, bounds) if len(chunk)]
+
+        solve_chunk = self._solve_exact if self._solver == "exact" else self._solve_cg
+        if self._workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=self._workers) as executor:
+                list(executor.map(lambda chunk: solve_chunk(confidence, source, target, gram, chunk), chunks))
+        else:
+            for chunk in chunks:
+                solve_chunk(confidence, source, target, gram, chunk)
+
+    @staticmethod
+    def _gather(confidence, source, rows):
+        """
+        Observed entries of a chunk of rows, together with the matrix that sums the entries of each row
+        """
+        starts = confidence.indptr[rows]
+        counts = confidence.indptr[rows + 1] - starts
+        indptr = np.concatenate(([0], np.cumsum(counts)))
+        positions = np.repeat(starts - indptr[:-1], counts) + np.arange(indptr[-1])
+        observed = source[confidence.indices[positions]]
+        weights = confidence.data[positions].astype(source.dtype)
+        row_sum = sp.csr_matrix((np.ones(indptr[-1], dtype=source.dtype), np.arange(indptr[-1]), indptr),
+                                shape=(len(rows), indptr[-1]))
+        return observed, weights, row_sum
+
+    def _solve_exact(self, confidence, source, target, gram, rows):
+        posv, = get_lapack_funcs(("posv",), (gram,))
+        # scratch buffer of the chunk, reused by all its rows
+        system = np.empty_like(gram)
+        indptr, indices, data = confidence.indptr, confidence.indices, confidence.data
+        for row in rows:
+            weights = data[indptr[row]:indptr[row + 1]]
+            observed = source[indices[indptr[row]:indptr[row + 1]]]
+            np.dot(observed.T * (weights - 1), observed, out=system)
+            system += gram
+            _, x, info = posv(system, observed.T.dot(weights), overwrite_a=True, overwrite_b=True)
+            if info:
+                raise np.linalg.LinAlgError(f"The least-squares problem of row {row} is singular")
+            target[row] = x
+
+    def _solve_cg(self, confidence, source, target, gram, rows):
+        observed, weights, row_sum = self._gather(confidence, source, rows)
+        entry_row = np.repeat(np.arange(len(rows)), np.diff(row_sum.indptr))
+
+        def product(p):
+            return p.dot(gram) + row_sum @ (observed * (np.einsum('nf,nf->n', observed, p[entry_row]) *
+                                                        (weights - 1))[:, None])
+
+        x = target[rows]
+        residual = row_sum @ (observed * weights[:, None]) - product(x)
+        direction = residual.copy()
+        residual_norm = np.einsum('uf,uf->u', residual, residual)
+        for _ in range(self._cg_steps):
+            if not residual_norm.any():
+                break
+            step_product = product(direction)
+            curvature = np.einsum('uf,uf->u', direction, step_product)
+            step = np.divide(residual_norm, curvature, out=np.zeros_like(residual_norm), where=curvature > 0)
+            x += step[:, None] * direction
+            residual -= step[:, None] * step_product
+            new_residual_norm = np.einsum('uf,uf->u', residual, residual)
+            beta = np.divide(new_residual_norm, residual_norm, out=np.zeros_like(residual_norm),
+                             where=residual_norm > 0)
+            direction = residual + beta[:, None] * direction
+            residual_norm = new_residual_norm
+        target[rows] = x
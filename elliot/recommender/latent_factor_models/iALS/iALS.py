@@ -28,19 +28,24 @@ class iALS(RecMixin, BaseRecommenderModel):
         lr: Learning rate
         alpha:
         reg: Regularization coefficient
+        solver: Least-squares solver, exact (default) or cg (conjugate gradient)
+        cg_steps: Number of conjugate gradient steps of the cg solver
+        workers: Number of threads solving the least-squares problems
 
     To include the recommendation model, add it to the config file adopting the following pattern:
 
     .. code:: yaml
 
       models:
-        WRMF:
+        iALS:
           meta:
             save_recs: True
           epochs: 10
           factors: 50
           alpha: 1
           reg: 0.1
+          solver: cg
+          cg_steps: 3
     """
 
     @init_charger
@@ -58,17 +63,20 @@ class iALS(RecMixin, BaseRecommenderModel):
         self._ratings = self._data.train_dict
         self._sp_i_train = self._data.sp_i_train
 
+        # the solver options are read apart from _params_list, so that they stay out of the model name and the
+        # existing result and weight names do not change
         self._model = iALSModel(self._factors,
                                 self._data,
                                 self._nprandom,
                                 self._alpha,
                                 self._epsilon,
                                 self._reg,
-                                self._scaling)
+                                self._scaling,
+                                getattr(self._params, "solver", "exact"),
+                                int(getattr(self._params, "cg_steps", 3)),
+                                int(getattr(self._params, "workers", 1)))
 
     def get_recommendations(self, k: int = 10):
-        self._model.prepare_predictions()
-
         predictions_top_k_val = {}
         predictions_top_k_test = {}
 
@@ -80,7 +88,7 @@ class iALS(RecMixin, BaseRecommenderModel):
         return predictions_top_k_val, predictions_top_k_test
 
     def get_single_recommendation(self, mask, k, *args):
-        return {u: self._model.get_user_recs(u, mask, k) for u in self._data.train_dict.keys()}
+        return self.get_batched_recommendations(mask, k, self._model.predict_block)
 
     @property
     def name(self):
@@ -3,7 +3,7 @@ import os
 import numpy as np
 from tqdm import tqdm
 
-from elliot.utils.write import store_recommendation
+from elliot.utils.write import recommendation_extension, store_recommendation
 
 
 class RecMixin(object):
@@ -40,12 +40,7 @@ class RecMixin(object):
 
             if self._save_recs:
                 self.logger.info(f"Writing recommendations at: {self._config.path_output_rec_result}")
-                if it is not None:
-                    store_recommendation(recs[1], os.path.abspath(
-                        os.sep.join([self._config.path_output_rec_result, f"{self.name}_it={it + 1}.tsv"])))
-                else:
-                    store_recommendation(recs[1], os.path.abspath(
-                        os.sep.join([self._config.path_output_rec_result, f"{self.name}.tsv"])))
+                self._store_recs(recs, it)
 
             if (len(self._results) - 1) == self.get_best_arg():
                 if it is not None:
@@ -60,6 +55,20 @@ class RecMixin(object):
 
 
 
+    def _store_recs(self, recs, it=None):
+        """
+        Stores the test recommendations with the save_recs_format and save_recs_compression meta options
+        :param recs: the (validation, test) recommendations
+        :param it: the iteration, appended to the file name when given
+        """
+        extension = recommendation_extension(self._save_recs_format, self._save_recs_compression)
+        if it is not None:
+            file_name = f"{self.name}_it={it + 1}{extension}"
+        else:
+            file_name = f"{self.name}{extension}"
+        store_recommendation(recs[1], os.path.abspath(os.sep.join([self._config.path_output_rec_result, file_name])),
+                             self._save_recs_format, self._save_recs_compression)
+
     def get_recommendations(self, k: int = 100):
         predictions_top_k_test = {}
         predictions_top_k_val = {}
@@ -87,6 +96,51 @@ class RecMixin(object):
                               for u_list in list(zip(i.numpy(), v.numpy()))]
         return dict(zip(map(self._data.private_users.get, range(offset, offset_stop)), items_ratings_pair))
 
+    def get_batched_recommendations(self, mask, k, predict_block, block_size=None):
+        """
+        Top-k recommendations of all the users, computed one block of users at a time
+        :param mask: candidate mask (users x items)
+        :param k: length of the recommendation lists
+        :param predict_block: function returning the dense (offset_stop - offset) x num_items scores of a user block
+        :param block_size: number of users per block (by default, blocks of about 2^23 scores)
+        :return: recommendations in the form {user: [(item1,value1),...]}
+        """
+        num_users, num_items = self._data.num_users, self._data.num_items
+        if block_size is None:
+            block_size = max(1, (1 << 23) // max(1, num_items))
+        private_items = np.array([self._data.private_items[i] for i in range(num_items)])
+        recs = {}
+        for offset in range(0, num_users, block_size):
+            offset_stop = min(offset + block_size, num_users)
+            recs.update(self.get_block_recommendation(mask, k, predict_block(offset, offset_stop),
+                                                      offset, offset_stop, private_items))
+        return recs
+
+    def get_block_recommendation(self, mask, k, predictions, offset, offset_stop, private_items):
+        """
+        Row-wise top-k of the scores of a user block, restricted to the candidate items
+        :param mask: candidate mask (users x items)
+        :param k: length of the recommendation lists
+        :param predictions: dense scores of the users in [offset, offset_stop)
+        :param offset: first private user id of the block
+        :param offset_stop: last private user id of the block (excluded)
+        :param private_items: array mapping private item ids to public item ids
+        :return: recommendations in the form {user: [(item1,value1),...]}
+        """
+        block_mask = mask[offset:offset_stop]
+        predictions = np.where(block_mask, predictions, -np.inf)
+        local_k = min(k, predictions.shape[1])
+        partially_ordered_preds_indices = np.argpartition(predictions, -local_k, axis=1)[:, -local_k:]
+        real_values = np.take_along_axis(predictions, partially_ordered_preds_indices, axis=1)
+        local_top_k = np.argsort(real_values, axis=1)[:, ::-1]
+        real_indices = np.take_along_axis(partially_ordered_preds_indices, local_top_k, axis=1)
+        real_values = np.take_along_axis(real_values, local_top_k, axis=1)
+        candidates = np.take_along_axis(block_mask, real_indices, axis=1)
+        real_indices = private_items[real_indices]
+        return {self._data.private_users[u]: list(zip(indices[candidate], values[candidate]))
+                for u, indices, values, candidate in zip(range(offset, offset_stop),
+                                                         real_indices, real_values, candidates)}
+
     def restore_weights(self):
         try:
             self._model.load_weights(self._saving_filepath)
@@ -115,7 +169,8 @@ class RecMixin(object):
             return -max([r[self._validation_k]["val_results"][self._validation_metric] for r in self._results])
 
     def get_params(self):
-        return self._params.__dict__
+        # the explored values are not part of the configuration of a single run
+        return {k: v for k, v in self._params.__dict__.items() if k != "search_space"}
 
     def get_results(self):
         return self._results[self.get_best_arg()]
@@ -69,9 +69,11 @@ class ACF(RecMixin, BaseRecommenderModel):
 
         self._side = getattr(self._data.side_information, self._loader, None)
 
+        item_indices = [self._side.item_mapping[self._data.private_items[item]] for item in range(self._num_items)]
+
         self._sampler = ppsa.Sampler(self._data.i_train_dict,
-                                     self._side.visual_feat_map_feature_folder_path,
-                                     self._side.visual_feat_map_features_shape,
+                                     item_indices,
+                                     self._side.feature_store(self._side.visual_feat_map_feature_folder_path),
                                      self._epochs)
 
         self._next_batch = self._sampler.pipeline(self._data.transactions, self._batch_size)
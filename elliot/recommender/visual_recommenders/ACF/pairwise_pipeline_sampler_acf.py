@@ -11,14 +11,14 @@ import tensorflow as tf
 
 import numpy as np
 import random
-import os
 
 
 class Sampler:
-    def __init__(self, indexed_ratings, cnn_features_path, cnn_features_shape, epochs):
+    def __init__(self, indexed_ratings, item_indices, features, epochs):
         np.random.seed(42)
         random.seed(42)
         self._indexed_ratings = indexed_ratings
+        self._item_indices = np.asarray(item_indices)
         self._users = list(self._indexed_ratings.keys())
         self._nusers = len(self._users)
         self._items = list({k for a in self._indexed_ratings.values() for k in a.keys()})
@@ -26,15 +26,12 @@ class Sampler:
         self._ui_dict = {u: list(set(indexed_ratings[u])) for u in indexed_ratings}
         self._lui_dict = {u: len(v) for u, v in self._ui_dict.items()}
 
-        self._cnn_features_path = cnn_features_path
-        self._cnn_features_shape = cnn_features_shape
+        self._features = features
         self._epochs = epochs
 
     def read_features_triple(self, user, pos, neg, user_pos):
-        # load positive and negative item features
-        item_pos = np.empty((user_pos.shape[0], *self._cnn_features_shape))
-        for idx in range(user_pos.shape[0]):
-            item_pos[idx] = np.load(os.path.join(self._cnn_features_path, str(user_pos[idx].numpy())) + '.npy')
+        # gather the features of the positive items of the user
+        item_pos = self._features[self._item_indices[user_pos.numpy()]]
 
         return user.numpy(), pos.numpy(), neg.numpy(), user_pos.numpy(), item_pos
 
@@ -115,8 +112,6 @@ class Sampler:
 
     # this is only for evaluation
     def read_features_eval(self, user, user_pos):
-        item = np.empty((user_pos.shape[0], *self._cnn_features_shape))
-        for idx in range(user_pos.shape[0]):
-            item[idx] = np.load(os.path.join(self._cnn_features_path, str(user_pos[idx].numpy())) + '.npy')
+        item = self._features[self._item_indices[user_pos.numpy()]]
 
         return user.numpy(), user_pos.numpy(), item
@@ -74,8 +74,7 @@ class DVBPR(RecMixin, BaseRecommenderModel):
         self._sampler = ppsd.Sampler(
             self._data.i_train_dict,
             self._item_indices,
-            self._side.images_folder_path,
-            self._side.image_size_tuple,
+            self._side.image_store(),
             self._epochs
         )
         self._next_batch = self._sampler.pipeline(self._data.transactions, self._batch_size)
@@ -123,10 +122,7 @@ class DVBPR(RecMixin, BaseRecommenderModel):
         features = np.zeros(shape=(len(self._item_indices), self._factors))
         for start_batch in range(0, len(self._item_indices), self._batch_eval):
             stop_batch = min(start_batch + self._batch_eval, len(self._item_indices))
-            images = np.zeros(shape=(stop_batch - start_batch, *self._side.image_size_tuple, 3))
-            for start_image in range(start_batch, stop_batch):
-                _, image = self._sampler.read_image(self._item_indices[start_image])
-                images[start_image % self._batch_eval] = image
+            _, images = self._sampler.read_image(self._item_indices[start_batch:stop_batch])
             features[start_batch:stop_batch] = self._model.Cnn(images, training=False).numpy()
 
         for index, offset in enumerate(range(0, self._num_users, self._batch_eval)):
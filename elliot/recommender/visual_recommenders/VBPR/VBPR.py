@@ -80,7 +80,7 @@ class VBPR(RecMixin, BaseRecommenderModel):
 
         self._sampler = ppsv.Sampler(self._data.i_train_dict,
                                      item_indices,
-                                     self._side.visual_feature_folder_path,
+                                     self._side.feature_store(self._side.visual_feature_folder_path),
                                      self._epochs)
 
         self._next_batch = self._sampler.pipeline(self._data.transactions, self._batch_size)
@@ -8,18 +8,17 @@ __author__ = 'Vito Walter Anelli, Claudio Pomo, Daniele Malitesta, Felice Antoni
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it, daniele.malitesta@poliba.it, felice.merra@poliba.it'
 
 import tensorflow as tf
-import os
 
 import numpy as np
 import random
 
 
 class Sampler:
-    def __init__(self, indexed_ratings, item_indices, cnn_features_path, epochs):
+    def __init__(self, indexed_ratings, item_indices, features, epochs):
         np.random.seed(42)
         random.seed(42)
         self._indexed_ratings = indexed_ratings
-        self._item_indices = item_indices
+        self._item_indices = np.asarray(item_indices)
         self._users = list(self._indexed_ratings.keys())
         self._nusers = len(self._users)
         self._items = list({k for a in self._indexed_ratings.values() for k in a.keys()})
@@ -27,13 +26,13 @@ class Sampler:
         self._ui_dict = {u: list(set(indexed_ratings[u])) for u in indexed_ratings}
         self._lui_dict = {u: len(v) for u, v in self._ui_dict.items()}
 
-        self._cnn_features_path = cnn_features_path
+        self._features = features
         self._epochs = epochs
 
     def read_features_triple(self, user, pos, neg):
-        # load positive and negative item features
-        feat_pos = np.load(os.path.join(self._cnn_features_path, str(pos.numpy())) + '.npy')
-        feat_neg = np.load(os.path.join(self._cnn_features_path, str(neg.numpy())) + '.npy')
+        # gather positive and negative item features of the batch
+        feat_pos = self._features[self._item_indices[pos.numpy()]]
+        feat_neg = self._features[self._item_indices[neg.numpy()]]
 
         return user.numpy(), pos.numpy(), feat_pos, neg.numpy(), feat_neg
 
@@ -82,8 +81,8 @@ class Sampler:
                                               output_shapes=((), (), ()),
                                               output_types=(tf.int64, tf.int64, tf.int64),
                                               args=(num_users, batch_size))
-        data = data.map(load_func, num_parallel_calls=tf.data.experimental.AUTOTUNE)
         data = data.batch(batch_size=batch_size)
+        data = data.map(load_func, num_parallel_calls=tf.data.experimental.AUTOTUNE)
         data = data.prefetch(buffer_size=tf.data.experimental.AUTOTUNE)
 
         return data
@@ -105,14 +104,14 @@ class Sampler:
         data = tf.data.Dataset.from_generator(generator=self.step_eval,
                                               output_shapes=((), ()),
                                               output_types=(tf.int64, tf.int64))
-        data = data.map(load_func, num_parallel_calls=tf.data.experimental.AUTOTUNE)
         data = data.batch(batch_size=batch_size)
+        data = data.map(load_func, num_parallel_calls=tf.data.experimental.AUTOTUNE)
         data = data.prefetch(buffer_size=tf.data.experimental.AUTOTUNE)
 
         return data
 
     # this is only for evaluation
     def read_features(self, item_rel, item_abs):
-        feat = np.load(os.path.join(self._cnn_features_path, str(item_abs.numpy())) + '.npy')
+        feat = self._features[item_abs.numpy()]
 
         return item_rel, item_abs, feat
@@ -78,7 +78,7 @@ def run_experiment(config_path: str = ''):
                                                     test_fold_index)
             if isinstance(model_base, tuple):
                 logger.info(f"Tuning begun for {model_class.__name__}\\n")
-                trials = Trials()
+                trials = ho.ParallelTrials(workers=getattr(model_base[0].meta, "hyper_workers", 1))
                 fmin(model_placeholder.objective,
                      space=model_base[1],
                      algo=model_base[3],
@@ -139,7 +139,6 @@ class Splitter:
                     if valtest_splitting_ns.timestamp.isdigit():
                         tuple_list = self.splitting_passed_timestamp(data, int(valtest_splitting_ns.timestamp))
                     elif valtest_splitting_ns.timestamp == "best":
-                        print("Here")
                         kwargs = {}
                         if hasattr(valtest_splitting_ns, "min_below"):
                             kwargs["min_below"] = int(valtest_splitting_ns.min_below)
@@ -208,49 +207,110 @@ class Splitter:
         looper = infinite_looper(folds)
         return [next(looper) for _ in range(length)]
 
+    @staticmethod
+    def user_segments(data: pd.DataFrame):
+        """
+        Rows of each user, in the order of the user groups of data.groupby(['userId'])
+        :param data: the interactions
+        :return: the row positions sorted by user (stable), and the number of rows of each user in sorted order
+        """
+        codes, _ = pd.factorize(data["userId"], sort=True)
+        order = np.argsort(codes, kind="stable")
+        lengths = np.bincount(codes[codes >= 0], minlength=codes.max() + 1 if len(codes) else 0)
+        # users with a missing id are not grouped by pandas, hence they are in no split
+        return order[len(codes) - lengths.sum():], lengths
+
+    @staticmethod
+    def split_by_flag(data: pd.DataFrame, test_flag, train_flag=None):
+        """
+        :param data: the interactions
+        :param test_flag: boolean mask of the test rows
+        :param train_flag: boolean mask of the training rows (by default, the rows that are not in the test set)
+        :return: the (train, test) pair of dataframes
+        """
+        train_flag = ~test_flag if train_flag is None else train_flag
+        return data[train_flag].reset_index(drop=True), data[test_flag].reset_index(drop=True)
+
+    def shuffled_test_flags(self, data: pd.DataFrame, order, lengths, n_test):
+        """
+        Random test flags of each user, drawn as subsampling_list_generator does
+        :param data: the interactions
+        :param order: the row positions sorted by user
+        :param lengths: the number of rows of each user
+        :param n_test: the number of test rows of each user
+        :return: the boolean masks of the training and test rows
+        """
+        if (n_test > lengths).any():
+            raise ValueError("The number of test interactions exceeds the profile size of some users")
+        sorted_flags = np.zeros(len(order), dtype=np.int8)
+        sorted_flags[np.repeat(np.cumsum(lengths), n_test) - self.segment_ranks(n_test) - 1] = 1
+        # one permutation per user, with the same random stream as np.random.shuffle on the group lists
+        shuffle = np.random.shuffle
+        for start, stop in zip(np.cumsum(lengths) - lengths, np.cumsum(lengths)):
+            if stop - start > 1:
+                shuffle(sorted_flags[start:stop])
+        test_flag = np.zeros(len(data), dtype=bool)
+        train_flag = np.zeros(len(data), dtype=bool)
+        test_flag[order] = sorted_flags == 1
+        train_flag[order] = sorted_flags == 0
+        return train_flag, test_flag
+
+    @staticmethod
+    def segment_ranks(lengths):
+        """
+        :param lengths: the lengths of consecutive segments
+        :return: the position of each element within its segment
+        """
+        return np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
     def splitting_kfolds(self, data: pd.DataFrame, folds=5):
         tuple_list = []
-        user_groups = data.groupby(['userId'])
-        for name, group in user_groups:
-            data.loc[group.index, 'fold'] = self.fold_list_generator(len(group), folds)
-        data["fold"] = pd.to_numeric(data["fold"], downcast='integer')
+        order, lengths = self.user_segments(data)
+        fold = np.full(len(data), -1, dtype=np.int64)
+        fold[order] = self.segment_ranks(lengths) % folds
         for i in range(folds):
-            test = data[data["fold"] == i].drop(columns=["fold"]).reset_index(drop=True)
-            train = data[data["fold"] != i].drop(columns=["fold"]).reset_index(drop=True)
+            train, test = self.split_by_flag(data, fold == i, (fold != i) & (fold >= 0))
             tuple_list.append((train, test))
         return tuple_list
 
+    def temporal_ranks(self, data: pd.DataFrame, ascending=True):
+        """
+        Rank of the timestamp of each row in the user profile, as groupby rank with method='first'
+        :param data: the interactions
+        :param ascending: rank the oldest interaction first
+        :return: the ranks (starting from 1), and the profile size of the user of each row
+        """
+        codes, _ = pd.factorize(data["userId"], sort=True)
+        timestamps = data["timestamp"].to_numpy()
+        if len(data) and (codes >= 0).all() and np.issubdtype(timestamps.dtype, np.integer):
+            low, high = int(timestamps.min()), int(timestamps.max())
+            if (high - low + 1) * (int(codes.max()) + 1) < np.iinfo(np.int64).max:
+                # a stable sort by (user, timestamp) keeps the ties in order of appearance
+                offsets = timestamps.astype(np.int64) - low if ascending else high - timestamps.astype(np.int64)
+                order = np.argsort(codes.astype(np.int64) * (high - low + 1) + offsets, kind="stable")
+                lengths = np.bincount(codes)
+                ranks = np.empty(len(data), dtype=np.int64)
+                ranks[order] = self.segment_ranks(lengths) + 1
+                return ranks, lengths[codes]
+        user_groups = data.groupby(['userId'])['timestamp']
+        return user_groups.rank(method='first', ascending=ascending).to_numpy(), \
+            user_groups.transform('size').to_numpy()
+
     def splitting_temporal_holdout(self, d: pd.DataFrame, ratio=0.2):
         tuple_list = []
-        data = d.copy()
-        user_size = data.groupby(['userId'], as_index=True).size()
-        user_threshold = user_size.apply(lambda x: math.floor(x * (1 - ratio)))
-        data['rank_first'] = data.groupby(['userId'])['timestamp'].rank(method='first', ascending=True, axis=1)
-        data["test_flag"] = data.apply(
-            lambda x: x["rank_first"] > user_threshold.loc[x["userId"]], axis=1)
-        test = data[data["test_flag"] == True].drop(columns=["rank_first", "test_flag"]).reset_index(drop=True)
-        train = data[data["test_flag"] == False].drop(columns=["rank_first", "test_flag"]).reset_index(drop=True)
-        tuple_list.append((train, test))
+        rank_first, user_size = self.temporal_ranks(d, ascending=True)
+        tuple_list.append(self.split_by_flag(d, rank_first > np.floor(user_size * (1 - ratio))))
         return tuple_list
 
     def splitting_temporal_leavenout(self, d: pd.DataFrame, n=1):
         tuple_list = []
-        data = d.copy()
-        data['rank_first'] = data.groupby(['userId'])['timestamp'].rank(method='first', ascending=False, axis=1)
-        data["test_flag"] = data.apply(
-            lambda x: x["rank_first"] <= n, axis=1)
-        test = data[data["test_flag"] == True].drop(columns=["rank_first", "test_flag"]).reset_index(drop=True)
-        train = data[data["test_flag"] == False].drop(columns=["rank_first", "test_flag"]).reset_index(drop=True)
-        tuple_list.append((train, test))
+        rank_first, _ = self.temporal_ranks(d, ascending=False)
+        tuple_list.append(self.split_by_flag(d, rank_first <= n))
         return tuple_list
 
     def splitting_passed_timestamp(self, d: pd.DataFrame, timestamp=1):
         tuple_list = []
-        data = d.copy()
-        data["test_flag"] = data.apply(lambda x: x["timestamp"] >= timestamp, axis=1)
-        test = data[data["test_flag"] == True].drop(columns=["test_flag"]).reset_index(drop=True)
-        train = data[data["test_flag"] == False].drop(columns=["test_flag"]).reset_index(drop=True)
-        tuple_list.append((train, test))
+        tuple_list.append(self.split_by_flag(d, (d["timestamp"] >= timestamp).to_numpy()))
         return tuple_list
 
     def subsampling_list_generator(self, length, ratio=0.2):
@@ -262,15 +322,11 @@ class Splitter:
 
     def splitting_randomsubsampling_kfolds(self, d: pd.DataFrame, folds=5, ratio=0.2):
         tuple_list = []
-        data = d.copy()
-        user_groups = data.groupby(['userId'])
+        order, lengths = self.user_segments(d)
+        n_test = lengths - np.floor(lengths * (1 - ratio)).astype(np.int64)
         for i in range(folds):
-            for name, group in user_groups:
-                data.loc[group.index, 'test_flag'] = self.subsampling_list_generator(len(group), ratio)
-            data["test_flag"] = pd.to_numeric(data["test_flag"], downcast='integer')
-            test = data[data["test_flag"] == 1].drop(columns=["test_flag"]).reset_index(drop=True)
-            train = data[data["test_flag"] == 0].drop(columns=["test_flag"]).reset_index(drop=True)
-            tuple_list.append((train, test))
+            train_flag, test_flag = self.shuffled_test_flags(d, order, lengths, n_test)
+            tuple_list.append(self.split_by_flag(d, test_flag, train_flag))
         return tuple_list
 
     def subsampling_leavenout_list_generator(self, length, n=1):
@@ -282,35 +338,56 @@ class Splitter:
 
     def splitting_randomsubsampling_kfolds_leavenout(self, d: pd.DataFrame, folds=5, n=1):
         tuple_list = []
-        data = d.copy()
-        user_groups = data.groupby(['userId'])
+        order, lengths = self.user_segments(d)
+        n_test = np.full(len(lengths), n, dtype=np.int64)
         for i in range(folds):
-            for name, group in user_groups:
-                data.loc[group.index, 'test_flag'] = self.subsampling_leavenout_list_generator(len(group), n)
-            data["test_flag"] = pd.to_numeric(data["test_flag"], downcast='integer')
-            test = data[data["test_flag"] == 1].drop(columns=["test_flag"]).reset_index(drop=True)
-            train = data[data["test_flag"] == 0].drop(columns=["test_flag"]).reset_index(drop=True)
-            tuple_list.append((train, test))
+            train_flag, test_flag = self.shuffled_test_flags(d, order, lengths, n_test)
+            tuple_list.append(self.split_by_flag(d, test_flag, train_flag))
         return tuple_list
 
     def splitting_best_timestamp(self, d: pd.DataFrame, min_below=1, min_over=1):
-        data = d.copy()
-        unique_timestamps = data["timestamp"].unique()
-        user_groups = data.groupby(['userId'])
-        ts_dict = {}
-        nuniques = len(unique_timestamps)
-        i = 0
-        for ts in unique_timestamps:
-            print(nuniques - i)
-            i += 1
-            ts_dict[ts] = 0
-            for name, group in user_groups:
-                below = group[group["timestamp"] < ts]["timestamp"].count()
-                over = len(group) - below
-                if (below >= min_below) and (over >= min_over):
-                    ts_dict[ts] += 1
-        max_val = max(ts_dict.values())
-        best_tie = [ts for ts,v in ts_dict.items() if v == max_val]
-        max_ts = max(best_tie)
+        """
+        Split at the timestamp that leaves at least min_below interactions before it and min_over interactions from
+        it on for the largest number of users (the latest one, among ties).
+        A user satisfies both constraints for the candidate timestamps ts with t_a < ts <= t_b, where t_a is the
+        min_below-th oldest interaction of the user and t_b the min_over-th latest one. The number of such users is
+        computed for all the candidates at once, by counting the interval bounds below each candidate.
+        """
+        timestamps = d["timestamp"].to_numpy()
+        candidates = np.unique(timestamps[~pd.isna(timestamps)])
+        if not len(candidates):
+            raise ValueError("No timestamp to split the data at")
+
+        user_rows = d["userId"].notna().to_numpy()
+        data = d[user_rows]
+        codes, _ = pd.factorize(data["userId"], sort=True)
+        ranks, _ = self.temporal_ranks(data, ascending=True)
+        n_users = codes.max() + 1 if len(codes) else 0
+        profile_size = np.bincount(codes, minlength=n_users)
+        dated_size = np.bincount(codes[~np.isnan(ranks)], minlength=n_users)
+        # rank of the upper bound t_b in the profile, with the undated interactions counted as the latest ones
+        upper_rank = profile_size - min_over + 1
+        feasible = (min_below <= dated_size) & (min_below <= profile_size - min_over)
+
+        lower_open = min_below < 1
+        lower = np.zeros(n_users, dtype=timestamps.dtype)
+        if not lower_open:
+            at_lower = ranks == min_below
+            lower[codes[at_lower]] = data["timestamp"].to_numpy()[at_lower]
+        upper_open = upper_rank > dated_size
+        upper = np.zeros(n_users, dtype=timestamps.dtype)
+        at_upper = ranks == upper_rank[codes]
+        upper[codes[at_upper]] = data["timestamp"].to_numpy()[at_upper]
+        if not lower_open:
+            # ties may leave no timestamp between the bounds
+            feasible &= upper_open | (lower < upper)
+
+        if lower_open:
+            satisfied = np.full(len(candidates), feasible.sum(), dtype=np.int64)
+        else:
+            satisfied = np.searchsorted(np.sort(lower[feasible]), candidates, side="left")
+        satisfied = satisfied - np.searchsorted(np.sort(upper[feasible & ~upper_open]), candidates, side="left")
+
+        max_ts = candidates[len(candidates) - 1 - np.argmax(satisfied[::-1])]
         print(f"Best Timestamp: {max_ts}")
         return self.splitting_passed_timestamp(d, max_ts)
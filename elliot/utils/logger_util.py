@@ -1,4 +1,5 @@
 import atexit
+from multiprocessing import util
 from logging.config import ConvertingList, ConvertingDict, valid_ident
 from logging.handlers import QueueHandler, QueueListener
 from queue import Queue
@@ -51,5 +52,17 @@ class QueueListenerHandler(QueueHandler):
     def stop(self):
         self._listener.stop()
 
+    def restart(self):
+        """
+        Starts a new listener on a new queue in a forked process, which inherits neither the listener thread nor
+        a usable queue lock
+        """
+        self.queue = Queue(-1)
+        self._listener = QueueListener(self.queue, *self._listener.handlers,
+                                       respect_handler_level=self._listener.respect_handler_level)
+        self.start()
+        # the worker processes exit without running the atexit callbacks
+        util.Finalize(self, self.stop, exitpriority=10)
+
     def emit(self, record):
         return super().emit(record)
\ No newline at end of file
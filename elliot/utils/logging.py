@@ -8,6 +8,7 @@ import yaml
 import re
 
 from elliot.utils.folder import build_log_folder
+from elliot.utils.logger_util import QueueListenerHandler
 
 
 class TimeFilter(logging.Filter):
@@ -100,4 +101,32 @@ def prepare_logger(name, path, log_level=logging.DEBUG):
     sh.setFormatter(formatter)
     logger.addHandler(fh)
     logger.addHandler(sh)
-    return logger
\ No newline at end of file
+    return logger
+
+
+def redirect_logger(name, path, suffix, log_level=logging.DEBUG):
+    """
+    Moves the file output of a logger built with prepare_logger to a new file (e.g., the log of a worker process)
+    """
+    logger = logging.getLogger(name)
+    logfilepath = os.path.abspath(os.sep.join([path, f"{name}-{suffix}-{datetime.datetime.now().strftime('%b-%d-%Y_%H-%M-%S')}.log"]))
+    fh = logging.FileHandler(logfilepath)
+    fh.setLevel(log_level)
+    fh.setFormatter(logging.Formatter("%(time_filter)-15s: %(levelname)-.1s %(message)s"))
+    for handler in logger.handlers:
+        if isinstance(handler, logging.FileHandler):
+            handler.close()
+    logger.handlers = [fh] + [h for h in logger.handlers if not isinstance(h, logging.FileHandler)]
+    return logger
+
+
+def restart_listeners():
+    """
+    Restarts the queue listeners of the loggers in a forked worker process, so that its records are written
+    """
+    loggers = [logging.root] + [logger for logger in logging.root.manager.loggerDict.values()
+                                if isinstance(logger, logging.Logger)]
+    handlers = {handler for logger in loggers for handler in logger.handlers
+                if isinstance(handler, QueueListenerHandler)}
+    for handler in handlers:
+        handler.restart()
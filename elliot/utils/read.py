@@ -12,6 +12,7 @@ import configparser
 import pickle
 import numpy as np
 import os
+from collections.abc import Mapping
 from types import SimpleNamespace
 
 
@@ -122,3 +123,56 @@ def find_checkpoint(dir, restore_epochs, epochs, rec, best=0):
             if 'weights-{0}-'.format(restore_epochs) in file:
                 return dir + file.split('.')[0]
     return ''
+
+
+class RecommendationLists(Mapping):
+    """
+    Recommendation lists in the form {user: [(item1,value1),...]}, held as sorted columns.
+
+    The rows are sorted by user and by decreasing prediction once, and the list of a user is only built when it is
+    accessed.
+    """
+
+    def __init__(self, users, items, predictions):
+        """
+        :param users: user column
+        :param items: item column
+        :param predictions: prediction column
+        """
+        predictions = np.asarray(predictions)
+        codes, self._users = pd.factorize(np.asarray(users), sort=True)
+        # stable, as the rows of a user with the same prediction keep the order of the file
+        order = np.lexsort((-predictions, codes))
+        self._items = np.asarray(items)[order]
+        self._predictions = predictions[order]
+        self._offsets = np.zeros(len(self._users) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(self._users)), out=self._offsets[1:])
+        self._index = {u: p for p, u in enumerate(self._users.tolist())}
+
+    def __getitem__(self, user):
+        p = self._index[user]
+        start, stop = self._offsets[p], self._offsets[p + 1]
+        return list(zip(self._items[start:stop].tolist(), self._predictions[start:stop].tolist()))
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+
+def read_recommendations(path):
+    """
+    Reads the recommendation lists stored by elliot.utils.write.RecommendationWriter
+    :param path: a .tsv (optionally .gz or .zst), .npz, or .parquet file
+    :return: the RecommendationLists of the file
+    """
+    if path.endswith(".npz"):
+        with np.load(path) as columns:
+            return RecommendationLists(columns["user"], columns["item"], columns["prediction"])
+    if path.endswith(".parquet"):
+        data = pd.read_parquet(path)
+        return RecommendationLists(data["user"].to_numpy(), data["item"].to_numpy(), data["prediction"].to_numpy())
+    # compression inferred from the extension
+    data = pd.read_csv(path, sep="\t", header=None, usecols=[0, 1, 2], names=["userId", "itemId", "prediction"])
+    return RecommendationLists(data["userId"].to_numpy(), data["itemId"].to_numpy(), data["prediction"].to_numpy())
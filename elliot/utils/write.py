@@ -7,9 +7,16 @@ __version__ = '0.3.1'
 __author__ = 'Vito Walter Anelli, Claudio Pomo'
 __email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
 
+import gzip
+import io
+import itertools
+
 import numpy as np
 import pickle
 
+_formats = {"tsv": ".tsv", "npz": ".npz", "parquet": ".parquet"}
+_compressions = {"gzip": ".gz", "zstd": ".zst"}
+
 
 def save_obj(obj, name):
     """
@@ -32,13 +39,161 @@ def save_np(npy, filename):
     np.save(filename, npy)
 
 
-def store_recommendation(recommendations, path=""):
+def recommendation_extension(fmt="tsv", compression=None):
+    """
+    File extension of the recommendation lists stored with a format and a compression
+    :param fmt: tsv, npz, or parquet
+    :param compression: None, gzip, or zstd
+    :return: the extension, e.g., .tsv.gz
+    """
+    if fmt not in _formats:
+        raise Exception(f"Recommendation format {fmt} not recognized. Allowed values are: {list(_formats)}")
+    if compression is not None and compression not in _compressions:
+        raise Exception(f"Recommendation compression {compression} not recognized. "
+                        f"Allowed values are: {list(_compressions)}")
+    # the columnar formats compress their columns internally
+    return _formats[fmt] + (_compressions[compression] if compression and fmt == "tsv" else "")
+
+
+class RecommendationWriter:
+    """
+    Streaming writer of recommendation lists, as (user, item, prediction) rows.
+
+    The rows are buffered and written in large chunks. The tsv format writes the same lines as before, optionally
+    compressed with gzip or zstd (which requires zstandard). The npz format stores the user, item, and prediction
+    columns, deflated with gzip. The parquet format (which requires pyarrow) writes a row group per chunk, with the
+    given compression codec.
+    """
+
+    def __init__(self, path, fmt="tsv", compression=None, chunk_size=1 << 18):
+        """
+        :param path: output file
+        :param fmt: tsv, npz, or parquet
+        :param compression: None, gzip, or zstd
+        :param chunk_size: number of rows buffered before a write
+        """
+        recommendation_extension(fmt, compression)
+        self._path = path
+        self._fmt = fmt
+        self._compression = compression
+        self._chunk_size = chunk_size
+        self._buffer = []
+        self._buffered = 0
+        self._columns = []
+        self._out = None
+        if fmt == "tsv":
+            self._out = self._open_text(path, compression)
+
+    def write(self, users, items, predictions, mask=None):
+        """
+        Writes a block of top-k lists
+        :param users: the n users of the block
+        :param items: n x k array of the recommended items of each user
+        :param predictions: n x k array of their predictions
+        :param mask: optional n x k boolean array of the recommendations to write
+        """
+        items, predictions = np.asarray(items), np.asarray(predictions)
+        if mask is None:
+            mask = np.ones(items.shape, dtype=bool)
+        users = np.repeat(np.asarray(users), mask.sum(axis=1))
+        if self._fmt == "tsv":
+            self._append(self._lines(zip(users, items[mask], predictions[mask])), len(users))
+        else:
+            self._append((users, items[mask], predictions[mask]), len(users))
+
+    def write_dict(self, recommendations, users_per_chunk=1 << 12):
+        """
+        Writes recommendation lists in the form {user: [(item1,value1),...]}
+        """
+        recommendations = iter(recommendations.items())
+        while True:
+            chunk = list(itertools.islice(recommendations, users_per_chunk))
+            if not chunk:
+                break
+            n_rows = sum(len(recs) for _, recs in chunk)
+            if self._fmt == "tsv":
+                self._append(self._lines((u, i, value) for u, recs in chunk for i, value in recs), n_rows)
+            else:
+                self._append((np.repeat(np.asarray([u for u, _ in chunk]), [len(recs) for _, recs in chunk]),
+                              np.asarray([i for _, recs in chunk for i, _ in recs]),
+                              np.asarray([value for _, recs in chunk for _, value in recs])), n_rows)
+
+    def close(self):
+        self._flush()
+        if self._fmt == "npz":
+            columns = {name: np.concatenate([chunk[name] for chunk in self._columns])
+                       if self._columns else np.zeros(0) for name in ("user", "item", "prediction")}
+            save = np.savez_compressed if self._compression else np.savez
+            with open(self._path, "wb") as out:
+                save(out, **columns)
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def _lines(rows):
+        # %s formats the numpy values with str, as the per-line writer did
+        return "".join(["%s\t%s\t%s\n" % row for row in rows])
+
+    def _append(self, rows, n_rows):
+        self._buffer.append(rows)
+        self._buffered += n_rows
+        if self._buffered >= self._chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        if self._fmt == "tsv":
+            self._out.write("".join(self._buffer))
+        else:
+            chunk = {name: np.concatenate([np.asarray(rows[c]) for rows in self._buffer])
+                     for c, name in enumerate(("user", "item", "prediction"))}
+            if self._fmt == "npz":
+                self._columns.append(chunk)
+            else:
+                self._write_parquet(chunk)
+        self._buffer = []
+        self._buffered = 0
+
+    def _write_parquet(self, chunk):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("The parquet recommendation format requires pyarrow (pip install pyarrow)")
+        table = pa.table(chunk)
+        if self._out is None:
+            self._out = pq.ParquetWriter(self._path, table.schema, compression=self._compression or "none")
+        self._out.write_table(table)
+
+    @staticmethod
+    def _open_text(path, compression):
+        if compression == "gzip":
+            return io.TextIOWrapper(io.BufferedWriter(gzip.open(path, "wb", compresslevel=6), 1 << 20))
+        if compression == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("The zstd recommendation compression requires zstandard (pip install zstandard)")
+            return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(open(path, "wb")))
+        return open(path, "w", buffering=1 << 20)
+
+
+def store_recommendation(recommendations, path="", fmt="tsv", compression=None):
     """
     Store recommendation list (top-k)
+    :param recommendations: recommendations in the form {user: [(item1,value1),...]}
+    :param path: output file
+    :param fmt: tsv, npz, or parquet
+    :param compression: None, gzip, or zstd
     :return:
     """
-
-    with open(path, 'w') as out:
-        for u, recs in recommendations.items():
-            for i, value in recs:
-                out.write(str(u) + '\t' + str(i) + '\t' + str(value) + '\n')
+    with RecommendationWriter(path, fmt, compression) as writer:
+        writer.write_dict(recommendations)
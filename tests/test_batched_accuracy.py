@@ -0,0 +1,35 @@
+"""
+Regression cases of the batched accuracy metrics.
+
+"""
+
+__version__ = '0.3.1'
+__author__ = 'Vito Walter Anelli, Claudio Pomo'
+__email__ = 'vitowalter.anelli@poliba.it, claudio.pomo@poliba.it'
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from elliot.evaluation.metrics.accuracy.batched_accuracy import BatchedAccuracy
+from elliot.evaluation.relevance.relevance import Relevance
+
+
+def _engine(recommendations):
+    test = {0: {1: 1.}, 1: {2: 1.}}
+    evaluation_objects = SimpleNamespace(relevance=Relevance(test, 0), data=None, num_items=10)
+    return BatchedAccuracy(recommendations, evaluation_objects)
+
+
+def test_ndcg_without_hits_in_cutoff():
+    engine = _engine({0: [(5, .9), (1, .5)], 1: [(3, .4), (4, .1)]})
+
+    assert np.array_equal(engine.user_ndcg(1), np.zeros(2))
+    ndcg = engine.user_ndcg(2)
+    assert ndcg[0] > 0 and ndcg[1] == 0
+
+
+def test_ndcg_without_hits():
+    engine = _engine({0: [(5, .9)], 1: [(3, .4)]})
+
+    assert np.array_equal(engine.user_ndcg(1), np.zeros(2))